@@ -9,6 +9,7 @@ class Config:
     # API Configuration
     API_URL = "http://127.0.0.1:8000"
     UPLOAD_URL = f"{API_URL}/upload-image/"
+    WS_URL = "ws://127.0.0.1:8000/ws/products_updates"
     
     # Page Configuration
     APP_TITLE = "E-Ticaret Admin Paneli"
@@ -33,6 +34,7 @@ class Config:
 # Backward compatibility - expose as module-level variables
 API_URL = Config.API_URL
 UPLOAD_URL = Config.UPLOAD_URL
+WS_URL = Config.WS_URL
 PAGE_TITLE = Config.PAGE_TITLE
 WINDOW_WIDTH = Config.WINDOW_WIDTH
 WINDOW_HEIGHT = Config.WINDOW_HEIGHT
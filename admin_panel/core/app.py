@@ -5,7 +5,7 @@ import flet as ft
 
 from admin_panel.components import NotificationManager, ModalManager, Sidebar
 from admin_panel.config import Config
-from admin_panel.services import APIService, AuthService
+from admin_panel.services import APIService, AuthService, RealtimeService
 from admin_panel.views import (
     AuthView, DashboardView, ProductsView, OrdersView, CustomersView, CategoriesView,
     InventoryView, SalesReportsView, ProductPerformanceView, CustomerAnalyticsView,
@@ -44,6 +44,13 @@ class AdminPanel:
         self.notification_manager = NotificationManager(page)
         self.modal_manager = ModalManager(page)
         
+        # Catalog change events (product_created/updated/deleted, stock_changed)
+        self.realtime_service = RealtimeService(
+            on_event=self.page.pubsub.send_all,
+            on_reconnect=lambda: self.page.pubsub.send_all({"type": "resync"})
+        )
+        self.page.pubsub.subscribe(self.on_realtime_event)
+        
         # State management
         self.current_view = "dashboard"
         self.access_token = None
@@ -99,6 +106,7 @@ class AdminPanel:
         
         # Show main panel
         self.show_main_panel()
+        self.realtime_service.start()
     
     def _initialize_views(self):
         """Initialize all views after authentication"""
@@ -193,6 +201,19 @@ class AdminPanel:
         self.views['api_settings'] = APISettingsView(self.page, self.api_service, self.notification_manager)
         self.views['integrations'] = IntegrationsView(self.page, self.api_service, self.notification_manager)
     
+    def on_realtime_event(self, event):
+        """Apply catalog events to the visible view without reloading it"""
+        if not isinstance(event, dict):
+            return
+        view = self.views.get(self.current_view)
+        if not hasattr(view, 'apply_product_event'):
+            return
+        if event.get("type") == "resync":
+            # Reconnected: reload once to pick up missed events
+            view.load_data()
+        else:
+            view.apply_product_event(event)
+    
     def show_main_panel(self):
         """Show main admin panel with sidebar and content area"""
         # Create sidebar
@@ -266,6 +287,7 @@ class AdminPanel:
             self.modal_manager.close_modal()
             
             # Clear authentication
+            self.realtime_service.stop()
             self.access_token = None
             self.current_user = None
             self.api_service.set_token(None)
@@ -4,5 +4,6 @@ Services Module
 
 from .api_service import APIService
 from .auth_service import AuthService
+from .realtime_service import RealtimeService
 
-__all__ = ['APIService', 'AuthService']
\ No newline at end of file
+__all__ = ['APIService', 'AuthService', 'RealtimeService']
\ No newline at end of file
@@ -3,7 +3,7 @@ API Service - Handles all API requests
 """
 
 import requests
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Tuple, Union
 
 from admin_panel.config import API_URL, API_TIMEOUT
 
@@ -15,6 +15,8 @@ class APIService:
         self.access_token = access_token
         self.base_url = API_URL
         self.timeout = API_TIMEOUT
+        # ETag destekli endpoint'ler için son yanıtlar: url -> (etag, data)
+        self._etag_cache: Dict[str, Tuple[str, Any]] = {}
     
     def set_token(self, token: Union[str,None] ):
         """Set authentication token"""
@@ -37,6 +39,33 @@ class APIService:
             timeout=self.timeout
         )
     
+    def get_json_cached(self, endpoint: str, params: Optional[Dict] = None) -> Any:
+        """
+        Make conditional GET request using ETag / If-None-Match
+        
+        Returns the previously fetched data when the server answers 304 Not Modified.
+        """
+        cache_key = requests.Request("GET", f"{self.base_url}{endpoint}", params=params).prepare().url
+        headers = self.get_headers()
+        cached = self._etag_cache.get(cache_key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        
+        response = requests.get(
+            cache_key,
+            headers=headers,
+            timeout=self.timeout
+        )
+        if response.status_code == 304 and cached:
+            return cached[1]
+        
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etag_cache[cache_key] = (etag, data)
+        return data
+    
     def post(self, endpoint: str, data: Optional[Dict] = None, json: Optional[Dict] = None) -> requests.Response:
         """Make POST request"""
         url = f"{self.base_url}{endpoint}"
@@ -72,15 +101,11 @@ class APIService:
     
     def get_products(self) -> Dict[str, Any]:
         """Get all products"""
-        response = self.get("/products/")
-        response.raise_for_status()
-        return response.json()
+        return self.get_json_cached("/products/")
     
     def get_product(self, product_id: int) -> Dict[str, Any]:
         """Get single product"""
-        response = self.get(f"/products/{product_id}")
-        response.raise_for_status()
-        return response.json()
+        return self.get_json_cached(f"/products/{product_id}")
     
     def create_product(self, product_data: Dict) -> Dict[str, Any]:
         """Create new product"""
@@ -136,9 +161,7 @@ class APIService:
     
     def get_categories(self) -> Dict[str, Any]:
         """Get all categories"""
-        response = self.get("/categories/")
-        response.raise_for_status()
-        return response.json()
+        return self.get_json_cached("/categories/")
     
     def create_category(self, category_data: Dict) -> Dict[str, Any]:
         """Create new category"""
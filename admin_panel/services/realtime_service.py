@@ -0,0 +1,62 @@
+"""
+Realtime Service - Listens for catalog change events over WebSocket
+"""
+
+import json
+from threading import Event, Thread
+from typing import Callable, Optional
+
+from websockets.sync.client import connect
+
+from admin_panel.config import WS_URL
+
+# Catalog events applied in place (see backend/catalog_events.py)
+PRODUCT_EVENT_TYPES = {"product_created", "product_updated", "product_deleted", "stock_changed", "catalog_batch"}
+
+RECONNECT_DELAY = 5
+
+
+class RealtimeService:
+    """Background WebSocket listener that forwards catalog events"""
+    
+    def __init__(self, on_event: Callable[[dict], None], on_reconnect: Optional[Callable[[], None]] = None):
+        self.on_event = on_event
+        self.on_reconnect = on_reconnect
+        self._stop = Event()
+        self._thread = None
+    
+    def start(self):
+        """Start listening in a daemon thread"""
+        self._stop.clear()
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = Thread(target=self._listen, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop listening (the thread exits after the current connection closes)"""
+        self._stop.set()
+    
+    def _listen(self):
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                with connect(WS_URL) as websocket:
+                    if connected_before and self.on_reconnect:
+                        # Events may have been missed while disconnected
+                        self.on_reconnect()
+                    connected_before = True
+                    while not self._stop.is_set():
+                        try:
+                            message = websocket.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        try:
+                            event = json.loads(message)
+                        except ValueError:
+                            continue
+                        if isinstance(event, dict) and event.get("type") in PRODUCT_EVENT_TYPES:
+                            self.on_event(event)
+            except Exception as e:
+                print(f"WebSocket hatası: {e}. {RECONNECT_DELAY}sn sonra tekrar denenecek.")
+                self._stop.wait(RECONNECT_DELAY)
@@ -161,6 +161,34 @@ class ProductsView:
             self.loading_indicator.visible = False
             self.page.update()
     
+    def apply_product_event(self, event: dict):
+        """Patch the local product list from a catalog event or batch (no API reload)"""
+        events = event["events"] if event.get("type") == "catalog_batch" else [event]
+        # Copy so the API service's ETag cache keeps the original response
+        products = list(self.products)
+        for item in events:
+            self._apply_event(products, item)
+        self.products = products
+        if self.products_table is not None:
+            self.apply_filters()
+    
+    def _apply_event(self, products: list, event: dict):
+        event_type = event.get("type")
+        if event_type == "product_created":
+            products.append(event["product"])
+            return
+        index = next(
+            (i for i, p in enumerate(products) if p.get('id') == event.get("product_id")), None
+        )
+        if index is None:
+            return
+        if event_type == "product_deleted":
+            products.pop(index)
+        elif event_type == "product_updated":
+            products[index] = {**products[index], **event["changes"]}
+        elif event_type == "stock_changed":
+            products[index] = {**products[index], "stock_quantity": event["stock_quantity"]}
+    
     def _update_category_filter(self):
         """Update category filter dropdown"""
         options = [ft.dropdown.Option("all", "Tüm Kategoriler")]
@@ -0,0 +1,193 @@
+# backend/audit_log.py
+"""
+Toplu güvenlik audit log yazıcısı
+
+SecurityAuditLogger.log_security_event olayı sadece bellekteki sınırlı bir
+kuyruğa ekler; istek yolunda ağ veya disk işlemi yapılmaz. Arka plan görevi
+kuyruğu AUDIT_LOG_FLUSH_INTERVAL aralıklarla (veya AUDIT_LOG_BATCH_SIZE
+olaya ulaşınca hemen) boşaltır:
+
+- security_logs tablosuna tek bir toplu INSERT
+- Redis security_events listesine tek pipeline (LPUSH + LTRIM)
+- Uygulama loguna SECURITY_EVENT satırları
+
+Kuyruk doluysa AUDIT_LOG_OVERFLOW politikası uygulanır: drop_oldest en eski
+olayı, drop_newest gelen olayı atar. Atılan olaylar sayılır ve health
+endpoint'inde görünür. Uygulama kapanırken kuyruk son kez boşaltılır.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from sqlalchemy import insert
+
+from . import models
+from .database import AsyncSessionLocal
+from .redis_client import redis_client, redis_available, mark_redis_down
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", 10000))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", 500))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", 1.0))  # saniye
+AUDIT_LOG_OVERFLOW = os.getenv("AUDIT_LOG_OVERFLOW", "drop_oldest").lower()  # drop_oldest, drop_newest
+
+REDIS_EVENTS_KEY = "security_events"
+REDIS_EVENTS_MAX = 1000  # Redis'te tutulan son olay sayısı
+
+# Olay adında bu kelimeler geçiyorsa önem derecesi "warning" olur
+_WARNING_MARKERS = ("failed", "locked", "suspicious", "injection", "unauthorized", "revoked")
+
+
+def event_severity(event_type: str) -> str:
+    """Olay türünden security_logs.severity değerini çıkarır"""
+    return "warning" if any(marker in event_type for marker in _WARNING_MARKERS) else "info"
+
+
+class AuditLogWriter:
+    """Sınırlı kuyruklu, toplu yazan audit log yazıcısı"""
+
+    def __init__(
+        self,
+        max_queue: int = AUDIT_LOG_QUEUE_SIZE,
+        batch_size: int = AUDIT_LOG_BATCH_SIZE,
+        flush_interval: float = AUDIT_LOG_FLUSH_INTERVAL,
+        overflow: str = AUDIT_LOG_OVERFLOW
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrikler
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._drop_warned_at = 0.0
+
+    # --- İstek yolu ---
+
+    def submit(self, entry: Dict[str, Any]):
+        """Olayı kuyruğa ekler (I/O yapmaz)"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            if time.monotonic() - self._drop_warned_at >= 10:
+                self._drop_warned_at = time.monotonic()
+                logger.warning(f"Audit log kuyruğu dolu ({self.max_queue}), {self.overflow} uygulanıyor")
+            if self.overflow == "drop_newest":
+                return
+            self._queue.popleft()
+
+        self._queue.append(entry)
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    # --- Yazma ---
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        count = min(self.batch_size, len(self._queue))
+        return [self._queue.popleft() for _ in range(count)]
+
+    async def flush(self):
+        """Kuyruktaki tüm olayları yazar"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._queue:
+                await self._write_batch(self._take_batch())
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]):
+        for entry in batch:
+            logger.info(f"SECURITY_EVENT: {entry}")
+
+        rows = [
+            {
+                "user_id": entry["user_id"],
+                "event_type": entry["event_type"],
+                "ip_address": entry["ip_address"],
+                "user_agent": entry["user_agent"],
+                "details": json.dumps(entry["details"], ensure_ascii=False, default=str),
+                "severity": event_severity(entry["event_type"]),
+                # security_logs naive UTC tutar
+                "created_at": datetime.fromisoformat(entry["timestamp"]).replace(tzinfo=None),
+            }
+            for entry in batch
+        ]
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(models.SecurityLog), rows)
+                await db.commit()
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Audit log veritabanına yazılamadı ({len(batch)} olay): {e}")
+
+        if not redis_available():
+            return
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.lpush(REDIS_EVENTS_KEY, *(json.dumps(entry, ensure_ascii=False, default=str) for entry in batch))
+                pipe.ltrim(REDIS_EVENTS_KEY, 0, REDIS_EVENTS_MAX - 1)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "security_events")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Audit log yazma hatası: {e}")
+
+    # --- Yaşam döngüsü ---
+
+    async def start(self):
+        """Arka plan yazma görevini başlatır (lifespan açılışında)"""
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Görevi durdurur ve kuyrukta kalanları yazar (lifespan kapanışında)"""
+        if self._task:
+            # Yazılmakta olan grup yarıda kalmasın diye iptal yerine uyandır
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Yazıcı metrikleri"""
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "overflow": self.overflow,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+# Global audit log yazıcısı
+audit_log_writer = AuditLogWriter()
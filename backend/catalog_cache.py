@@ -0,0 +1,256 @@
+# backend/catalog_cache.py
+"""
+Ürün kataloğu önbelleği (Redis + süreç içi L1)
+
+Mağaza tarafındaki /products/, /products/{id} ve /categories/ yanıtları
+JSON'a çevrilmiş halde saklanır. Anahtarlar katalog sürümünü içerir; ürün,
+kategori veya stok değiştiğinde sürüm artırılır ve eski anahtarların hepsi
+tek seferde geçersiz olur (eski kayıtlar TTL ile Redis'ten düşer).
+
+- L1: Her worker'da küçük bir LRU sözlük. Sürüm Redis'ten en fazla
+  CATALOG_VERSION_CHECK_SECONDS aralıkla okunur, diğer worker'ların yaptığı
+  değişiklikler bu süre içinde görünür olur.
+- L2: Redis. Tüm worker'lar aynı sayfayı paylaşır.
+- Aynı anahtar için eşzamanlı istekler tek bir veritabanı sorgusunu bekler;
+  products_updated yayınından sonra tüm istemcilerin aynı anda yaptığı
+  yenileme isteği veritabanına bir kez gider.
+
+Redis yoksa önbellek sadece L1 ile çalışır (tek worker için doğru sonuç verir).
+Redis erişilemezken yapılan geçersiz kılmalar not edilir; Redis'e ilk
+erişimde ortak sürüm artırılır ve o zamana kadar Redis'teki sayfalar
+kullanılmaz (eski sürümdeki sayfalar ve ETag'ler geri dönmez).
+
+Katalog sürümü aynı zamanda bu endpoint'lerin ETag değeridir; If-None-Match
+eşleşirse sayfa hiç yüklenmeden 304 döner. Sürüm "<epoch>-<sayaç>"
+biçimindedir: epoch, sayaçla aynı Redis hash'inde ilk kullanımda rastgele
+üretilir. Redis boşaltılır veya yeniden başlatılırsa sayaçla birlikte epoch da
+yenilenir; sayaç baştan başlasa da istemcilerin eski ETag'leri yeni verilerle
+eşleşip yanlışlıkla 304 almaz. Redis'siz çalışan worker süreç kimliğini epoch
+olarak kullanır.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from .redis_client import redis_client, redis_available, mark_redis_down
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", 300))  # saniye
+CATALOG_L1_MAX_ENTRIES = int(os.getenv("CATALOG_L1_MAX_ENTRIES", 256))
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", 1.0))
+
+# Önbellekte tutulan sayfa: (JSON gövdesi, sonraki sayfa imleci)
+CachedPage = Tuple[bytes, Optional[str]]
+
+
+class CatalogCache:
+    """Sürüm anahtarlı, iki katmanlı katalog önbelleği"""
+
+    KEY_PREFIX = "catalog:"
+    # Hash: epoch (rastgele, bir kez yazılır), counter (her geçersiz kılmada artar)
+    VERSION_KEY = "catalog:version_info"
+
+    def __init__(self, client: aioredis.Redis = redis_client):
+        self.redis_client = client
+
+        # Sürüm Redis'ten okunmadıysa diğer worker'larla ortak değildir;
+        # epoch yerine süreç kimliği kullanılır ki farklı worker'ların sayaçları karışmasın
+        self._instance_id = uuid.uuid4().hex[:8]
+        self._local_counter = 0
+        self._version = f"{self._instance_id}-0"
+        self._version_checked_at = 0.0
+        # Redis erişilemezken geçersiz kılma yapıldı, ortak sürüm henüz artırılmadı
+        self._missed_invalidation = False
+        self._l1: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    # --- Redis yardımcıları ---
+
+    def _redis_usable(self) -> bool:
+        return redis_available()
+
+    def _mark_redis_down(self, error: Exception):
+        mark_redis_down(error, "catalog_cache")
+
+    # --- Sürüm ---
+
+    async def _shared_version(self, increment: bool) -> str:
+        """Redis'teki ortak sürümü okur (increment ise önce artırır); tek round trip"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            # Epoch yoksa (ilk kullanım, Redis boşaltılmış) yenisi yazılır
+            pipe.hsetnx(self.VERSION_KEY, "epoch", uuid.uuid4().hex[:12])
+            if increment:
+                pipe.hincrby(self.VERSION_KEY, "counter", 1)
+            else:
+                pipe.hget(self.VERSION_KEY, "counter")
+            pipe.hget(self.VERSION_KEY, "epoch")
+            _, counter, epoch = await pipe.execute()
+        return f"{epoch}-{int(counter or 0)}"
+
+    async def get_version(self) -> str:
+        """Geçerli katalog sürümünü döndürür (Redis'ten kısa aralıklarla okunur)"""
+        now = time.monotonic()
+        if self._missed_invalidation and self._redis_usable():
+            await self._replay_invalidation()
+            return self._version
+        if now - self._version_checked_at < CATALOG_VERSION_CHECK_SECONDS or not self._redis_usable():
+            return self._version
+
+        try:
+            version = await self._shared_version(increment=False)
+        except (RedisError, OSError) as e:
+            self._mark_redis_down(e)
+            return self._version
+
+        self._version_checked_at = now
+        if version != self._version:
+            # Başka bir worker kataloğu değiştirdi
+            self._version = version
+            self._l1.clear()
+        return self._version
+
+    async def invalidate(self):
+        """
+        Katalog sürümünü artırır
+
+        Ürün, kategori veya stok değiştiren her endpoint commit'ten sonra çağırır.
+        """
+        self._l1.clear()
+        self._local_counter += 1
+        self._version = f"{self._instance_id}-{self._local_counter}"
+        self._version_checked_at = time.monotonic()
+
+        if not self._redis_usable():
+            self._missed_invalidation = True
+            return
+        try:
+            self._version = await self._shared_version(increment=True)
+        except (RedisError, OSError) as e:
+            self._missed_invalidation = True
+            self._mark_redis_down(e)
+
+    async def _replay_invalidation(self):
+        """Redis yokken kaçırılan geçersiz kılmayı ortak sürüme yansıtır"""
+        try:
+            version = await self._shared_version(increment=True)
+        except (RedisError, OSError) as e:
+            self._mark_redis_down(e)
+            return
+        self._missed_invalidation = False
+        self._version = version
+        self._version_checked_at = time.monotonic()
+        self._l1.clear()
+
+    def etag(self, version: str) -> str:
+        """Katalog sürümünden güçlü (strong) ETag üretir"""
+        return f'"catalog-{version}"'
+
+    # --- Okuma ---
+
+    async def get_or_load(
+        self,
+        name: str,
+        loader: Callable[[], Awaitable[CachedPage]],
+        version: Optional[str] = None
+    ) -> CachedPage:
+        """
+        Sayfayı L1 → Redis → loader sırasıyla getirir
+
+        Args:
+            name: Sayfanın sürümden bağımsız adı (ör. "products:limit=100")
+            loader: Önbellekte yoksa sayfayı veritabanından üreten coroutine
+            version: ETag için okunmuş sürüm (verilmezse yeniden okunur)
+        """
+        if version is None:
+            version = await self.get_version()
+        key = f"{self.KEY_PREFIX}v{version}:{name}"
+
+        page = self._l1.get(key)
+        if page is not None:
+            self._l1.move_to_end(key)
+            return page
+
+        # Aynı anahtar zaten yükleniyorsa onu bekle
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            page = await self._redis_get(key)
+            if page is None:
+                page = await loader()
+                await self._redis_set(key, page)
+            self._l1_set(key, page)
+            future.set_result(page)
+            return page
+        except BaseException as e:
+            future.set_exception(e)
+            # Bekleyen yoksa "exception was never retrieved" uyarısını engelle
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _l1_set(self, key: str, page: CachedPage):
+        self._l1[key] = page
+        self._l1.move_to_end(key)
+        while len(self._l1) > CATALOG_L1_MAX_ENTRIES:
+            self._l1.popitem(last=False)
+
+    async def _redis_get(self, key: str) -> Optional[CachedPage]:
+        if self._missed_invalidation or not self._redis_usable():
+            return None
+        try:
+            raw = await self.redis_client.get(key)
+        except (RedisError, OSError) as e:
+            self._mark_redis_down(e)
+            return None
+        if raw is None:
+            return None
+
+        # Biçim: <imleç>\n<gövde>
+        cursor, _, body = raw.partition("\n")
+        return body.encode(), cursor or None
+
+    async def _redis_set(self, key: str, page: CachedPage):
+        if self._missed_invalidation or not self._redis_usable():
+            return
+        body, next_cursor = page
+        try:
+            await self.redis_client.set(
+                key, f"{next_cursor or ''}\n{body.decode()}", ex=CATALOG_CACHE_TTL
+            )
+        except (RedisError, OSError) as e:
+            self._mark_redis_down(e)
+
+    async def close(self):
+        """Bellekteki sayfaları bırakır (Redis havuzu redis_client modülünde kapatılır)"""
+        self._l1.clear()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match başlığı verilen ETag ile eşleşiyor mu (zayıf karşılaştırma)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Global katalog önbelleği
+catalog_cache = CatalogCache()
@@ -0,0 +1,221 @@
+# backend/catalog_events.py
+"""
+Katalog değişiklik olayları (WebSocket)
+
+Katalog yazıldığında istemcilere "products_updated" yerine değişikliğin
+kendisi gönderilir; mağaza ve admin paneli tüm listeyi yeniden çekmek yerine
+yerel verisini yamalar:
+
+    {"type": "product_created", "product": {...}}
+    {"type": "product_updated", "product_id": 5, "category_id": 2, "changes": {"price": 120.0}}
+    {"type": "product_deleted", "product_id": 5, "category_id": 2}
+    {"type": "stock_changed", "product_id": 5, "category_id": 2, "stock_quantity": 12}
+
+Alan adları ve değerleri GET /products/ yanıtıyla (schemas.Product) aynıdır.
+Olaylar "products", "product:<id>" ve "category:<id>" konularına yayınlanır
+(bkz. backend/websocket_manager.py); kategorisi değişen ürünün olayı eski
+kategorinin abonelerine de gider.
+Bağlantı koptuğunda kaçırılan olaylar için istemci yeniden bağlanınca
+listeyi ETag ile bir kez yeniler.
+
+Olaylar doğrudan yayınlanmaz, catalog_notifier'a verilir. İlk olaydan
+itibaren CATALOG_EVENT_WINDOW saniye içinde gelen olaylar ürün bazında
+birleştirilir (ör. oluştur + stok değişimi = tek product_created, oluştur +
+sil = hiçbir şey) ve tek mesaj olarak gönderilir:
+
+    {"type": "catalog_batch", "events": [{...}, {...}]}
+
+Pencerede tek olay varsa olay kendisi gönderilir. 200 kalemli bir satın alma
+faturası böylece 200 yerine tek bildirim üretir.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from . import schemas
+from .websocket_manager import PRODUCTS_TOPIC, TopicEvents, category_topic, manager, product_topic
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Olayların birleştirildiği pencere (saniye)
+CATALOG_EVENT_WINDOW = float(os.getenv("CATALOG_EVENT_WINDOW", 0.25))
+
+PRODUCT_CREATED = "product_created"
+PRODUCT_UPDATED = "product_updated"
+PRODUCT_DELETED = "product_deleted"
+STOCK_CHANGED = "stock_changed"
+CATALOG_BATCH = "catalog_batch"
+
+
+def product_created(product) -> Dict[str, Any]:
+    return {
+        "type": PRODUCT_CREATED,
+        "product": schemas.Product.model_validate(product).model_dump(mode="json"),
+    }
+
+
+def product_updated(product, fields: Iterable[str]) -> Dict[str, Any]:
+    """Sadece değişen alanların güncel değerlerini taşır"""
+    changes = schemas.Product.model_validate(product).model_dump(mode="json", include=set(fields))
+    return {
+        "type": PRODUCT_UPDATED,
+        "product_id": product.id,
+        "category_id": product.category_id,
+        "changes": changes,
+    }
+
+
+def product_deleted(product) -> Dict[str, Any]:
+    return {"type": PRODUCT_DELETED, "product_id": product.id, "category_id": product.category_id}
+
+
+def stock_changed(product_id: int, stock_quantity: int, category_id: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "type": STOCK_CHANGED,
+        "product_id": product_id,
+        "category_id": category_id,
+        "stock_quantity": stock_quantity,
+    }
+
+
+def _product_id(event: Dict[str, Any]) -> int:
+    if event["type"] == PRODUCT_CREATED:
+        return event["product"]["id"]
+    return event["product_id"]
+
+
+def _category_id(event: Dict[str, Any]) -> Optional[int]:
+    if event["type"] == PRODUCT_CREATED:
+        return event["product"].get("category_id")
+    return event.get("category_id")
+
+
+def _topics(event: Dict[str, Any], previous_category_id: Optional[int] = None) -> Set[str]:
+    """Olayın yayınlanacağı konular"""
+    topics = {PRODUCTS_TOPIC, product_topic(_product_id(event))}
+    for category_id in (_category_id(event), previous_category_id):
+        if category_id is not None:
+            topics.add(category_topic(category_id))
+    return topics
+
+
+def _merge(previous: Dict[str, Any], event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Aynı ürünün iki olayını tek olaya indirger (None: olaylar birbirini götürür)"""
+    kind = event["type"]
+    if kind == PRODUCT_DELETED:
+        # İstemci hiç görmediği ürünü silmek zorunda kalmasın
+        return None if previous["type"] == PRODUCT_CREATED else event
+    if kind == PRODUCT_CREATED:
+        return event
+    if previous["type"] == PRODUCT_DELETED:
+        return previous
+
+    changes = event["changes"]
+    if previous["type"] == PRODUCT_CREATED:
+        return {**previous, "product": {**previous["product"], **changes}}
+    # Ürün başka kategoriye geçtiyse güncel kategori yeni olaydadır
+    return {**previous, "category_id": event["category_id"], "changes": {**previous["changes"], **changes}}
+
+
+def _normalize(event: Dict[str, Any]) -> Dict[str, Any]:
+    """stock_changed birleştirme için product_updated olarak tutulur"""
+    if event["type"] == STOCK_CHANGED:
+        return {
+            "type": PRODUCT_UPDATED,
+            "product_id": event["product_id"],
+            "category_id": event["category_id"],
+            "changes": {"stock_quantity": event["stock_quantity"]},
+        }
+    return event
+
+
+def _denormalize(event: Dict[str, Any]) -> Dict[str, Any]:
+    if event["type"] == PRODUCT_UPDATED and event["changes"].keys() == {"stock_quantity"}:
+        return stock_changed(event["product_id"], event["changes"]["stock_quantity"], event["category_id"])
+    return event
+
+
+class CatalogEventCoalescer:
+    """Katalog olaylarını pencere boyunca biriktirip tek mesajda yayınlar"""
+
+    def __init__(
+        self,
+        window: float = CATALOG_EVENT_WINDOW,
+        publish: Callable[[TopicEvents], Awaitable[None]] = manager.publish_many
+    ):
+        self.window = window
+        self.publish = publish
+        # Ürün -> (birleştirilmiş olay, konular)
+        self._pending: Dict[int, Tuple[Optional[Dict[str, Any]], Set[str]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Metrikler
+        self.submitted = 0
+        self.messages = 0
+
+    def submit(self, event: Dict[str, Any], previous_category_id: Optional[int] = None):
+        """
+        Olayı bekleyen gruba ekler (I/O yapmaz)
+
+        previous_category_id: ürünün kategorisi değiştiyse eski kategori;
+        o kategorinin aboneleri de ürünün çıktığını görür.
+        """
+        self.submitted += 1
+        product_id = _product_id(event)
+        topics = _topics(event, previous_category_id)
+        event = _normalize(event)
+        pending = self._pending.get(product_id)
+        if pending is None:
+            self._pending[product_id] = (event, topics)
+        else:
+            previous, previous_topics = pending
+            merged = event if previous is None else _merge(previous, event)
+            self._pending[product_id] = (merged, previous_topics | topics)
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Bekleyen olayları hemen yayınlar"""
+        pending, self._pending = self._pending, {}
+        items = [
+            (sorted(topics), _denormalize(event))
+            for event, topics in pending.values() if event is not None
+        ]
+        if not items:
+            return
+        self.messages += 1
+        try:
+            # Her bağlantı kendi konularındaki olayları tek mesajda alır
+            await self.publish(items)
+        except Exception as e:
+            logger.error(f"Katalog olayları yayınlanamadı ({len(items)} olay): {e}")
+
+    async def stop(self):
+        """Bekleyen zamanlayıcıyı iptal eder ve kalan olayları yayınlar (lifespan kapanışında)"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window * 1000, 1),
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "messages": self.messages,
+        }
+
+
+# Global katalog bildirimcisi
+catalog_notifier = CatalogEventCoalescer()
@@ -0,0 +1,213 @@
+# backend/loop_monitor.py
+"""
+Event loop gecikme izleyicisi
+
+async endpoint'lerde yapılan bloklayan işler (senkron SQLAlchemy, Redis,
+bcrypt, SMTP, dosya okuma...) event loop'u durdurur ve o sürede diğer tüm
+istekler bekler. Bu modül bunları bulmak ve ölçmek içindir:
+
+- Arka plan görevi LOOP_MONITOR_INTERVAL aralıklarla uyur; uyanmadaki
+  sapma event loop gecikmesidir (event_loop_lag_seconds histogramı).
+- Ayrı bir izleme thread'i event loop'un LOOP_MONITOR_THRESHOLD süresinden
+  uzun süredir ilerlemediğini görürse loop thread'inin o anki yığınını
+  (sys._current_frames) alır; yani bloklayan kod çalışırken yakalanır.
+- LoopMonitorMiddleware her isteğin görevini scope ile eşler; izleme
+  thread'i o an çalışan görevden blokajı "GET /products/{product_id}" gibi
+  route şablonuna bağlar.
+
+Loop toparlandığında blokaj event_loop_blocks_total ve
+event_loop_blocked_seconds_total metriklerine (route etiketiyle) yazılır,
+yığın WARNING olarak loglanır ve son LOOP_MONITOR_HISTORY blokaj health
+endpoint'inde görünür.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+
+from dotenv import load_dotenv
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import EVENT_LOOP_LAG, record_loop_block
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", 0.1))  # saniye
+LOOP_MONITOR_THRESHOLD = float(os.getenv("LOOP_MONITOR_THRESHOLD", 0.1))  # saniye
+LOOP_MONITOR_HISTORY = int(os.getenv("LOOP_MONITOR_HISTORY", 20))
+LOOP_MONITOR_STACK_DEPTH = 30
+
+# İstek görevi -> ASGI scope (izleme thread'i okur)
+_active_requests: Dict[asyncio.Task, Scope] = {}
+
+
+def _route_of(scope: Optional[Scope]) -> str:
+    """Blokajın metrik/log etiketi"""
+    if scope is None:
+        # İstek dışı kod (arka plan görevi, lifespan...)
+        return "background"
+    route = getattr(scope.get("route"), "path", None) or "unmatched"
+    if scope["type"] == "websocket":
+        return f"WS {route}"
+    return f"{scope['method']} {route}"
+
+
+class LoopMonitorMiddleware:
+    """İstek görevlerini route bilgisiyle eşleyen saf ASGI middleware"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket") or not LOOP_MONITOR_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        _active_requests[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _active_requests.pop(task, None)
+
+
+class LoopMonitor:
+    """Event loop gecikmesini ölçen ve blokajları yakalayan izleyici"""
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold: float = LOOP_MONITOR_THRESHOLD,
+        history: int = LOOP_MONITOR_HISTORY
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Loop görevi her turda yazar, izleme thread'i okur
+        self._tick = 0
+        self._tick_at = 0.0
+        # Son blokaj için izleme thread'inin yakaladığı (tick, route, yığın)
+        self._captured: Optional[tuple] = None
+
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.blocks = 0
+        self.max_lag = 0.0
+
+    # --- Loop tarafı ---
+
+    async def _run(self):
+        while True:
+            self._tick += 1
+            self._tick_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - self._tick_at - self.interval)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.threshold:
+                self._record_block(lag)
+
+    def _record_block(self, lag: float):
+        captured, self._captured = self._captured, None
+        if captured is not None and captured[0] == self._tick:
+            _, route, stack = captured
+        else:
+            # Blokaj izleme thread'inin kontrol aralığından kısa sürdü
+            route, stack = "unknown", None
+
+        self.blocks += 1
+        record_loop_block(route, lag)
+        self.recent.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "lag_ms": round(lag * 1000, 1),
+            "route": route,
+            "stack": stack,
+        })
+        logger.warning(
+            f"Event loop {lag * 1000:.0f} ms bloklandı ({route})"
+            + (f", bloklayan kod:\n{stack}" if stack else "")
+        )
+
+    # --- İzleme thread'i ---
+
+    def _watch(self):
+        check_every = max(self.threshold / 2, 0.005)
+        while not self._stop_event.wait(check_every):
+            tick, tick_at = self._tick, self._tick_at
+            if time.perf_counter() - tick_at - self.interval < self.threshold:
+                continue
+            if self._captured is not None and self._captured[0] == tick:
+                continue  # Bu blokaj zaten yakalandı
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=LOOP_MONITOR_STACK_DEPTH))
+            del frame
+            try:
+                task = asyncio.current_task(self._loop)
+            except RuntimeError:
+                task = None
+            route = _route_of(_active_requests.get(task)) if task is not None else "background"
+            self._captured = (tick, route, stack)
+
+    # --- Yaşam döngüsü ---
+
+    async def start(self):
+        """İzleyiciyi başlatır (lifespan açılışında)"""
+        if not LOOP_MONITOR_ENABLED:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Event loop izleyicisi başlatıldı (aralık {self.interval * 1000:.0f} ms, "
+            f"eşik {self.threshold * 1000:.0f} ms)"
+        )
+
+    async def stop(self):
+        """İzleyiciyi durdurur (lifespan kapanışında)"""
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """İzleyici özeti (health endpoint'i için, yığınlar hariç)"""
+        return {
+            "enabled": self._task is not None,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "blocks": self.blocks,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "recent": [
+                {key: value for key, value in block.items() if key != "stack"}
+                for block in self.recent
+            ],
+        }
+
+
+# Global event loop izleyicisi
+loop_monitor = LoopMonitor()
@@ -2,28 +2,46 @@
 
 import os
 import asyncio
+import json
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status, Response, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status, Response, WebSocket, WebSocketDisconnect, Request, Query
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_, update, insert, delete, case, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from sqlalchemy.schema import CreateIndex
 from typing import List, Optional, AsyncGenerator
 from dotenv import load_dotenv
+from pydantic import TypeAdapter
 import logging
 
 # Environment variables'ları yükle
 load_dotenv()
 
-from backend import models, schemas
-from .database import SessionLocal, engine
+from backend import models, schemas, catalog_events
+from .database import engine, async_engine, get_db, query_budget
 from .security import (
-    hash_password, verify_password, create_access_token, create_refresh_token,
-    get_current_user, get_current_admin_user, LoginAttemptTracker,
+    hash_password_async, verify_password_async, verify_and_update_password_async, create_access_token, create_refresh_token,
+    get_current_user, get_current_admin_user, get_current_user_record, TokenUser, authenticate_token,
+    user_token_claims, bump_token_version, publish_token_version, LoginAttemptTracker,
     SecurityAuditLogger, validate_file_upload, sanitize_input, validate_sql_input,
     PasswordValidator, limiter, verify_token, blacklist_token, cleanup_expired_blacklisted_tokens,
     get_token_jti, rate_limit_handler
 )
 from .middleware import setup_cors, setup_security_middleware
+from .pagination import apply_keyset, paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from .catalog_cache import catalog_cache, etag_matches
+from .token_revocation import revocation_store
+from .password_hashing import password_hash_pool
+from .redis_client import close_redis
+from .audit_log import audit_log_writer
+from .loop_monitor import LoopMonitorMiddleware, loop_monitor
+from .server_timing import TimedRoute, timed
+from .metrics import MetricsMiddleware, metrics_access_allowed, render_metrics, shutdown_metrics
+from .websocket_manager import manager, resolve_topics, user_orders_topic, ADMIN_TOPIC, ALL_ORDERS_TOPIC
+from .catalog_events import catalog_notifier
 
 # Logging yapılandırması
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +50,58 @@ logger = logging.getLogger(__name__)
 # --- Veritabanı ve Statik Dosya Yapılandırması ---
 models.Base.metadata.create_all(bind=engine)
 
+
+# Token sürümlerinden önce oluşturulmuş veritabanlarına eklenecek kolonlar
+_UPGRADE_COLUMNS = (models.User.__table__.c.token_version,)
+
+
+def _upgrade_schema(conn):
+    """
+    Önceki sürümle oluşturulmuş veritabanları için tek seferlik yükseltme
+
+    create_all mevcut tablolara kolon ve index eklemez. Burada sadece
+    users.token_version kolonu ve modellerde tanımlı eksik index'ler
+    oluşturulur; başka şema değişiklikleri için migration yazılmalıdır.
+    Kolon tanımı (DEFAULT dahil) create_all ile aynı şekilde dialect
+    üzerinden üretilir. Birden fazla worker aynı anda açılabilir: her
+    değişiklik kendi savepoint'inde çalışır ve başka worker'ın zaten eklediği
+    kolon/index atlanır.
+    """
+    inspector = inspect(conn)
+    ddl = conn.dialect.ddl_compiler(conn.dialect, None)
+    for column in _UPGRADE_COLUMNS:
+        table = column.table
+        if column.name in {c["name"] for c in inspector.get_columns(table.name)}:
+            continue
+        _apply_schema_change(conn, text(
+            f"ALTER TABLE {ddl.preparer.format_table(table)} "
+            f"ADD COLUMN {ddl.get_column_specification(column)}"
+        ), f"{table.name}.{column.name}")
+
+    for table in models.Base.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                _apply_schema_change(conn, CreateIndex(index), index.name)
+
+
+def _apply_schema_change(conn, statement, name: str):
+    try:
+        with conn.begin_nested():
+            conn.execute(statement)
+        logger.info(f"Şema güncellendi: {name}")
+    except (OperationalError, ProgrammingError) as e:
+        # Başka bir worker aynı anda ekledi
+        if "duplicate" not in str(e).lower() and "already exists" not in str(e).lower():
+            raise
+        logger.info(f"Şema değişikliği zaten uygulanmış: {name}")
+
+
+async def upgrade_schema():
+    """Açılışta tek transaction içinde şema farklarını uygular (lifespan)"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(_upgrade_schema)
+
 async def periodic_blacklist_cleanup():
     """Blacklist temizliğini periyodik olarak yapar"""
     while True:
@@ -39,7 +109,7 @@ async def periodic_blacklist_cleanup():
             # Her 24 saatte bir temizlik yap
             await asyncio.sleep(24 * 60 * 60)  # 24 saat
             
-            cleaned_count = cleanup_expired_blacklisted_tokens()
+            cleaned_count = await cleanup_expired_blacklisted_tokens()
             if cleaned_count > 0:
                 logger.info(f"Otomatik blacklist temizliği: {cleaned_count} token temizlendi")
         except Exception as e:
@@ -49,6 +119,11 @@ async def periodic_blacklist_cleanup():
 async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
     """Uygulama yaşam döngüsü yöneticisi"""
     # Startup
+    await upgrade_schema()
+    await revocation_store.start()
+    await audit_log_writer.start()
+    await loop_monitor.start()
+    await manager.start()
     cleanup_task = asyncio.create_task(periodic_blacklist_cleanup())
     logger.info("Otomatik blacklist temizliği başlatıldı")
     
@@ -62,6 +137,18 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
         except asyncio.CancelledError:
             pass
         logger.info("Otomatik blacklist temizliği durduruldu")
+        await loop_monitor.stop()
+        # Bekleyen katalog olaylarını bağlantılar kapanmadan gönder
+        await catalog_notifier.stop()
+        await manager.close()
+        await catalog_cache.close()
+        await revocation_store.stop()
+        # Kuyruktaki audit olaylarını Redis ve veritabanı kapanmadan yaz
+        await audit_log_writer.stop()
+        await close_redis()
+        await async_engine.dispose()
+        password_hash_pool.shutdown()
+        shutdown_metrics()
 
 app = FastAPI(
     title="E-Ticaret API",
@@ -71,10 +158,16 @@ app = FastAPI(
     redoc_url="/redoc" if os.getenv("ENVIRONMENT") != "production" else None,
     lifespan=lifespan
 )
+# Endpoint ve serileştirme süreleri Server-Timing başlığına eklenir
+app.router.route_class = TimedRoute
 
 # Güvenlik middleware'lerini ekle
 setup_cors(app)
 setup_security_middleware(app)
+# Event loop blokajları çalışan isteğin route'una bağlanır
+app.add_middleware(LoopMonitorMiddleware)
+# En dışta: diğer middleware'lerin süresi de ölçülsün
+app.add_middleware(MetricsMiddleware)
 
 # Rate limiting'i ekle
 app.state.limiter = limiter
@@ -89,48 +182,87 @@ if not os.path.exists("static"):
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
-# --- Dependency (Veritabanı Oturumu) ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-# --- YENİ: WebSocket Bağlantı Yöneticisi ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+# --- YENİ: WebSocket Endpoint'i ---
+async def handle_subscription_message(websocket: WebSocket, text: str):
+    """
+    İstemcinin abonelik isteğini işler
 
-# Yöneticiyi global olarak oluştur
-manager = ConnectionManager()
+    {"action": "subscribe" | "unsubscribe", "topics": [...], "token": "..."}
+    token sadece orders/admin konuları için gerekir; doğrulanan kullanıcı
+    bağlantıda saklanır ve sonraki isteklerde token tekrar gönderilmez.
+    Token'ın iptali ve sürümü her özel konu teslimatında yeniden denetlenir.
+    """
+    try:
+        request = json.loads(text)
+    except ValueError:
+        request = None
+    if not isinstance(request, dict) or request.get("action") not in ("subscribe", "unsubscribe"):
+        # Eski istemcilerin düz metin mesajları yok sayılır
+        return
+    topics = request.get("topics")
+    if not isinstance(topics, list):
+        manager.send(websocket, {"type": "error", "detail": "topics bir liste olmalı"})
+        return
+
+    user = manager.get_user(websocket)
+    token = request.get("token")
+    if token:
+        try:
+            user, claims = await authenticate_token(str(token))
+        except HTTPException as e:
+            manager.send(websocket, {"type": "error", "detail": e.detail, "reauthenticate": True})
+            return
+        manager.set_user(websocket, user, claims.get("jti"), float(claims.get("exp", 0)))
+
+    allowed, denied = resolve_topics(topics, user)
+    if request["action"] == "subscribe":
+        current = manager.subscribe(websocket, allowed)
+    else:
+        current = manager.unsubscribe(websocket, allowed)
+    if denied:
+        manager.send(websocket, {"type": "error", "detail": "Bu konulara abone olunamaz", "topics": denied})
+    manager.send(websocket, {"type": "subscribed", "topics": current})
 
 
-# --- YENİ: WebSocket Endpoint'i ---
 @app.websocket("/ws/products_updates")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            # İstemciden gelebilecek mesajları dinle (şimdilik kullanmıyoruz)
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            # Abonelik istekleri (bkz. backend/websocket_manager.py)
+            await handle_subscription_message(websocket, await websocket.receive_text())
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: bağlantı sunucu tarafından kapatıldı (yavaş istemci)
+        pass
+    finally:
         manager.disconnect(websocket)
 
 
 
+# --- Katalog önbelleği yardımcıları ---
+
+_product_list_adapter = TypeAdapter(List[schemas.Product])
+_category_list_adapter = TypeAdapter(List[schemas.Category])
+
+
+async def _catalog_response(request: Request, name: str, loader) -> Response:
+    """
+    Katalog sayfasını önbellekten, ETag ve 304 desteğiyle döndürür
+
+    ETag katalog sürümüdür; istemcinin elindeki sürüm güncelse sayfa hiç
+    yüklenmeden gövdesiz 304 döner.
+    """
+    version = await catalog_cache.get_version()
+    headers = {"ETag": catalog_cache.etag(version), "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body, next_cursor = await catalog_cache.get_or_load(name, loader, version=version)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 # --- API UÇ NOKTALARI ---
 
 # Güvenli resim yükleme endpoint'i
@@ -139,7 +271,7 @@ async def websocket_endpoint(websocket: WebSocket):
 async def upload_image(
     request: Request,
     file: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     try:
         # Dosya içeriğini oku
@@ -182,8 +314,8 @@ async def upload_image(
 async def create_product(
     request: Request,
     product: schemas.ProductCreate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ): 
     # Girdi sanitizasyonu
     product.name = sanitize_input(product.name)
@@ -207,8 +339,8 @@ async def create_product(
     
     db_product = models.Product(**product.model_dump())
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    await db.commit()
+    await db.refresh(db_product)
     
     # Güvenlik logu - ürün oluşturma
     SecurityAuditLogger.log_security_event(
@@ -224,33 +356,53 @@ async def create_product(
     )
     
     # BİLDİRİM GÖNDER
-    await manager.broadcast("products_updated")
+    await catalog_cache.invalidate()
+    catalog_notifier.submit(catalog_events.product_created(db_product))
     return db_product
 
 
 @app.get("/products/", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    products = db.query(models.Product).offset(skip).limit(limit).all()
-    return products
+async def read_products(
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    async def load_page():
+        query = apply_keyset(select(models.Product), (models.Product.id,), cursor, limit, descending=False, skip=skip)
+        result = await db.execute(query)
+        products, next_cursor = paginate(result.scalars().all(), limit, key=lambda p: (p.id,))
+        with timed("serialize"):
+            products = _product_list_adapter.validate_python(products, from_attributes=True)
+            body = _product_list_adapter.dump_json(products)
+        return body, next_cursor
+
+    return await _catalog_response(request, f"products:{cursor}:{limit}:{skip}", load_page)
 
 
 @app.get("/products/{product_id}", response_model=schemas.Product)
-def read_product(product_id: int, db: Session = Depends(get_db)):
-    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if db_product is None:
-        raise HTTPException(status_code=404, detail="Ürün bulunamadı")
-    return db_product
+async def read_product(request: Request, product_id: int, db: AsyncSession = Depends(get_db)):
+    async def load_product():
+        db_product = await db.scalar(select(models.Product).where(models.Product.id == product_id))
+        if db_product is None:
+            raise HTTPException(status_code=404, detail="Ürün bulunamadı")
+        with timed("serialize"):
+            body = schemas.Product.model_validate(db_product).model_dump_json().encode()
+        return body, None
+
+    return await _catalog_response(request, f"product:{product_id}", load_product)
 
 
 @app.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     request: Request,
     product_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     # Önce silinecek ürünü veritabanında bul
-    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    db_product = await db.scalar(select(models.Product).where(models.Product.id == product_id))
     if db_product is None:
         # Ürün yoksa hata döndür
         raise HTTPException(status_code=404, detail="Ürün bulunamadı")
@@ -269,11 +421,12 @@ async def delete_product(
     )
 
     # Ürünü veritabanından sil
-    db.delete(db_product)
-    db.commit()
+    await db.delete(db_product)
+    await db.commit()
 
     # BİLDİRİM GÖNDER
-    await manager.broadcast("products_updated")
+    await catalog_cache.invalidate()
+    catalog_notifier.submit(catalog_events.product_deleted(db_product))
 
     # Başarılı silme işleminde genellikle boş bir yanıt döneriz.
     # status_code=204, "İşlem başarılı ama döndürecek bir içerik yok" demektir.
@@ -285,11 +438,11 @@ async def update_product(
     request: Request,
     product_id: int, 
     product: schemas.ProductUpdate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     # Önce güncellenecek ürünü veritabanında bul
-    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    db_product = await db.scalar(select(models.Product).where(models.Product.id == product_id))
     if db_product is None:
         # Ürün yoksa hata döndür
         raise HTTPException(status_code=404, detail="Ürün bulunamadı")
@@ -311,8 +464,8 @@ async def update_product(
         setattr(db_product, key, value)
 
     db.add(db_product)  # Oturuma ekle (SQLAlchemy değişikliği anlar)
-    db.commit()  # Değişiklikleri veritabanına kaydet
-    db.refresh(db_product)  # Güncellenmiş veriyi veritabanından yeniden al
+    await db.commit()  # Değişiklikleri veritabanına kaydet
+    await db.refresh(db_product)  # Güncellenmiş veriyi veritabanından yeniden al
 
     # Güvenlik logu - ürün güncelleme
     SecurityAuditLogger.log_security_event(
@@ -328,7 +481,12 @@ async def update_product(
     )
 
     # BİLDİRİM GÖNDER GÜNCELLENDİ BİLDİRİMİ
-    await manager.broadcast("products_updated")
+    await catalog_cache.invalidate()
+    if update_data:
+        catalog_notifier.submit(
+            catalog_events.product_updated(db_product, update_data.keys()),
+            previous_category_id=old_values["category_id"]
+        )
 
     return db_product
 
@@ -338,7 +496,7 @@ async def update_product(
 async def register_user(
     request: Request,
     user: schemas.UserCreate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Kullanıcı kaydı başlat - SADECE doğrulama kodu gönderir, veritabanına kaydetmez!
@@ -371,10 +529,10 @@ async def register_user(
     
     # E-postanın aynı is_admin değeri ile zaten kayıtlı olup olmadığını kontrol et
     is_admin = getattr(user, 'is_admin', False)  # UserCreate'den is_admin al
-    db_user = db.query(models.User).filter(
+    db_user = await db.scalar(select(models.User).where(
         models.User.email == user.email,
         models.User.is_admin == is_admin
-    ).first()
+    ))
     if db_user:
         admin_type = "admin" if is_admin else "kullanıcı"
         SecurityAuditLogger.log_security_event(
@@ -394,7 +552,7 @@ async def register_user(
         )
 
     # Güvenli şifre hashleme
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
 
     # 6 haneli doğrulama kodu oluştur
     verification_code = email_service.generate_verification_token(user.email)
@@ -413,7 +571,7 @@ async def register_user(
     )
     
     # Geçici kayıt listesine ekle
-    pending_registration_manager.add_registration(pending_registration)
+    await pending_registration_manager.add_registration(pending_registration)
     
     # E-mail doğrulama e-postası gönder
     user_name = f"{user.first_name} {user.last_name}"
@@ -445,7 +603,7 @@ async def register_user(
 async def login_user(
     request: Request,
     user_login: schemas.UserLogin, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Girdi sanitizasyonu ve doğrulaması
     user_login.email = sanitize_input(user_login.email.lower())
@@ -460,8 +618,9 @@ async def login_user(
         )
         raise HTTPException(status_code=400, detail="Geçersiz karakter kullanımı tespit edildi.")
     
-    # Hesap kilitleme kontrolü
-    if LoginAttemptTracker.is_locked(user_login.email):
+    # Hesap kilitleme kontrolü (deneme şifre doğrulanmadan önce atomik olarak sayılır)
+    locked, _ = await LoginAttemptTracker.check_and_increment(user_login.email)
+    if locked:
         SecurityAuditLogger.log_security_event(
             "login_attempt_locked_account",
             None,
@@ -474,12 +633,11 @@ async def login_user(
         )
     
     # Kullanıcıyı e-posta ve is_admin ile bul
-    db_user = db.query(models.User).filter(
+    db_user = await db.scalar(select(models.User).where(
         models.User.email == user_login.email,
         models.User.is_admin == user_login.is_admin
-    ).first()
+    ))
     if not db_user:
-        LoginAttemptTracker.record_failed_attempt(user_login.email)
         user_type = "admin" if user_login.is_admin else "kullanıcı"
         SecurityAuditLogger.log_security_event(
             "login_failed_user_not_found",
@@ -489,9 +647,11 @@ async def login_user(
         )
         raise HTTPException(status_code=401, detail=f"Geçersiz {user_type} kullanıcı adı/şifre")
     
-    # Şifre kontrolü
-    if not verify_password(user_login.password, db_user.hashed_password):
-        LoginAttemptTracker.record_failed_attempt(user_login.email)
+    # Şifre kontrolü (hash eski ayarlardaysa yeni hash de döner)
+    password_valid, new_password_hash = await verify_and_update_password_async(
+        user_login.password, db_user.hashed_password
+    )
+    if not password_valid:
         SecurityAuditLogger.log_security_event(
             "login_failed_wrong_password",
             db_user.id,
@@ -500,6 +660,9 @@ async def login_user(
         )
         raise HTTPException(status_code=401, detail="Geçersiz kullanıcı adı/şifre")
     
+    # Şifre doğru - giriş denemelerini temizle (yanıt beklemez)
+    LoginAttemptTracker.clear_attempts_in_background(user_login.email)
+    
     # E-mail doğrulama kontrolü
     if db_user.is_verified is False:
         SecurityAuditLogger.log_security_event(
@@ -522,17 +685,18 @@ async def login_user(
         )
         raise HTTPException(status_code=401, detail="Hesabınız aktif değil.")
     
-    # Başarılı giriş - giriş denemelerini temizle
-    LoginAttemptTracker.clear_attempts(user_login.email)
+    # Hash algoritması/maliyeti değiştiyse şifreyi yeni ayarlarla sakla
+    if new_password_hash:
+        db_user.hashed_password = new_password_hash
     
     # Son giriş bilgilerini güncelle
     db_user.last_login = datetime.now()
     db_user.last_login_ip = request.client.host
-    db.commit()
+    await db.commit()
     
     # JWT token'ları oluştur
-    access_token = create_access_token(data={"sub": str(db_user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(db_user.id)})
+    access_token = create_access_token(data=user_token_claims(db_user))
+    refresh_token = create_refresh_token(data=user_token_claims(db_user))
     
     # Access token'dan JTI'yi çıkar (güvenlik için)
     access_jti = get_token_jti(access_token)
@@ -550,7 +714,7 @@ async def login_user(
         expires_at=session_expires
     )
     db.add(db_session)
-    db.commit()
+    await db.commit()
     
     # Güvenlik logu
     SecurityAuditLogger.log_security_event(
@@ -576,7 +740,7 @@ async def login_user(
 async def refresh_access_token(
     request: Request,
     refresh_request: schemas.RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Refresh token'ı doğrula
     payload = verify_token(refresh_request.refresh_token, "refresh")
@@ -594,11 +758,11 @@ async def refresh_access_token(
         )
     
     # Veritabanında refresh token'ı kontrol et
-    db_session = db.query(models.UserSession).filter(
+    db_session = await db.scalar(select(models.UserSession).where(
         models.UserSession.refresh_token == refresh_request.refresh_token,
         models.UserSession.is_active.is_(True),
         models.UserSession.expires_at > datetime.now()
-    ).first()
+    ))
     
     if not db_session:
         raise HTTPException(
@@ -607,20 +771,27 @@ async def refresh_access_token(
         )
     
     # Kullanıcıyı kontrol et
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user or user.is_active is False:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Kullanıcı bulunamadı veya aktif değil"
         )
     
+    # Şifre değişimi veya admin iptalinden önce verilmiş refresh token'lar geçersiz
+    if payload.get("ver") != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Geçersiz refresh token"
+        )
+    
     # Yeni access token oluştur
-    new_access_token = create_access_token(data={"sub": str(user.id)})
+    new_access_token = create_access_token(data=user_token_claims(user))
     
     # Session'ı güncelle
     db_session.last_activity = datetime.now()
     db_session.session_token = new_access_token[:50]
-    db.commit()
+    await db.commit()
     
     # Güvenlik logu
     SecurityAuditLogger.log_security_event(
@@ -641,8 +812,8 @@ async def refresh_access_token(
 async def logout_user(
     request: Request,
     logout_request: schemas.LogoutRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_user)
 ):
     # Access token'ı blacklist'e ekle
     access_token = None
@@ -650,23 +821,23 @@ async def logout_user(
         auth_header = request.headers.get('authorization', '')
         if auth_header.startswith('Bearer '):
             access_token = auth_header[7:]  # "Bearer " kısmını çıkar
-            blacklist_token(access_token, current_user.id, "logout")
+            await blacklist_token(access_token, current_user.id, "logout")
     
     # Refresh token'ı devre dışı bırak
     refresh_blacklisted = False
     if logout_request.refresh_token:
         # Refresh token'ı da blacklist'e ekle
-        blacklist_token(logout_request.refresh_token, current_user.id, "logout")
+        await blacklist_token(logout_request.refresh_token, current_user.id, "logout")
         
         # UserSession'ı da devre dışı bırak
-        db_session = db.query(models.UserSession).filter(
+        db_session = await db.scalar(select(models.UserSession).where(
             models.UserSession.refresh_token == logout_request.refresh_token,
             models.UserSession.user_id == current_user.id
-        ).first()
+        ))
         
         if db_session:
             db_session.is_active = False
-            db.commit()
+            await db.commit()
             refresh_blacklisted = True
     
     # Güvenlik logu
@@ -689,20 +860,21 @@ async def logout_user(
 async def create_user(
     request: Request,
     user: schemas.UserCreate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     return await register_user(request, user, db)
 
 # Kullanıcı listesi (Admin için)
 @app.get("/users/", response_model=List[schemas.User])
-def get_users(
+async def get_users(
     request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
-    users = db.query(models.User).offset(skip).limit(limit).all()
+    result = await db.execute(select(models.User).offset(skip).limit(limit))
+    users = result.scalars().all()
     
     # Güvenlik logu - kullanıcı listesi görüntüleme
     SecurityAuditLogger.log_security_event(
@@ -716,10 +888,10 @@ def get_users(
 
 # E-mail doğrulama endpoint'i (6 haneli kod ile)
 @app.post("/users/verify-email", response_model=schemas.EmailVerificationResponse)
-def verify_email(
+async def verify_email(
     verification_data: schemas.EmailVerificationRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Doğrulama kodunu kontrol et ve kullanıcıyı VERİTABANINA KAYDET
@@ -731,7 +903,7 @@ def verify_email(
     is_admin = getattr(verification_data, 'is_admin', False)
     
     # Bekleyen kaydı bul ve doğrula
-    pending_registration = pending_registration_manager.verify_and_remove(
+    pending_registration = await pending_registration_manager.verify_and_remove(
         verification_data.email,
         verification_data.code,
         is_admin=is_admin
@@ -744,10 +916,10 @@ def verify_email(
         )
     
     # E-postanın aynı is_admin değeri ile zaten kayıtlı olup olmadığını kontrol et (güvenlik için)
-    db_user = db.query(models.User).filter(
+    db_user = await db.scalar(select(models.User).where(
         models.User.email == pending_registration.email,
         models.User.is_admin == pending_registration.is_admin
-    ).first()
+    ))
     if db_user:
         user_type = "admin" if pending_registration.is_admin else "kullanıcı"
         raise HTTPException(status_code=400, detail=f"Bu e-posta adresi zaten {user_type} olarak kayıtlı.")
@@ -768,8 +940,8 @@ def verify_email(
         created_by_ip=pending_registration.created_by_ip
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Güvenlik logu
     user_type = "admin" if pending_registration.is_admin else "user"
@@ -789,7 +961,7 @@ def verify_email(
 
 # E-mail doğrulama e-postası yeniden gönderme
 @app.post("/resend-verification", response_model=schemas.ResendVerificationResponse)
-def resend_verification_email(email: str, db: Session = Depends(get_db)):
+async def resend_verification_email(email: str, db: AsyncSession = Depends(get_db)):
     """
     Doğrulama kodunu yeniden gönder
     Bekleyen kayıtlar için yeni kod oluşturur
@@ -800,14 +972,14 @@ def resend_verification_email(email: str, db: Session = Depends(get_db)):
     email_service = EmailService()
     
     # Önce bekleyen kayıtlarda ara
-    pending_registration = pending_registration_manager.get_registration(email)
+    pending_registration = await pending_registration_manager.get_registration(email)
     
     if pending_registration:
         # Yeni doğrulama kodu oluştur
         new_code = email_service.generate_verification_token(email)
         
         # Redis'te bekleyen kaydı güncelle (TTL'i de sıfırlar)
-        update_success = pending_registration_manager.update_verification_code(email, new_code)
+        update_success = await pending_registration_manager.update_verification_code(email, new_code)
         
         if not update_success:
             raise HTTPException(status_code=500, detail="Doğrulama kodu güncellenemedi.")
@@ -829,7 +1001,7 @@ def resend_verification_email(email: str, db: Session = Depends(get_db)):
             raise HTTPException(status_code=500, detail="E-posta gönderilemedi.")
     
     # Veritabanında kayıtlı ama doğrulanmamış kullanıcı var mı kontrol et
-    db_user = db.query(models.User).filter(models.User.email == email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == email))
     if db_user:
         if db_user.is_verified:
             return schemas.ResendVerificationResponse(
@@ -846,33 +1018,68 @@ def resend_verification_email(email: str, db: Session = Depends(get_db)):
 
 # --- Sipariş Oluşturma Endpoint'i ---
 @app.post("/orders/", response_model=schemas.Order)
-def create_order(
+async def create_order(
     order: schemas.OrderCreate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_user)
 ):
     # Giriş yapmış kullanıcının ID'sini kullan
     owner_id = current_user.id
 
+    # Aynı ürün birden fazla satırda gelebilir; miktarları ürün bazında topla
+    requested_quantities: dict[int, int] = {}
+    for item_data in order.items:
+        requested_quantities[item_data.product_id] = (
+            requested_quantities.get(item_data.product_id, 0) + item_data.quantity
+        )
+
+    # Tüm ürünlerin güncel fiyatlarını tek bir IN sorgusuyla al
+    result = await db.execute(
+        select(models.Product.id, models.Product.price).where(
+            models.Product.id.in_(requested_quantities.keys())
+        )
+    )
+    prices = {product_id: price for product_id, price in result.all()}
+
+    for product_id in requested_quantities:
+        if product_id not in prices:
+            raise HTTPException(status_code=404, detail=f"ID: {product_id} olan ürün bulunamadı.")
+
+    # Stokları koşullu UPDATE ile ayır: stok yetersizse satır güncellenmez.
+    # Eşzamanlı siparişlerde fazla satışı önler; ID sırası kilit sırasını sabitler.
+    # RETURNING yeni stok miktarını mağazalara bildirmek için döndürür.
+    stock_levels: dict[int, tuple] = {}
+    for product_id in sorted(requested_quantities):
+        quantity = requested_quantities[product_id]
+        reserved = await db.execute(
+            update(models.Product)
+            .where(
+                models.Product.id == product_id,
+                models.Product.stock_quantity >= quantity
+            )
+            .values(stock_quantity=models.Product.stock_quantity - quantity)
+            .returning(models.Product.stock_quantity, models.Product.category_id)
+            .execution_options(synchronize_session=False)
+        )
+        remaining = reserved.one_or_none()
+        if remaining is None:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=f"ID: {product_id} olan ürün için yetersiz stok.")
+        stock_levels[product_id] = tuple(remaining)
+
     total_price = 0
     order_items_to_create = []
 
     for item_data in order.items:
-        # Ürünün güncel fiyatını veritabanından kontrol et
-        product = db.query(models.Product).filter(models.Product.id == item_data.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"ID: {item_data.product_id} olan ürün bulunamadı.")
-
-        price_for_this_item = product.price * item_data.quantity
-        total_price += price_for_this_item
+        price = prices[item_data.product_id]
+        total_price += price * item_data.quantity
 
         # Veritabanına kaydedilecek OrderItem nesnesini oluştur
-        db_order_item = models.OrderItem(
+        order_items_to_create.append(models.OrderItem(
             product_id=item_data.product_id,
             quantity=item_data.quantity,
-            price_per_item=product.price
-        )
-        order_items_to_create.append(db_order_item)
+            price_per_item=price
+        ))
 
     # Ana sipariş nesnesini oluştur
     db_order = models.Order(
@@ -880,23 +1087,67 @@ def create_order(
         total_price=total_price,
         items=order_items_to_create
     )
-
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    await db.flush()
+
+    # Stok çıkış hareketlerini toplu olarak yaz
+    await db.execute(
+        insert(models.StockMovement),
+        [
+            {
+                "product_id": product_id,
+                "movement_type": "exit",
+                "quantity": quantity,
+                "description": f"Sipariş - ID: {db_order.id}",
+                "reference": f"ORDER-{db_order.id}",
+                "created_by": owner_id,
+                "created_at": db_order.created_date,
+            }
+            for product_id, quantity in requested_quantities.items()
+        ]
+    )
+
+    await db.commit()
+
+    # Stok miktarları değişti, mağazaları bilgilendir
+    await catalog_cache.invalidate()
+    for product_id, (remaining, category_id) in stock_levels.items():
+        catalog_notifier.submit(catalog_events.stock_changed(product_id, remaining, category_id))
     return db_order
 
 
+# Listeleme endpoint'lerinin istek başına sorgu bütçeleri.
+# Kimlik doğrulama en fazla 1 sorgu (önbellekte olmayan token sürümü), sayfa 1 sorgu, ilişkiler
+# ilişki başına 1 sorgu. Sayfa boyutu ne olursa olsun sabit kalmalıdır.
+ORDER_LIST_QUERY_BUDGET = 3
+STOCK_MOVEMENT_LIST_QUERY_BUDGET = 2
+PURCHASE_LIST_QUERY_BUDGET = 4
+
 # --- Siparişleri Listeleme Endpoint'i (Admin için) ---
-@app.get("/orders/", response_model=list[schemas.Order])
-def read_orders(
+@app.get(
+    "/orders/",
+    response_model=list[schemas.Order],
+    dependencies=[Depends(query_budget(ORDER_LIST_QUERY_BUDGET))]
+)
+async def read_orders(
     request: Request,
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
-    orders = db.query(models.Order).offset(skip).limit(limit).all()
+    query = apply_keyset(
+        select(models.Order).options(selectinload(models.Order.items)),
+        (models.Order.created_date, models.Order.id), cursor, limit, skip=skip
+    )
+    result = await db.execute(query)
+    orders, _ = paginate(
+        result.scalars().all(), limit,
+        key=lambda order: (order.created_date, order.id),
+        response=response
+    )
     
     # Güvenlik logu - sipariş listesi görüntüleme
     SecurityAuditLogger.log_security_event(
@@ -908,14 +1159,52 @@ def read_orders(
     
     return orders
 
+# --- Kullanıcının Kendi Siparişleri ---
+@app.get(
+    "/users/me/orders",
+    response_model=list[schemas.Order],
+    dependencies=[Depends(query_budget(ORDER_LIST_QUERY_BUDGET))]
+)
+async def read_my_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_user)
+):
+    """
+    Giriş yapmış kullanıcının siparişleri (en yeni önce)
+
+    ix_orders_owner_id_created_date index'i üzerinde keyset sayfalama yapar.
+    Sonraki sayfa için X-Next-Cursor başlığındaki imleç cursor parametresiyle gönderilir.
+    """
+    query = select(models.Order).options(selectinload(models.Order.items)).where(
+        models.Order.owner_id == current_user.id
+    )
+    query = apply_keyset(query, (models.Order.created_date, models.Order.id), cursor, limit)
+    result = await db.execute(query)
+
+    orders, _ = paginate(
+        result.scalars().all(), limit,
+        key=lambda order: (order.created_date, order.id),
+        response=response
+    )
+    return orders
+
 # --- Tek Sipariş Getirme Endpoint'i ---
-@app.get("/orders/{order_id}", response_model=schemas.Order)
-def read_order(
+@app.get(
+    "/orders/{order_id}",
+    response_model=schemas.Order,
+    dependencies=[Depends(query_budget(ORDER_LIST_QUERY_BUDGET))]
+)
+async def read_order(
     order_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_user)
 ):
-    db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    db_order = await db.scalar(
+        select(models.Order).options(selectinload(models.Order.items)).where(models.Order.id == order_id)
+    )
     if db_order is None:
         raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
     
@@ -931,10 +1220,12 @@ async def update_order(
     request: Request,
     order_id: int, 
     order_update: schemas.OrderStatusUpdate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
-    db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    db_order = await db.scalar(
+        select(models.Order).options(selectinload(models.Order.items)).where(models.Order.id == order_id)
+    )
     if db_order is None:
         raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
     
@@ -952,8 +1243,18 @@ async def update_order(
         db_order.notes = order_update.notes
     
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    await db.commit()
+    await db.refresh(db_order, attribute_names=["status", "notes", "updated_at", "items"])
+
+    # Müşteriye durum değişikliğini bildir (siparişler sayfası yoklama yapmaz)
+    await manager.publish({
+        "type": "order_status_changed",
+        "order_id": db_order.id,
+        "status": db_order.status,
+        "old_status": old_status,
+        "notes": db_order.notes,
+        "updated_at": db_order.updated_at.isoformat() if db_order.updated_at else None,
+    }, [user_orders_topic(db_order.owner_id), ALL_ORDERS_TOPIC])
     
     # Güvenlik logu - sipariş durumu güncelleme
     SecurityAuditLogger.log_security_event(
@@ -976,18 +1277,19 @@ async def update_order(
 async def create_category(
     request: Request,
     category: schemas.CategoryCreate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     # Aynı isimde kategori var mı kontrol et
-    db_category = db.query(models.Category).filter(models.Category.name == category.name).first()
+    db_category = await db.scalar(select(models.Category).where(models.Category.name == category.name))
     if db_category:
         raise HTTPException(status_code=400, detail="Bu isimde bir kategori zaten mevcut")
     
     db_category = models.Category(**category.model_dump())
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    await db.commit()
+    await db.refresh(db_category)
+    await catalog_cache.invalidate()
     
     # Güvenlik logu - kategori oluşturma
     SecurityAuditLogger.log_security_event(
@@ -1000,13 +1302,27 @@ async def create_category(
     return db_category
 
 @app.get("/categories/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    categories = db.query(models.Category).offset(skip).limit(limit).all()
-    return categories
+async def read_categories(
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    async def load_page():
+        query = apply_keyset(select(models.Category), (models.Category.id,), cursor, limit, descending=False, skip=skip)
+        result = await db.execute(query)
+        categories, next_cursor = paginate(result.scalars().all(), limit, key=lambda c: (c.id,))
+        with timed("serialize"):
+            categories = _category_list_adapter.validate_python(categories, from_attributes=True)
+            body = _category_list_adapter.dump_json(categories)
+        return body, next_cursor
+
+    return await _catalog_response(request, f"categories:{cursor}:{limit}:{skip}", load_page)
 
 @app.get("/categories/{category_id}", response_model=schemas.Category)
-def read_category(category_id: int, db: Session = Depends(get_db)):
-    db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
+async def read_category(category_id: int, db: AsyncSession = Depends(get_db)):
+    db_category = await db.scalar(select(models.Category).where(models.Category.id == category_id))
     if db_category is None:
         raise HTTPException(status_code=404, detail="Kategori bulunamadı")
     return db_category
@@ -1016,18 +1332,18 @@ async def update_category(
     request: Request,
     category_id: int, 
     category: schemas.CategoryUpdate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
-    db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
+    db_category = await db.scalar(select(models.Category).where(models.Category.id == category_id))
     if db_category is None:
         raise HTTPException(status_code=404, detail="Kategori bulunamadı")
     
     # Aynı isimde başka kategori var mı kontrol et (kendisi hariç)
-    existing_category = db.query(models.Category).filter(
+    existing_category = await db.scalar(select(models.Category).where(
         models.Category.name == category.name,
         models.Category.id != category_id
-    ).first()
+    ))
     if existing_category:
         raise HTTPException(status_code=400, detail="Bu isimde bir kategori zaten mevcut")
     
@@ -1039,8 +1355,9 @@ async def update_category(
         setattr(db_category, key, value)
     
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    await db.commit()
+    await db.refresh(db_category)
+    await catalog_cache.invalidate()
     
     # Güvenlik logu - kategori güncelleme
     SecurityAuditLogger.log_security_event(
@@ -1060,15 +1377,17 @@ async def update_category(
 async def delete_category(
     request: Request,
     category_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
-    db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
+    db_category = await db.scalar(select(models.Category).where(models.Category.id == category_id))
     if db_category is None:
         raise HTTPException(status_code=404, detail="Kategori bulunamadı")
     
     # Bu kategoriye ait ürün var mı kontrol et
-    products_count = db.query(models.Product).filter(models.Product.category_id == category_id).count()
+    products_count = await db.scalar(
+        select(func.count(models.Product.id)).where(models.Product.category_id == category_id)
+    )
     if products_count > 0:
         raise HTTPException(status_code=400, detail=f"Bu kategoriye ait {products_count} ürün bulunuyor. Önce ürünleri başka kategoriye taşıyın veya silin.")
     
@@ -1080,8 +1399,9 @@ async def delete_category(
         request
     )
     
-    db.delete(db_category)
-    db.commit()
+    await db.delete(db_category)
+    await db.commit()
+    await catalog_cache.invalidate()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -1091,20 +1411,21 @@ async def delete_category(
 async def revoke_user_tokens(
     user_id: int,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Admin: Belirli bir kullanıcının tüm token'larını iptal eder"""
     # Kullanıcının var olup olmadığını kontrol et
-    target_user = db.query(models.User).filter(models.User.id == user_id).first()
+    target_user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not target_user:
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
     
     # Kullanıcının tüm aktif session'larını devre dışı bırak
-    active_sessions = db.query(models.UserSession).filter(
+    result = await db.execute(select(models.UserSession).where(
         models.UserSession.user_id == user_id,
         models.UserSession.is_active.is_(True)
-    ).all()
+    ))
+    active_sessions = result.scalars().all()
     
     revoked_count = 0
     for session in active_sessions:
@@ -1113,10 +1434,13 @@ async def revoke_user_tokens(
         
         # Refresh token'ı blacklist'e ekle
         if session.refresh_token:
-            blacklist_token(session.refresh_token, user_id, "admin_revoke")
+            await blacklist_token(session.refresh_token, user_id, "admin_revoke")
             revoked_count += 1
     
-    db.commit()
+    # Access token'lar da süresinin dolmasını beklemeden geçersiz olur
+    await bump_token_version(db, target_user)
+    await db.commit()
+    await publish_token_version(target_user)
     
     # Güvenlik logu
     SecurityAuditLogger.log_security_event(
@@ -1138,10 +1462,10 @@ async def revoke_user_tokens(
 @app.post("/admin/cleanup-blacklist")
 async def cleanup_blacklist(
     request: Request,
-    current_user: models.User = Depends(get_current_admin_user)
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Admin: Süresi dolmuş blacklist token'larını temizler"""
-    cleaned_count = cleanup_expired_blacklisted_tokens()
+    cleaned_count = await cleanup_expired_blacklisted_tokens()
     
     # Güvenlik logu
     SecurityAuditLogger.log_security_event(
@@ -1159,8 +1483,8 @@ async def cleanup_blacklist(
 @app.post("/auth/logout")
 async def logout_user(
     request: Request,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Kullanıcı çıkışı"""
     SecurityAuditLogger.log_security_event(
@@ -1175,12 +1499,12 @@ async def logout_user(
 async def change_password(
     request: Request,
     password_data: schemas.PasswordChange,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user_record),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Şifre değiştirme"""
+    """Şifre değiştirme (tüm oturumların token'ları geçersiz olur)"""
     # Mevcut şifreyi kontrol et
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.current_password, current_user.hashed_password):
         SecurityAuditLogger.log_security_event(
             "password_change_failed_wrong_current",
             current_user.id,
@@ -1190,9 +1514,11 @@ async def change_password(
         raise HTTPException(status_code=400, detail="Mevcut şifre yanlış")
     
     # Yeni şifreyi hashle ve kaydet
-    current_user.hashed_password = hash_password(password_data.new_password)
+    current_user.hashed_password = await hash_password_async(password_data.new_password)
     current_user.password_changed_at = datetime.now()
-    db.commit()
+    await bump_token_version(db, current_user)
+    await db.commit()
+    await publish_token_version(current_user)
     
     SecurityAuditLogger.log_security_event(
         "password_changed",
@@ -1208,7 +1534,7 @@ async def change_password(
 async def request_password_reset(
     request: Request,
     reset_request: schemas.PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Şifre sıfırlama isteği"""
     from .email_service import EmailService
@@ -1217,16 +1543,20 @@ async def request_password_reset(
     email_service = EmailService()
     
     # Kullanıcıyı bul
-    user = db.query(models.User).filter(models.User.email == reset_request.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == reset_request.email))
     if not user:
         # Güvenlik için her zaman başarılı mesajı döndür
         return {"message": "Eğer bu e-posta adresi kayıtlıysa, şifre sıfırlama linki gönderildi"}
     
     # Eski token'ları geçersiz kıl
-    db.query(models.PasswordResetToken).filter(
-        models.PasswordResetToken.user_id == user.id,
-        models.PasswordResetToken.is_used.is_(False)
-    ).update({"is_used": True})
+    await db.execute(
+        update(models.PasswordResetToken)
+        .where(
+            models.PasswordResetToken.user_id == user.id,
+            models.PasswordResetToken.is_used.is_(False)
+        )
+        .values(is_used=True)
+    )
     
     # Yeni token oluştur
     reset_token = secrets.token_urlsafe(32)
@@ -1238,7 +1568,7 @@ async def request_password_reset(
         expires_at=token_expires
     )
     db.add(db_token)
-    db.commit()
+    await db.commit()
     
     # E-posta gönder (implementasyon gerekli)
     # email_service.send_password_reset_email(user.email, reset_token)
@@ -1256,15 +1586,15 @@ async def request_password_reset(
 async def reset_password(
     request: Request,
     reset_data: schemas.PasswordReset,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Şifre sıfırlama"""
     # Token'ı kontrol et
-    db_token = db.query(models.PasswordResetToken).filter(
+    db_token = await db.scalar(select(models.PasswordResetToken).where(
         models.PasswordResetToken.token == reset_data.token,
         models.PasswordResetToken.is_used.is_(False),
         models.PasswordResetToken.expires_at > datetime.now()
-    ).first()
+    ))
     
     if not db_token:
         SecurityAuditLogger.log_security_event(
@@ -1276,19 +1606,21 @@ async def reset_password(
         raise HTTPException(status_code=400, detail="Geçersiz veya süresi dolmuş token")
     
     # Kullanıcıyı bul
-    user = db.query(models.User).filter(models.User.id == db_token.user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == db_token.user_id))
     if not user:
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
     
     # Şifreyi güncelle
-    user.hashed_password = hash_password(reset_data.new_password)
+    user.hashed_password = await hash_password_async(reset_data.new_password)
     user.password_changed_at = datetime.now()
+    await bump_token_version(db, user)
     
     # Token'ı kullanılmış olarak işaretle
     db_token.is_used = True
     db_token.used_at = datetime.now()
     
-    db.commit()
+    await db.commit()
+    await publish_token_version(user)
     
     SecurityAuditLogger.log_security_event(
         "password_reset_successful",
@@ -1300,21 +1632,26 @@ async def reset_password(
     return {"message": "Şifre başarıyla sıfırlandı"}
 
 @app.get("/auth/me", response_model=schemas.User)
-async def get_current_user_info(current_user: models.User = Depends(get_current_user)):
+async def get_current_user_info(current_user: models.User = Depends(get_current_user_record)):
     """Mevcut kullanıcı bilgilerini döndür"""
     return current_user
 
 @app.get("/admin/security-logs", response_model=List[schemas.SecurityLog])
 async def get_security_logs(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     _: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Güvenlik loglarını listele (Admin)"""
-    logs = db.query(models.SecurityLog).offset(skip).limit(limit).order_by(
-        models.SecurityLog.created_at.desc()
-    ).all()
+    query = apply_keyset(
+        select(models.SecurityLog),
+        (models.SecurityLog.created_at, models.SecurityLog.id), cursor, limit, skip=skip
+    )
+    result = await db.execute(query)
+    logs, _ = paginate(result.scalars().all(), limit, key=lambda log: (log.created_at, log.id), response=response)
     return logs
 
 @app.get("/admin/users", response_model=List[schemas.User])
@@ -1322,26 +1659,29 @@ async def get_all_users(
     skip: int = 0,
     limit: int = 100,
     _: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Tüm kullanıcıları listele (Admin)"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    result = await db.execute(select(models.User).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @app.put("/admin/users/{user_id}/toggle-active")
 async def toggle_user_active(
     user_id: int,
     request: Request,
-    current_user: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: TokenUser = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Kullanıcı aktiflik durumunu değiştir (Admin)"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
     
     user.is_active = not user.is_active
-    db.commit()
+    # Token'lardaki is_active claim'i eskidi
+    await bump_token_version(db, user)
+    await db.commit()
+    await publish_token_version(user)
     
     SecurityAuditLogger.log_security_event(
         "user_status_changed",
@@ -1355,25 +1695,38 @@ async def toggle_user_active(
 
 # --- STOK YÖNETİMİ ENDPOINT'LERİ ---
 
-@app.get("/stock/movements/")
+@app.get("/stock/movements/", dependencies=[Depends(query_budget(STOCK_MOVEMENT_LIST_QUERY_BUDGET))])
 async def get_stock_movements(
+    response: Response,
     product_id: Optional[int] = None,
     movement_type: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Stok hareketlerini listele (Admin)"""
-    query = db.query(models.StockMovement)
+    # Ürün adı aynı sorguda JOIN ile gelir (çoka-bir ilişki, satır çoğalmaz)
+    query = select(models.StockMovement).options(
+        joinedload(models.StockMovement.product).load_only(models.Product.name)
+    )
     
     # Filtreler
     if product_id:
-        query = query.filter(models.StockMovement.product_id == product_id)
+        query = query.where(models.StockMovement.product_id == product_id)
     if movement_type:
-        query = query.filter(models.StockMovement.movement_type == movement_type)
+        query = query.where(models.StockMovement.movement_type == movement_type)
     
-    movements = query.order_by(models.StockMovement.created_at.desc()).offset(skip).limit(limit).all()
+    query = apply_keyset(
+        query, (models.StockMovement.created_at, models.StockMovement.id), cursor, limit, skip=skip
+    )
+    result = await db.execute(query)
+    movements, _ = paginate(
+        result.scalars().all(), limit,
+        key=lambda movement: (movement.created_at, movement.id),
+        response=response
+    )
     
     # Ürün adlarını ekle
     result = []
@@ -1398,14 +1751,34 @@ async def get_stock_movements(
 async def create_stock_movement(
     request: Request,
     movement: schemas.StockMovementCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Yeni stok hareketi oluştur (Admin)"""
-    # Ürünü kontrol et
-    product = db.query(models.Product).filter(models.Product.id == movement.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Ürün bulunamadı")
+    # Ürün stok miktarını koşullu UPDATE ile değiştir (create_order ile aynı):
+    # eşzamanlı sipariş/hareketlerde azaltma kaybolmaz, stok eksiye düşmez
+    if movement.movement_type == "entry":
+        stock_update = update(models.Product).where(models.Product.id == movement.product_id).values(
+            stock_quantity=models.Product.stock_quantity + movement.quantity
+        )
+    else:
+        stock_update = update(models.Product).where(
+            models.Product.id == movement.product_id,
+            models.Product.stock_quantity >= movement.quantity
+        ).values(stock_quantity=models.Product.stock_quantity - movement.quantity)
+    result = await db.execute(
+        stock_update
+        .returning(models.Product.stock_quantity, models.Product.name, models.Product.category_id)
+        .execution_options(synchronize_session=False)
+    )
+    product = result.one_or_none()
+    if product is None:
+        exists = await db.scalar(select(models.Product.id).where(models.Product.id == movement.product_id))
+        await db.rollback()
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Ürün bulunamadı")
+        raise HTTPException(status_code=400, detail="Yetersiz stok")
+    stock_quantity, product_name, category_id = product
     
     # Stok hareketi oluştur
     db_movement = models.StockMovement(
@@ -1418,16 +1791,8 @@ async def create_stock_movement(
     )
     db.add(db_movement)
     
-    # Ürün stok miktarını güncelle
-    if movement.movement_type == "entry":
-        product.stock_quantity += movement.quantity
-    elif movement.movement_type == "exit":
-        if product.stock_quantity < movement.quantity:
-            raise HTTPException(status_code=400, detail="Yetersiz stok")
-        product.stock_quantity -= movement.quantity
-    
-    db.commit()
-    db.refresh(db_movement)
+    await db.commit()
+    await db.refresh(db_movement)
     
     # Güvenlik logu
     SecurityAuditLogger.log_security_event(
@@ -1443,12 +1808,13 @@ async def create_stock_movement(
     )
     
     # WebSocket bildirimi
-    await manager.broadcast("products_updated")
+    await catalog_cache.invalidate()
+    catalog_notifier.submit(catalog_events.stock_changed(movement.product_id, stock_quantity, category_id))
     
     return {
         "id": db_movement.id,
         "product_id": db_movement.product_id,
-        "product_name": product.name,
+        "product_name": product_name,
         "movement_type": db_movement.movement_type,
         "quantity": db_movement.quantity,
         "description": db_movement.description,
@@ -1461,42 +1827,42 @@ async def create_stock_movement(
 @app.get("/stock/low-stock/")
 async def get_low_stock_products(
     threshold: int = 10,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Düşük stoklu ürünleri listele (Admin)"""
-    products = db.query(models.Product).filter(
-        models.Product.stock_quantity <= threshold
-    ).order_by(models.Product.stock_quantity.asc()).all()
+    result = await db.execute(
+        select(models.Product).where(
+            models.Product.stock_quantity <= threshold
+        ).order_by(models.Product.stock_quantity.asc())
+    )
     
-    return products
+    return result.scalars().all()
 
 
 @app.get("/stock/summary/")
 async def get_stock_summary(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Stok özeti (Admin)"""
-    from sqlalchemy import func
-    
     # Toplam ürün sayısı
-    total_products = db.query(func.count(models.Product.id)).scalar()
+    total_products = await db.scalar(select(func.count(models.Product.id)))
     
     # Düşük stoklu ürün sayısı (10'dan az)
-    low_stock_count = db.query(func.count(models.Product.id)).filter(
+    low_stock_count = await db.scalar(select(func.count(models.Product.id)).where(
         models.Product.stock_quantity <= 10
-    ).scalar()
+    ))
     
     # Stokta olmayan ürün sayısı
-    out_of_stock_count = db.query(func.count(models.Product.id)).filter(
+    out_of_stock_count = await db.scalar(select(func.count(models.Product.id)).where(
         models.Product.stock_quantity == 0
-    ).scalar()
+    ))
     
     # Toplam stok değeri
-    total_stock_value = db.query(
+    total_stock_value = await db.scalar(select(
         func.sum(models.Product.price * models.Product.stock_quantity)
-    ).scalar() or 0
+    )) or 0
     
     return {
         "total_products": total_products,
@@ -1516,8 +1882,8 @@ async def get_suppliers(
     limit: int = 100,
     is_active: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """
     Tedarikçi listesini getir (Admin)
@@ -1527,16 +1893,16 @@ async def get_suppliers(
     - **is_active**: Aktif/pasif filtresi
     - **search**: Tedarikçi adı veya iletişim kişisi araması
     """
-    query = db.query(models.Supplier)
+    query = select(models.Supplier)
     
     # Aktif/pasif filtresi
     if is_active is not None:
-        query = query.filter(models.Supplier.is_active == is_active)
+        query = query.where(models.Supplier.is_active == is_active)
     
     # Arama filtresi
     if search:
         search_pattern = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             or_(
                 models.Supplier.name.ilike(search_pattern),
                 models.Supplier.contact_person.ilike(search_pattern)
@@ -1544,19 +1910,19 @@ async def get_suppliers(
         )
     
     # Sıralama ve sayfalama
-    suppliers = query.order_by(models.Supplier.name).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(models.Supplier.name).offset(skip).limit(limit))
     
-    return suppliers
+    return result.scalars().all()
 
 
 @app.get("/suppliers/{supplier_id}", response_model=schemas.Supplier)
 async def get_supplier(
     supplier_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Belirli bir tedarikçinin detaylarını getir (Admin)"""
-    supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+    supplier = await db.scalar(select(models.Supplier).where(models.Supplier.id == supplier_id))
     if not supplier:
         raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     return supplier
@@ -1564,9 +1930,10 @@ async def get_supplier(
 
 @app.post("/suppliers/", response_model=schemas.Supplier, status_code=201)
 async def create_supplier(
+    request: Request,
     supplier: schemas.SupplierCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """
     Yeni tedarikçi oluştur (Admin)
@@ -1581,45 +1948,46 @@ async def create_supplier(
     - **is_active**: Aktif durumu
     """
     # Aynı isimde tedarikçi var mı kontrol et
-    existing = db.query(models.Supplier).filter(models.Supplier.name == supplier.name).first()
+    existing = await db.scalar(select(models.Supplier).where(models.Supplier.name == supplier.name))
     if existing:
         raise HTTPException(status_code=400, detail="Bu isimde bir tedarikçi zaten mevcut")
     
     # Yeni tedarikçi oluştur
     db_supplier = models.Supplier(**supplier.dict())
     db.add(db_supplier)
-    db.commit()
-    db.refresh(db_supplier)
+    await db.commit()
+    await db.refresh(db_supplier)
     
     # Güvenlik kaydı
-    await security_logger.log_action(
-        user_id=current_user.id,
-        action="supplier_created",
-        details=f"Yeni tedarikçi oluşturuldu: {db_supplier.name}",
-        ip_address="admin_panel"
+    SecurityAuditLogger.log_security_event(
+        "supplier_created",
+        current_user.id,
+        {"details": f"Yeni tedarikçi oluşturuldu: {db_supplier.name}"},
+        request
     )
     
-    # WebSocket bildirimi
-    await manager.broadcast({
+    # WebSocket bildirimi (sadece admin paneli)
+    await manager.publish({
         "type": "supplier_created",
         "supplier": {
             "id": db_supplier.id,
             "name": db_supplier.name
         }
-    })
+    }, [ADMIN_TOPIC])
     
     return db_supplier
 
 
 @app.put("/suppliers/{supplier_id}", response_model=schemas.Supplier)
 async def update_supplier(
+    request: Request,
     supplier_id: int,
     supplier_update: schemas.SupplierUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Tedarikçi bilgilerini güncelle (Admin)"""
-    db_supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+    db_supplier = await db.scalar(select(models.Supplier).where(models.Supplier.id == supplier_id))
     if not db_supplier:
         raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     
@@ -1629,42 +1997,45 @@ async def update_supplier(
         setattr(db_supplier, field, value)
     
     db_supplier.updated_at = datetime.now()
-    db.commit()
-    db.refresh(db_supplier)
+    await db.commit()
+    await db.refresh(db_supplier)
     
     # Güvenlik kaydı
-    await security_logger.log_action(
-        user_id=current_user.id,
-        action="supplier_updated",
-        details=f"Tedarikçi güncellendi: {db_supplier.name}",
-        ip_address="admin_panel"
+    SecurityAuditLogger.log_security_event(
+        "supplier_updated",
+        current_user.id,
+        {"details": f"Tedarikçi güncellendi: {db_supplier.name}"},
+        request
     )
     
-    # WebSocket bildirimi
-    await manager.broadcast({
+    # WebSocket bildirimi (sadece admin paneli)
+    await manager.publish({
         "type": "supplier_updated",
         "supplier": {
             "id": db_supplier.id,
             "name": db_supplier.name
         }
-    })
+    }, [ADMIN_TOPIC])
     
     return db_supplier
 
 
 @app.delete("/suppliers/{supplier_id}", status_code=204)
 async def delete_supplier(
+    request: Request,
     supplier_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Tedarikçiyi sil (Admin)"""
-    db_supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+    db_supplier = await db.scalar(select(models.Supplier).where(models.Supplier.id == supplier_id))
     if not db_supplier:
         raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     
     # İlişkili satın almalar var mı kontrol et
-    purchase_count = db.query(models.Purchase).filter(models.Purchase.supplier_id == supplier_id).count()
+    purchase_count = await db.scalar(
+        select(func.count(models.Purchase.id)).where(models.Purchase.supplier_id == supplier_id)
+    )
     if purchase_count > 0:
         raise HTTPException(
             status_code=400,
@@ -1672,22 +2043,22 @@ async def delete_supplier(
         )
     
     supplier_name = db_supplier.name
-    db.delete(db_supplier)
-    db.commit()
+    await db.delete(db_supplier)
+    await db.commit()
     
     # Güvenlik kaydı
-    await security_logger.log_action(
-        user_id=current_user.id,
-        action="supplier_deleted",
-        details=f"Tedarikçi silindi: {supplier_name}",
-        ip_address="admin_panel"
+    SecurityAuditLogger.log_security_event(
+        "supplier_deleted",
+        current_user.id,
+        {"details": f"Tedarikçi silindi: {supplier_name}"},
+        request
     )
     
-    # WebSocket bildirimi
-    await manager.broadcast({
+    # WebSocket bildirimi (sadece admin paneli)
+    await manager.publish({
         "type": "supplier_deleted",
         "supplier_id": supplier_id
-    })
+    }, [ADMIN_TOPIC])
     
     return None
 
@@ -1696,42 +2067,82 @@ async def delete_supplier(
 # SATIN ALMA YÖNETİMİ (PURCHASE MANAGEMENT)
 # ============================================================================
 
-@app.get("/purchases/", response_model=List[schemas.Purchase])
+def _purchase_detail_query():
+    """
+    Satın almayı tedarikçi, kalemler ve ürün adlarıyla birlikte yükleyen sorgu
+
+    Tedarikçi aynı sorguda JOIN ile gelir; kalemler ve ürünler sayfadaki tüm
+    satın almalar için birer IN sorgusuyla yüklenir (toplam 3 sorgu).
+    """
+    return (
+        select(models.Purchase)
+        .join(models.Purchase.supplier)
+        .options(
+            contains_eager(models.Purchase.supplier),
+            selectinload(models.Purchase.items)
+            .selectinload(models.PurchaseItem.product)
+            .load_only(models.Product.name)
+        )
+    )
+
+
+def _purchase_to_dict(purchase: models.Purchase) -> dict:
+    """Yüklenmiş satın almayı tedarikçi ve ürün adlarıyla sözlüğe çevirir"""
+    purchase_dict = schemas.Purchase.from_orm(purchase).dict()
+    purchase_dict['supplier_name'] = purchase.supplier.name
+    
+    purchase_dict['items'] = []
+    for item in purchase.items:
+        item_dict = schemas.PurchaseItem.from_orm(item).dict()
+        if item.product:
+            item_dict['product_name'] = item.product.name
+        purchase_dict['items'].append(item_dict)
+    
+    return purchase_dict
+
+
+@app.get(
+    "/purchases/",
+    response_model=List[schemas.Purchase],
+    dependencies=[Depends(query_budget(PURCHASE_LIST_QUERY_BUDGET))]
+)
 async def get_purchases(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     supplier_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """
     Satın alma listesini getir (Admin)
     
-    - **skip**: Atlanacak kayıt sayısı
     - **limit**: Getirilecek maksimum kayıt sayısı
+    - **cursor**: Önceki yanıtın X-Next-Cursor başlığındaki imleç
     - **supplier_id**: Tedarikçi filtresi
     - **status**: Durum filtresi (pending, completed, cancelled)
     - **start_date**: Başlangıç tarihi (YYYY-MM-DD)
     - **end_date**: Bitiş tarihi (YYYY-MM-DD)
     """
-    query = db.query(models.Purchase).join(models.Supplier)
+    query = _purchase_detail_query()
     
     # Tedarikçi filtresi
     if supplier_id:
-        query = query.filter(models.Purchase.supplier_id == supplier_id)
+        query = query.where(models.Purchase.supplier_id == supplier_id)
     
     # Durum filtresi
     if status:
-        query = query.filter(models.Purchase.status == status)
+        query = query.where(models.Purchase.status == status)
     
     # Tarih filtreleri
     if start_date:
         try:
             start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(models.Purchase.purchase_date >= start_dt)
+            query = query.where(models.Purchase.purchase_date >= start_dt)
         except ValueError:
             raise HTTPException(status_code=400, detail="Geçersiz başlangıç tarihi formatı (YYYY-MM-DD)")
     
@@ -1740,73 +2151,49 @@ async def get_purchases(
             end_dt = datetime.strptime(end_date, "%Y-%m-%d")
             # Günün sonuna kadar dahil et
             end_dt = end_dt.replace(hour=23, minute=59, second=59)
-            query = query.filter(models.Purchase.purchase_date <= end_dt)
+            query = query.where(models.Purchase.purchase_date <= end_dt)
         except ValueError:
             raise HTTPException(status_code=400, detail="Geçersiz bitiş tarihi formatı (YYYY-MM-DD)")
     
     # Sıralama ve sayfalama
-    purchases = query.order_by(models.Purchase.purchase_date.desc()).offset(skip).limit(limit).all()
-    
-    # Tedarikçi adlarını ekle
-    result = []
-    for purchase in purchases:
-        purchase_dict = schemas.Purchase.from_orm(purchase).dict()
-        purchase_dict['supplier_name'] = purchase.supplier.name
-        
-        # Satın alma kalemlerini ekle
-        items = db.query(models.PurchaseItem).filter(
-            models.PurchaseItem.purchase_id == purchase.id
-        ).all()
-        
-        purchase_dict['items'] = []
-        for item in items:
-            item_dict = schemas.PurchaseItem.from_orm(item).dict()
-            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-            if product:
-                item_dict['product_name'] = product.name
-            purchase_dict['items'].append(item_dict)
-        
-        result.append(purchase_dict)
+    query = apply_keyset(query, (models.Purchase.purchase_date, models.Purchase.id), cursor, limit, skip=skip)
+    rows = await db.execute(query)
+    purchases, _ = paginate(
+        rows.scalars().all(), limit,
+        key=lambda purchase: (purchase.purchase_date, purchase.id),
+        response=response
+    )
     
-    return result
+    # Tedarikçi ve ürün adlarını ekle
+    with timed("serialize"):
+        return [_purchase_to_dict(purchase) for purchase in purchases]
 
 
 @app.get("/purchases/{purchase_id}", response_model=schemas.Purchase)
 async def get_purchase(
     purchase_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """Belirli bir satın almanın detaylarını getir (Admin)"""
-    purchase = db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+    purchase = await db.scalar(
+        _purchase_detail_query()
+        .where(models.Purchase.id == purchase_id)
+        .execution_options(populate_existing=True)
+    )
     if not purchase:
         raise HTTPException(status_code=404, detail="Satın alma bulunamadı")
     
-    # Tedarikçi adını ekle
-    purchase_dict = schemas.Purchase.from_orm(purchase).dict()
-    purchase_dict['supplier_name'] = purchase.supplier.name
-    
-    # Satın alma kalemlerini ekle
-    items = db.query(models.PurchaseItem).filter(
-        models.PurchaseItem.purchase_id == purchase.id
-    ).all()
-    
-    purchase_dict['items'] = []
-    for item in items:
-        item_dict = schemas.PurchaseItem.from_orm(item).dict()
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if product:
-            item_dict['product_name'] = product.name
-        purchase_dict['items'].append(item_dict)
-    
-    return purchase_dict
+    # Tedarikçi ve ürün adlarını ekle
+    return _purchase_to_dict(purchase)
 
 
 @app.post("/purchases/", response_model=schemas.Purchase, status_code=201)
 async def create_purchase(
+    request: Request,
     purchase: schemas.PurchaseCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """
     Yeni satın alma oluştur (Admin)
@@ -1822,29 +2209,35 @@ async def create_purchase(
     - Stok hareketi kaydı oluşturulur
     """
     # Tedarikçi kontrolü
-    supplier = db.query(models.Supplier).filter(models.Supplier.id == purchase.supplier_id).first()
+    supplier = await db.scalar(select(models.Supplier).where(models.Supplier.id == purchase.supplier_id))
     if not supplier:
         raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     
     # Fatura numarası kontrolü
     if purchase.invoice_number:
-        existing = db.query(models.Purchase).filter(
+        existing = await db.scalar(select(models.Purchase).where(
             models.Purchase.invoice_number == purchase.invoice_number
-        ).first()
+        ))
         if existing:
             raise HTTPException(status_code=400, detail="Bu fatura numarası zaten kullanılıyor")
     
-    # Toplam tutarı hesapla
-    total_amount = 0
+    # Ürün kontrolü (tek sorgu)
+    product_ids = {item.product_id for item in purchase.items}
+    found_ids = set((await db.execute(
+        select(models.Product.id).where(models.Product.id.in_(product_ids))
+    )).scalars().all())
     for item in purchase.items:
-        # Ürün kontrolü
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
+        if item.product_id not in found_ids:
             raise HTTPException(status_code=404, detail=f"Ürün bulunamadı: {item.product_id}")
-        
+    
+    # Toplam tutarı ve ürün başına giren miktarı hesapla
+    total_amount = 0
+    received_quantities: dict[int, int] = {}
+    for item in purchase.items:
         total_amount += item.quantity * item.unit_price
+        received_quantities[item.product_id] = received_quantities.get(item.product_id, 0) + item.quantity
     
-    # Satın alma oluştur
+    # Satın alma oluştur (tüm adımlar tek transaction içinde)
     db_purchase = models.Purchase(
         supplier_id=purchase.supplier_id,
         invoice_number=purchase.invoice_number,
@@ -1855,55 +2248,67 @@ async def create_purchase(
         created_by=current_user.id
     )
     db.add(db_purchase)
-    db.commit()
-    db.refresh(db_purchase)
+    await db.flush()  # purchase id'si için, commit en sonda
     
-    # Satın alma kalemlerini oluştur ve stokları güncelle
-    for item in purchase.items:
-        # Satın alma kalemi
-        db_item = models.PurchaseItem(
-            purchase_id=db_purchase.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_price=item.unit_price,
-            total_price=item.quantity * item.unit_price
-        )
-        db.add(db_item)
-        
-        # Ürün stokunu artır
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        product.stock_quantity += item.quantity
-        
-        # Stok hareketi kaydı oluştur
-        stock_movement = models.StockMovement(
-            product_id=item.product_id,
-            movement_type="entry",
-            quantity=item.quantity,
-            description=f"Satın alma - Fatura: {purchase.invoice_number or 'N/A'}",
-            reference=f"PURCHASE-{db_purchase.id}",
-            created_by=current_user.id
-        )
-        db.add(stock_movement)
+    # Satın alma kalemleri (toplu insert)
+    await db.execute(insert(models.PurchaseItem), [
+        {
+            "purchase_id": db_purchase.id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": item.unit_price,
+            "total_price": item.quantity * item.unit_price,
+        }
+        for item in purchase.items
+    ])
+    
+    # Ürün stoklarını tek UPDATE ile artır (yeni miktarlar bildirim için döner)
+    result = await db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(received_quantities))
+        .values(stock_quantity=models.Product.stock_quantity + case(
+            received_quantities, value=models.Product.id, else_=0
+        ))
+        .returning(models.Product.id, models.Product.stock_quantity, models.Product.category_id)
+        .execution_options(synchronize_session=False)
+    )
+    stock_levels = {product_id: (stock_quantity, category_id) for product_id, stock_quantity, category_id in result.all()}
     
-    db.commit()
+    # Stok hareketi kayıtları (toplu insert)
+    await db.execute(insert(models.StockMovement), [
+        {
+            "product_id": item.product_id,
+            "movement_type": "entry",
+            "quantity": item.quantity,
+            "description": f"Satın alma - Fatura: {purchase.invoice_number or 'N/A'}",
+            "reference": f"PURCHASE-{db_purchase.id}",
+            "created_by": current_user.id,
+        }
+        for item in purchase.items
+    ])
+    
+    await db.commit()
+    await catalog_cache.invalidate()
     
     # Güvenlik kaydı
-    await security_logger.log_action(
-        user_id=current_user.id,
-        action="purchase_created",
-        details=f"Yeni satın alma oluşturuldu: {supplier.name} - {total_amount} TL",
-        ip_address="admin_panel"
+    SecurityAuditLogger.log_security_event(
+        "purchase_created",
+        current_user.id,
+        {"details": f"Yeni satın alma oluşturuldu: {supplier.name} - {total_amount} TL"},
+        request
     )
     
-    # WebSocket bildirimi
-    await manager.broadcast({
+    # WebSocket bildirimi (sadece admin paneli)
+    await manager.publish({
         "type": "purchase_created",
         "purchase": {
             "id": db_purchase.id,
             "supplier_name": supplier.name,
             "total_amount": total_amount
         }
-    })
+    }, [ADMIN_TOPIC])
+    for product_id, (stock_quantity, category_id) in stock_levels.items():
+        catalog_notifier.submit(catalog_events.stock_changed(product_id, stock_quantity, category_id))
     
     # Satın almayı detaylarıyla birlikte döndür
     return await get_purchase(db_purchase.id, db, current_user)
@@ -1911,17 +2316,18 @@ async def create_purchase(
 
 @app.put("/purchases/{purchase_id}", response_model=schemas.Purchase)
 async def update_purchase(
+    request: Request,
     purchase_id: int,
     purchase_update: schemas.PurchaseUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """
     Satın alma bilgilerini güncelle (Admin)
     
     Not: Satın alma kalemleri güncellenemez, sadece genel bilgiler güncellenebilir
     """
-    db_purchase = db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+    db_purchase = await db.scalar(select(models.Purchase).where(models.Purchase.id == purchase_id))
     if not db_purchase:
         raise HTTPException(status_code=404, detail="Satın alma bulunamadı")
     
@@ -1930,18 +2336,18 @@ async def update_purchase(
     
     # Tedarikçi değişiyorsa kontrol et
     if 'supplier_id' in update_data:
-        supplier = db.query(models.Supplier).filter(
+        supplier = await db.scalar(select(models.Supplier).where(
             models.Supplier.id == update_data['supplier_id']
-        ).first()
+        ))
         if not supplier:
             raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     
     # Fatura numarası değişiyorsa kontrol et
     if 'invoice_number' in update_data and update_data['invoice_number']:
-        existing = db.query(models.Purchase).filter(
+        existing = await db.scalar(select(models.Purchase).where(
             models.Purchase.invoice_number == update_data['invoice_number'],
             models.Purchase.id != purchase_id
-        ).first()
+        ))
         if existing:
             raise HTTPException(status_code=400, detail="Bu fatura numarası zaten kullanılıyor")
     
@@ -1949,100 +2355,140 @@ async def update_purchase(
         setattr(db_purchase, field, value)
     
     db_purchase.updated_at = datetime.now()
-    db.commit()
-    db.refresh(db_purchase)
+    await db.commit()
+    await db.refresh(db_purchase)
     
     # Güvenlik kaydı
-    await security_logger.log_action(
-        user_id=current_user.id,
-        action="purchase_updated",
-        details=f"Satın alma güncellendi: ID {purchase_id}",
-        ip_address="admin_panel"
+    SecurityAuditLogger.log_security_event(
+        "purchase_updated",
+        current_user.id,
+        {"details": f"Satın alma güncellendi: ID {purchase_id}"},
+        request
     )
     
-    # WebSocket bildirimi
-    await manager.broadcast({
+    # WebSocket bildirimi (sadece admin paneli)
+    await manager.publish({
         "type": "purchase_updated",
         "purchase_id": purchase_id
-    })
+    }, [ADMIN_TOPIC])
     
     return await get_purchase(purchase_id, db, current_user)
 
 
 @app.delete("/purchases/{purchase_id}", status_code=204)
 async def delete_purchase(
+    request: Request,
     purchase_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_current_admin_user)
 ):
     """
     Satın almayı sil (Admin)
     
     Not: Satın alma silindiğinde stok miktarları geri alınır
     """
-    db_purchase = db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+    db_purchase = await db.scalar(
+        select(models.Purchase)
+        .options(selectinload(models.Purchase.items))
+        .where(models.Purchase.id == purchase_id)
+    )
     if not db_purchase:
         raise HTTPException(status_code=404, detail="Satın alma bulunamadı")
     
-    # Satın alma kalemlerini al ve stokları geri al
-    items = db.query(models.PurchaseItem).filter(
-        models.PurchaseItem.purchase_id == purchase_id
-    ).all()
-    
-    for item in items:
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if product:
-            # Stok miktarını azalt
-            product.stock_quantity -= item.quantity
-            if product.stock_quantity < 0:
-                product.stock_quantity = 0
-            
-            # Ters stok hareketi kaydı oluştur
-            stock_movement = models.StockMovement(
-                product_id=item.product_id,
-                movement_type="exit",
-                quantity=item.quantity,
-                description=f"Satın alma silindi - ID: {purchase_id}",
-                reference=f"PURCHASE-DELETE-{purchase_id}",
-                created_by=current_user.id
-            )
-            db.add(stock_movement)
-        
-        # Satın alma kalemini sil
-        db.delete(item)
+    # Ürün başına geri alınacak miktarlar (aynı ürün birden fazla kalemde olabilir)
+    returned_quantities: dict[int, int] = {}
+    for item in db_purchase.items:
+        returned_quantities[item.product_id] = returned_quantities.get(item.product_id, 0) + item.quantity
+    
+    # Stokları create_purchase gibi tek UPDATE ile geri al. create_purchase'ten
+    # farklı olarak stok sıfırda kırpılır: alınan ürünlerin bir kısmı satılmış olabilir
+    stock_levels: dict[int, tuple] = {}
+    if returned_quantities:
+        returned = case(returned_quantities, value=models.Product.id, else_=0)
+        result = await db.execute(
+            update(models.Product)
+            .where(models.Product.id.in_(returned_quantities))
+            .values(stock_quantity=case(
+                (models.Product.stock_quantity > returned, models.Product.stock_quantity - returned),
+                else_=0
+            ))
+            .returning(models.Product.id, models.Product.stock_quantity, models.Product.category_id)
+            .execution_options(synchronize_session=False)
+        )
+        stock_levels = {product_id: (stock_quantity, category_id) for product_id, stock_quantity, category_id in result.all()}
+    
+    # Ters stok hareketi kayıtları (toplu insert, sadece hâlâ var olan ürünler için)
+    reverse_movements = [
+        {
+            "product_id": item.product_id,
+            "movement_type": "exit",
+            "quantity": item.quantity,
+            "description": f"Satın alma silindi - ID: {purchase_id}",
+            "reference": f"PURCHASE-DELETE-{purchase_id}",
+            "created_by": current_user.id,
+        }
+        for item in db_purchase.items if item.product_id in stock_levels
+    ]
+    if reverse_movements:
+        await db.execute(insert(models.StockMovement), reverse_movements)
     
-    # Satın almayı sil
-    db.delete(db_purchase)
-    db.commit()
+    # Satın alma kalemlerini ve satın almayı sil
+    await db.execute(delete(models.PurchaseItem).where(models.PurchaseItem.purchase_id == purchase_id))
+    await db.execute(delete(models.Purchase).where(models.Purchase.id == purchase_id))
+    await db.commit()
+    await catalog_cache.invalidate()
     
     # Güvenlik kaydı
-    await security_logger.log_action(
-        user_id=current_user.id,
-        action="purchase_deleted",
-        details=f"Satın alma silindi: ID {purchase_id}",
-        ip_address="admin_panel"
+    SecurityAuditLogger.log_security_event(
+        "purchase_deleted",
+        current_user.id,
+        {"details": f"Satın alma silindi: ID {purchase_id}"},
+        request
     )
     
-    # WebSocket bildirimi
-    await manager.broadcast({
+    # WebSocket bildirimi (sadece admin paneli)
+    await manager.publish({
         "type": "purchase_deleted",
         "purchase_id": purchase_id
-    })
+    }, [ADMIN_TOPIC])
+    for product_id, (stock_quantity, category_id) in stock_levels.items():
+        catalog_notifier.submit(catalog_events.stock_changed(product_id, stock_quantity, category_id))
     
     return None
 
 
+# Prometheus metrikleri
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metin biçiminde metrikler (METRICS_TOKEN veya yerel istemci)"""
+    client_host = request.client.host if request.client else None
+    if not metrics_access_allowed(client_host, request.headers.get("authorization")):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Erişim reddedildi")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    """Sistem sağlık kontrolü - Redis dahil"""
+    """Sistem sağlık kontrolü (herkese açık, sadece durum)"""
+    from .pending_registrations_redis import pending_registration_manager
+
+    redis_health = await pending_registration_manager.health_check()
+    return {
+        "status": "healthy" if redis_health.get("status") == "healthy" else "degraded",
+        "timestamp": datetime.now().isoformat(),
+    }
+
+@app.get("/admin/health")
+async def admin_health_check(current_user: TokenUser = Depends(get_current_admin_user)):
+    """Ayrıntılı sistem durumu - Redis, havuzlar, event loop, WebSocket (Admin)"""
     from .pending_registrations_redis import pending_registration_manager
     
     # Redis sağlık kontrolü
-    redis_health = pending_registration_manager.health_check()
+    redis_health = await pending_registration_manager.health_check()
     
     # Pending registrations istatistikleri
-    stats = pending_registration_manager.get_stats()
+    stats = await pending_registration_manager.get_stats()
     
     return {
         "status": "healthy" if redis_health.get("status") == "healthy" else "degraded",
@@ -2052,7 +2498,11 @@ async def health_check():
         "pending_registrations": {
             "total": stats.get("total_pending", 0),
             "redis_connected": stats.get("redis_connected", False)
-        }
+        },
+        "password_hashing": password_hash_pool.get_stats(),
+        "audit_log": audit_log_writer.get_stats(),
+        "event_loop": loop_monitor.get_stats(),
+        "websocket": {**manager.get_stats(), "catalog_events": catalog_notifier.get_stats()}
     }
 
 if __name__ == "__main__":
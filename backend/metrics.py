@@ -0,0 +1,187 @@
+# backend/metrics.py
+"""
+Prometheus metrikleri
+
+/metrics endpoint'i Prometheus metin biçiminde şunları yayınlar:
+
+- http_request_duration_seconds: route şablonu / method / durum koduna göre
+  gecikme histogramı (route etiketi /products/{product_id} gibi şablondur,
+  eşleşmeyen yollar "unmatched" olarak toplanır)
+- http_requests_in_progress: işlenmekte olan istek sayısı
+- http_request_db_queries / http_request_db_seconds: istek başına SQL sayısı
+  ve toplam sorgu süresi
+- redis_command_duration_seconds / redis_command_errors_total: paylaşılan
+  Redis istemcisinin komut süreleri
+- websocket_connections, websocket_broadcast_duration_seconds,
+  websocket_broadcast_recipients, websocket_evictions_total: WebSocket
+  bağlantıları, yayının kuyruklara eklenme süresi ve çıkarılan bağlantılar
+- event_loop_lag_seconds, event_loop_blocks_total,
+  event_loop_blocked_seconds_total: event loop gecikmesi ve route bazında
+  blokajlar (bkz. backend/loop_monitor.py)
+
+Ölçüm istek başına birkaç sayaç artırımıdır; etiket alt nesneleri
+önbelleklenir ve üretimde açık bırakılabilir.
+
+Erişim: Metrikler route ve süre bilgisi içerdiği için herkese açık değildir.
+METRICS_TOKEN verilirse istek "Authorization: Bearer <METRICS_TOKEN>"
+taşımalıdır; verilmezse sadece yerel (loopback) istemciler okuyabilir.
+
+Çoklu worker: PROMETHEUS_MULTIPROC_DIR ortak (ve açılışta boş) bir dizini
+gösterirse her worker değerlerini oraya yazar ve hangi worker'a gelirse
+gelsin /metrics hepsinin toplamını döndürür. Değişken prometheus_client
+import edilmeden önce ayarlanmış olmalıdır.
+"""
+import hmac
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import track_request_queries
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+_LOOPBACK_HOSTS = frozenset({"127.0.0.1", "::1", "localhost"})
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP istek süresi",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "İşlenmekte olan HTTP istekleri",
+    ["method"], multiprocess_mode="livesum"
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries", "İstek başına SQL ifadesi sayısı",
+    ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "http_request_db_seconds", "İstek başına toplam SQL süresi",
+    ["route"], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "Redis komut süresi",
+    ["command"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+REDIS_COMMAND_ERRORS = Counter(
+    "redis_command_errors_total", "Hata ile biten Redis komutları", ["command"]
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_connections", "Açık WebSocket bağlantıları", multiprocess_mode="livesum"
+)
+WEBSOCKET_BROADCAST_DURATION = Histogram(
+    "websocket_broadcast_duration_seconds", "Bir yayının tüm bağlantılara gönderilme süresi",
+    buckets=LATENCY_BUCKETS
+)
+WEBSOCKET_BROADCAST_RECIPIENTS = Histogram(
+    "websocket_broadcast_recipients", "Yayın başına alıcı sayısı",
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+)
+WEBSOCKET_EVICTIONS = Counter(
+    "websocket_evictions_total", "Kapatılan WebSocket bağlantıları (yavaş istemci, hata, zaman aşımı)",
+    ["reason"]
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Event loop gecikmesi (zamanlayıcı sapması)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_BLOCKS = Counter(
+    "event_loop_blocks_total", "Eşiği aşan event loop blokajları", ["route"]
+)
+EVENT_LOOP_BLOCKED_SECONDS = Counter(
+    "event_loop_blocked_seconds_total", "Eşiği aşan blokajların toplam süresi", ["route"]
+)
+
+# labels() her çağrıda kilit alır; sık kullanılan alt nesneler burada tutulur
+_children: Dict[Tuple, object] = {}
+
+
+def _child(metric, *labels):
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def observe_redis_command(command: str, seconds: float, failed: bool = False):
+    """Paylaşılan Redis istemcisinden çağrılır"""
+    _child(REDIS_COMMAND_DURATION, command).observe(seconds)
+    if failed:
+        _child(REDIS_COMMAND_ERRORS, command).inc()
+
+
+def record_websocket_eviction(reason: str):
+    """Kapatılan WebSocket bağlantısı (slow_consumer, timeout, send_error)"""
+    _child(WEBSOCKET_EVICTIONS, reason).inc()
+
+
+def record_loop_block(route: str, lag: float):
+    """Eşiği aşan event loop blokajı (bkz. backend/loop_monitor.py)"""
+    _child(EVENT_LOOP_BLOCKS, route).inc()
+    _child(EVENT_LOOP_BLOCKED_SECONDS, route).inc(lag)
+
+
+class MetricsMiddleware:
+    """HTTP istek metriklerini toplayan saf ASGI middleware"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress = _child(HTTP_REQUESTS_IN_PROGRESS, method)
+        in_progress.inc()
+        query_stats = track_request_queries()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            in_progress.dec()
+            # Router eşleşen route'u scope'a yazar
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            _child(HTTP_REQUEST_DURATION, method, route, str(status_code)).observe(elapsed)
+            _child(DB_QUERIES_PER_REQUEST, route).observe(query_stats.count)
+            _child(DB_SECONDS_PER_REQUEST, route).observe(query_stats.seconds)
+
+
+def metrics_access_allowed(client_host: Optional[str], authorization: Optional[str]) -> bool:
+    """/metrics isteğine izin verilir mi (METRICS_TOKEN veya yerel istemci)"""
+    if METRICS_TOKEN:
+        scheme, _, token = (authorization or "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    return client_host in _LOOPBACK_HOSTS
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """/metrics yanıt gövdesi ve content-type"""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def shutdown_metrics():
+    """Çoklu worker modunda bu sürecin canlı gauge dosyalarını bırakır"""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
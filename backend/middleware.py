@@ -1,93 +1,181 @@
 # backend/middleware.py
 
+import asyncio
+import argparse
+import re
 import time
 import json
-from typing import Callable
+from typing import Callable, Optional
 from fastapi import Request, Response, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 
-from .security import SecurityHeaders, SecurityAuditLogger, SecurityConfig
+from .security import SecurityHeaders, SecurityAuditLogger, SecurityConfig, authenticate_token
+from .server_timing import SLOW_REQUEST_LOG_SECONDS, TRACE_HEADER, RequestTimings, start_request_timing
 
 logger = logging.getLogger(__name__)
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Güvenlik middleware sınıfı"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        
+# Her yanıta eklenen güvenlik başlıkları (ham ASGI biçiminde, bir kez hesaplanır)
+SECURITY_HEADER_TUPLES = [
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in SecurityHeaders.HEADERS.items()
+]
+_SECURITY_HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADER_TUPLES)
+
+# Engellenen tarama araçları (User-Agent içinde aranır)
+SUSPICIOUS_USER_AGENTS = re.compile(r"sqlmap|nikto|nmap|masscan|zap")
+
+# Erişimi audit loguna yazılan endpoint'ler (path içinde aranır)
+SENSITIVE_PATHS = re.compile(r"/users/login|/users/register|/admin")
+
+
+def _get_header(scope: Scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+async def _can_view_timings(scope: Scope, timings: RequestTimings, trace_requested: bool) -> bool:
+    """
+    Süre dökümü bu isteğe gösterilebilir mi (sadece admin)
+
+    Kullanıcı auth dependency'sinin zaten doğruladığı TokenUser'dır. Kimlik
+    doğrulaması olmayan route'larda (ör. login) iz istenmişse token burada
+    aynı kontrollerle (iptal, token_version) doğrulanır.
+    """
+    user = timings.user
+    if user is None and trace_requested:
+        authorization = (_get_header(scope, b"authorization") or b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                user, _ = await authenticate_token(token)
+            except HTTPException:
+                return False
+    return user is not None and user.is_admin is True
+
+
+async def _send_json(send: Send, status_code: int, content: dict):
+    body = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *SECURITY_HEADER_TUPLES,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class SecurityMiddleware:
+    """
+    Güvenlik middleware sınıfı (saf ASGI)
+
+    BaseHTTPMiddleware her istek için ek görev ve akış sarmalayıcısı
+    oluşturur ve streaming yanıtları bozar; burada yanıt olduğu gibi
+    iletilir, sadece başlık mesajına güvenlik başlıkları eklenir.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        # Süre dökümü her istekte toplanır ama sadece admin'e gösterilir
+        # (anonim isteklerde ör. "hash" girdisi hesabın var olup olmadığını
+        # belli eder); yavaş isteklerin dökümü sunucu loguna yazılır
+        trace_requested = _get_header(scope, TRACE_HEADER) == b"1"
+        timings = start_request_timing(trace=trace_requested)
+
         # Request boyutu kontrolü
-        if hasattr(request, 'content_length') and request.content_length:
-            if request.content_length > SecurityConfig.MAX_REQUEST_SIZE:
-                return JSONResponse(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    content={"detail": "Request boyutu çok büyük"}
-                )
-        
+        content_length = _get_header(scope, b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > SecurityConfig.MAX_REQUEST_SIZE:
+            await _send_json(send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, {"detail": "Request boyutu çok büyük"})
+            return
+
         # Şüpheli User-Agent kontrolü
-        user_agent = request.headers.get("user-agent", "").lower()
-        suspicious_agents = ["sqlmap", "nikto", "nmap", "masscan", "zap"]
-        if any(agent in user_agent for agent in suspicious_agents):
+        user_agent = (_get_header(scope, b"user-agent") or b"").decode("latin-1").lower()
+        if user_agent and SUSPICIOUS_USER_AGENTS.search(user_agent):
             SecurityAuditLogger.log_security_event(
                 "suspicious_user_agent",
                 None,
                 {"user_agent": user_agent},
-                request
-            )
-            return JSONResponse(
-                status_code=status.HTTP_403_FORBIDDEN,
-                content={"detail": "Erişim reddedildi"}
+                Request(scope)
             )
-        
-        # Response'u işle
-        response = await call_next(request)
-        
-        # Güvenlik başlıklarını ekle
-        security_headers = SecurityHeaders.get_security_headers()
-        for header, value in security_headers.items():
-            response.headers[header] = value
-        
-        # İşlem süresini logla
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        # Yavaş istekleri logla
-        if process_time > 5.0:  # 5 saniyeden uzun
-            logger.warning(f"Yavaş istek: {request.method} {request.url} - {process_time:.2f}s")
-        
-        return response
+            await _send_json(send, status.HTTP_403_FORBIDDEN, {"detail": "Erişim reddedildi"})
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                # Güvenlik başlıklarını ekle (uygulamanın koyduklarının yerine geçer)
+                headers = [h for h in message.get("headers", []) if h[0].lower() not in _SECURITY_HEADER_NAMES]
+                headers.extend(SECURITY_HEADER_TUPLES)
+                # Süre dökümü (db, redis, auth, endpoint, serialize, total)
+                if timings is not None and await _can_view_timings(scope, timings, trace_requested):
+                    headers.append((b"server-timing", timings.header_value(trace_requested).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            # Yavaş istekleri süre dökümüyle logla
+            process_time = time.perf_counter() - start_time
+            if process_time > SLOW_REQUEST_LOG_SECONDS:
+                breakdown = f" ({timings.header_value()})" if timings is not None else ""
+                logger.warning(f"Yavaş istek: {scope['method']} {scope['path']} - {process_time:.2f}s{breakdown}")
+
+
+class RequestLoggingMiddleware:
+    """İstek loglama middleware sınıfı (saf ASGI)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """İstek loglama middleware sınıfı"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Hassas endpoint'leri logla
-        sensitive_paths = ["/users/login", "/users/register", "/admin"]
-        
-        if any(path in str(request.url) for path in sensitive_paths):
+        if SENSITIVE_PATHS.search(scope["path"]):
+            request = Request(scope)
             SecurityAuditLogger.log_security_event(
                 "api_access",
                 None,
                 {
                     "method": request.method,
-                    "path": str(request.url.path),
+                    "path": request.url.path,
                     "query_params": dict(request.query_params)
                 },
                 request
             )
-        
-        response = await call_next(request)
-        
+
+        status_code = 0
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_with_status)
+
         # Hata durumlarını logla
-        if response.status_code >= 400:
+        if status_code >= 400:
             logger.warning(
-                f"HTTP {response.status_code}: {request.method} {request.url}"
+                f"HTTP {status_code}: {scope['method']} {Request(scope).url}"
             )
-        
-        return response
 
 # RateLimitMiddleware kaldırıldı - slowapi kullanılıyor
 
@@ -105,9 +193,11 @@ def setup_cors(app):
             "Content-Type",
             "Authorization",
             "X-Requested-With",
-            "X-API-Key"
+            "X-API-Key",
+            "If-None-Match",
+            "X-Server-Timing-Trace"
         ],
-        expose_headers=["X-Process-Time"],
+        expose_headers=["Server-Timing", "X-Next-Cursor", "ETag"],
         max_age=3600,
     )
 
@@ -162,4 +252,90 @@ class ContentTypeValidationMiddleware(BaseHTTPMiddleware):
                         content={"detail": "Content-Type application/json olmalıdır"}
                     )
         
-        return await call_next(request)
\ No newline at end of file
+        return await call_next(request)
+
+def benchmark(requests: int = 20000):
+    """
+    Middleware yığınının istek başına ek maliyetini ölçer
+
+    Aynı boş endpoint'e doğrudan ASGI çağrıları yapılır; HTTP sunucusu ve ağ
+    ölçüme girmez. Karşılaştırma için önceki BaseHTTPMiddleware
+    gerçekleştirmesinin eşdeğeri de ölçülür.
+    """
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    class LegacySecurityMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            start_time = time.time()
+            user_agent = request.headers.get("user-agent", "").lower()
+            if any(agent in user_agent for agent in ["sqlmap", "nikto", "nmap", "masscan", "zap"]):
+                return JSONResponse(status_code=403, content={"detail": "Erişim reddedildi"})
+            response = await call_next(request)
+            for header, value in dict(SecurityHeaders.HEADERS).items():
+                response.headers[header] = value
+            response.headers["X-Process-Time"] = str(time.time() - start_time)
+            return response
+
+    class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            if any(path in str(request.url) for path in ["/users/login", "/users/register", "/admin"]):
+                pass
+            response = await call_next(request)
+            if response.status_code >= 400:
+                logger.warning(f"HTTP {response.status_code}: {request.method} {request.url}")
+            return response
+
+    async def endpoint(request):
+        return JSONResponse({"ok": True})
+
+    def build(*middleware):
+        app = Starlette(routes=[Route("/bench", endpoint)])
+        for cls in middleware:
+            app.add_middleware(cls)
+        return app
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/bench", "raw_path": b"/bench", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"user-agent", b"benchmark")],
+        "client": ("127.0.0.1", 1234), "server": ("localhost", 8000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def measure(app) -> float:
+        for _ in range(min(1000, requests)):  # ısınma
+            await app(dict(scope), receive, send)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - start) / requests * 1_000_000
+
+    async def run():
+        baseline = await measure(build())
+        results = [
+            ("middleware yok", baseline),
+            ("BaseHTTPMiddleware (önceki)", await measure(build(LegacySecurityMiddleware, LegacyRequestLoggingMiddleware))),
+            ("saf ASGI (şimdiki)", await measure(build(SecurityMiddleware, RequestLoggingMiddleware))),
+        ]
+        print(f"{'yığın':<32}{'µs/istek':>10}{'ek maliyet':>12}")
+        for name, micros in results:
+            print(f"{name:<32}{micros:>10.1f}{micros - baseline:>12.1f}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Güvenlik middleware'leri")
+    parser.add_argument("--benchmark", action="store_true", help="İstek başına middleware maliyetini ölç")
+    parser.add_argument("--requests", type=int, default=20000, help="Ölçülecek istek sayısı")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.requests)
+    else:
+        parser.print_help()
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -50,6 +50,13 @@ class Order(Base):
     owner = relationship("User")  # back_populates="orders" User modeline eklenecek
     items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # Kullanıcının siparişleri: tek bir index aralık taraması (en yeni önce, id eşitlik bozucu)
+        Index("ix_orders_owner_id_created_date", owner_id, created_date.desc(), id.desc()),
+        # Admin sipariş listesi keyset sayfalaması
+        Index("ix_orders_created_date", created_date.desc(), id.desc()),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -91,6 +98,7 @@ class User(Base):
     failed_login_attempts = Column(Integer, default=0)  # Başarısız giriş denemeleri
     locked_until = Column(DateTime, nullable=True)  # Hesap kilitleme süresi
     password_changed_at = Column(DateTime, default=datetime.datetime.utcnow)  # Şifre değiştirilme tarihi
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)  # Artınca eski token'lar geçersiz olur
     two_factor_enabled = Column(Boolean, default=False)  # 2FA aktif mi
     two_factor_secret = Column(String, nullable=True)  # 2FA secret key
     
@@ -155,6 +163,11 @@ class SecurityLog(Base):
     details = Column(Text, nullable=True)  # JSON formatında ek bilgiler
     severity = Column(String, default="info")  # info, warning, error, critical
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    __table_args__ = (
+        # Keyset sayfalama (en yeni önce)
+        Index("ix_security_logs_created_at", created_at.desc(), id.desc()),
+    )
 
 
 class PasswordResetToken(Base):
@@ -198,4 +211,71 @@ class StockMovement(Base):
     
     # İlişkiler
     product = relationship("Product")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    __table_args__ = (
+        # Keyset sayfalama (en yeni önce), ürün filtresi için ayrı index
+        Index("ix_stock_movements_created_at", created_at.desc(), id.desc()),
+        Index("ix_stock_movements_product_id_created_at", product_id, created_at.desc(), id.desc()),
+    )
+
+class Supplier(Base):
+    """Tedarikçiler tablosu"""
+    __tablename__ = "suppliers"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    contact_person = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    address = Column(Text, nullable=True)
+    tax_number = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    
+    # İlişki
+    purchases = relationship("Purchase", back_populates="supplier")
+
+
+class Purchase(Base):
+    """Satın alma (tedarikçi faturası) tablosu"""
+    __tablename__ = "purchases"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False)
+    invoice_number = Column(String, unique=True, nullable=True)
+    purchase_date = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    total_amount = Column(Float, default=0, nullable=False)
+    notes = Column(Text, nullable=True)
+    status = Column(String, default="pending", nullable=False)  # pending, completed, cancelled
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    
+    # İlişkiler
+    supplier = relationship("Supplier", back_populates="purchases")
+    items = relationship("PurchaseItem", back_populates="purchase")
+    
+    __table_args__ = (
+        # Keyset sayfalama (en yeni önce), tedarikçi filtresi için ayrı index
+        Index("ix_purchases_purchase_date", purchase_date.desc(), id.desc()),
+        Index("ix_purchases_supplier_id_purchase_date", supplier_id, purchase_date.desc(), id.desc()),
+    )
+
+
+class PurchaseItem(Base):
+    """Satın alma kalemleri tablosu"""
+    __tablename__ = "purchase_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    purchase_id = Column(Integer, ForeignKey("purchases.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)
+    total_price = Column(Float, nullable=False)
+    
+    # İlişkiler
+    purchase = relationship("Purchase", back_populates="items")
+    product = relationship("Product")
@@ -0,0 +1,111 @@
+# backend/pagination.py
+"""
+Keyset (cursor) sayfalama yardımcıları
+
+OFFSET tabanlı sayfalama, atlanan satırları okuyup çöpe attığı için derin
+sayfalarda yavaşlar. Burada son satırın sıralama anahtarı (ör. created_at, id)
+opak bir imlece çevrilir ve bir sonraki sayfa index üzerinde doğrudan
+"bu anahtardan sonrası" olarak okunur.
+
+Liste endpoint'leri gövdeyi değiştirmeden bir sonraki sayfanın imlecini
+X-Next-Cursor başlığında döndürür.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Varsayılan ve en büyük sayfa boyutları
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Sıralama anahtarını URL güvenli, opak bir imlece çevirir"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[Any, ...]:
+    """İmleci sıralama anahtarına geri çevirir, bozuksa 400 döndürür"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("cursor size mismatch")
+        return tuple(_decode_value(v) for v in values)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+
+
+def apply_keyset(
+    query,
+    columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+    skip: int = 0
+):
+    """
+    Sorguya keyset koşulunu, sıralamayı ve limit+1 sınırını uygular
+
+    Args:
+        query: SQLAlchemy select ifadesi
+        columns: Sıralama anahtarı kolonları (son kolon benzersiz olmalı, ör. id)
+        cursor: Önceki sayfadan gelen imleç (ilk sayfa için None)
+        limit: Sayfa boyutu
+        descending: Azalan sıralama (en yeni önce)
+        skip: Eski istemciler için OFFSET (önerilmez, imleç kullanın)
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        query = query.where(key < bound if descending else key > bound)
+
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    query = query.order_by(*order)
+    if skip:
+        query = query.offset(skip)
+    # Bir sonraki sayfanın olup olmadığını anlamak için bir satır fazla oku
+    return query.limit(limit + 1)
+
+
+def paginate(
+    rows: Sequence,
+    limit: int,
+    key: Callable[[Any], Tuple[Any, ...]],
+    response: Optional[Response] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    limit+1 ile okunan satırları sayfaya indirger ve sonraki imleci üretir
+
+    response verilirse imleç X-Next-Cursor başlığına yazılır.
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+
+    if response is not None and next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return rows, next_cursor
@@ -0,0 +1,273 @@
+# backend/password_hashing.py
+"""
+Şifre hashleme iş havuzu
+
+bcrypt bilerek yavaştır (çağrı başına ~200-300 ms). async endpoint'lerde
+doğrudan çağrıldığında event loop'u bloklar ve worker'daki diğer tüm
+istekler bekler. Hashleme ve doğrulama burada sınırlı bir thread havuzunda
+çalışır; bcrypt C kodu GIL'i bıraktığı için thread'ler gerçekten paralel
+çalışır ve process havuzunun serileştirme maliyeti olmaz.
+
+Havuz doluyken (çalışan + kuyrukta bekleyen > sınır) yeni iş reddedilir;
+giriş fırtınasında kuyruk sınırsız uzayıp herkesin zaman aşımına uğraması
+yerine fazlası hemen 503 alır.
+
+Hash maliyeti de burada belirlenir: bcrypt tur sayısı BCRYPT_ROUNDS ile
+seçilir (boşsa passlib'in eski varsayılanı 12). Ölçüm her worker'da açılışta
+yapılmaz; aynı anda başlayan worker'lar CPU için yarışıp farklı maliyetler
+seçer ve birbirlerinin hash'lerini sürekli yeniden hashlerdi. Bunun yerine
+--calibrate bu makinede PASSWORD_HASH_TARGET_MS hedefine uyan değeri bir kez
+ölçer ve .env'e yazılacak BCRYPT_ROUNDS satırını verir. 12'nin altındaki bir
+değer sadece BCRYPT_ROUNDS ile bilerek seçilebilir ve açılışta uyarı loglanır.
+PASSWORD_HASH_SCHEME=argon2 ile argon2 (argon2-cffi gerekir) kullanılır. Ayar
+değiştiğinde eski hash'ler başarılı girişte yeniden hashlenir.
+
+Ayarları karşılaştırmak ve maliyeti ölçmek için:
+
+    python -m backend.password_hashing --benchmark
+    python -m backend.password_hashing --calibrate
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+from .server_timing import record_timing
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+
+# Hash algoritması ve maliyeti
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()  # bcrypt, argon2
+PASSWORD_HASH_TARGET_MS = int(os.getenv("PASSWORD_HASH_TARGET_MS", 250))
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")  # Boşsa BCRYPT_DEFAULT_ROUNDS
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB (64MB)
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 2))
+
+# passlib'in önceki sabit varsayılanı; mevcut hash'ler bu maliyette
+BCRYPT_DEFAULT_ROUNDS = 12
+# Ölçümün alt sınırı (maliyet kendiliğinden düşmez) ve girişi uzatmamak için üst sınır
+BCRYPT_MIN_ROUNDS = BCRYPT_DEFAULT_ROUNDS
+BCRYPT_MAX_ROUNDS = 16
+_CALIBRATION_PASSWORD = "kalibrasyon-Şifresi-123!"
+
+
+def _time_hash(context: CryptContext) -> float:
+    """Tek bir hash süresini saniye cinsinden ölçer"""
+    start = time.perf_counter()
+    context.hash(_CALIBRATION_PASSWORD)
+    return time.perf_counter() - start
+
+
+def calibrate_bcrypt_rounds(target_ms: int = PASSWORD_HASH_TARGET_MS) -> int:
+    """
+    Bu makinede hash süresi hedefe en yakın bcrypt tur sayısını bulur
+
+    Her tur artışı süreyi ikiye katlar; ölçüm BCRYPT_MIN_ROUNDS'tan başlar ve
+    bir sonraki tur hedefi 1.5 kattan fazla aşacaksa durur.
+    """
+    rounds = BCRYPT_MIN_ROUNDS
+    elapsed = _time_hash(CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds))
+    while elapsed * 1000 < target_ms and rounds < BCRYPT_MAX_ROUNDS:
+        # Sonraki tur ~2 kat sürer; hedefi fazlasıyla aşacaksa dur
+        if elapsed * 2000 > target_ms * 1.5:
+            break
+        rounds += 1
+        elapsed = _time_hash(CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds))
+    return rounds
+
+
+def _argon2_available() -> bool:
+    try:
+        import argon2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_password_context(
+    scheme: str = PASSWORD_HASH_SCHEME,
+    bcrypt_rounds: Optional[int] = None,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM
+) -> CryptContext:
+    """
+    Uygulamanın şifre context'ini oluşturur
+
+    Varsayılan şema dışındaki hash'ler ve eksik maliyetli bcrypt hash'leri
+    needs_update ile işaretlenir; login sırasında yeniden hashlenir.
+    """
+    if scheme == "argon2" and not _argon2_available():
+        logger.warning("PASSWORD_HASH_SCHEME=argon2 ama argon2-cffi kurulu değil, bcrypt kullanılacak")
+        scheme = "bcrypt"
+
+    if bcrypt_rounds is None:
+        bcrypt_rounds = int(BCRYPT_ROUNDS) if BCRYPT_ROUNDS else BCRYPT_DEFAULT_ROUNDS
+        if bcrypt_rounds < BCRYPT_DEFAULT_ROUNDS:
+            logger.warning(
+                f"BCRYPT_ROUNDS={bcrypt_rounds} varsayılan {BCRYPT_DEFAULT_ROUNDS} turun altında; "
+                "şifre hash'leri daha kolay kırılır"
+            )
+
+    options = {
+        "bcrypt__rounds": bcrypt_rounds,
+        "bcrypt__min_rounds": bcrypt_rounds,
+    }
+    if scheme == "argon2":
+        schemes = ["argon2", "bcrypt"]
+        options.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    else:
+        schemes = ["bcrypt"]
+
+    logger.info(
+        f"Şifre hashleme: {schemes[0]}"
+        + (f" (bcrypt rounds={bcrypt_rounds})" if schemes[0] == "bcrypt" else
+           f" (time_cost={argon2_time_cost}, memory_cost={argon2_memory_cost}KiB)")
+    )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+class PasswordHashPoolBusy(Exception):
+    """Havuz ve kuyruk dolu olduğunda fırlatılır"""
+
+
+class PasswordHashPool:
+    """Sınırlı kuyruklu, metrikli hashleme thread havuzu"""
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._pending = 0  # çalışan + kuyrukta bekleyen
+
+        # Metrikler
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """func'ı havuzda çalıştırır, havuz doluysa PasswordHashPoolBusy fırlatır"""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHashPoolBusy()
+
+        self._pending += 1
+        submitted_at = time.perf_counter()
+        started_at = 0.0
+
+        def timed():
+            nonlocal started_at
+            started_at = time.perf_counter()
+            return func(*args)
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        finished_at = time.perf_counter()
+        record_timing("hash", finished_at - submitted_at)
+        wait = started_at - submitted_at
+        self.completed += 1
+        self.total_wait_seconds += wait
+        self.total_run_seconds += finished_at - started_at
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        """Kuyrukta bekleyen (henüz çalışmaya başlamamış) iş sayısı"""
+        return max(0, self._pending - self.max_workers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Havuz metrikleri"""
+        completed = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._pending,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_seconds / completed * 1000, 2),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "avg_run_ms": round(self.total_run_seconds / completed * 1000, 2),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global hashleme havuzu
+password_hash_pool = PasswordHashPool()
+
+
+def benchmark(duration: float = 2.0):
+    """Farklı ayarlar için tek thread'de saniyedeki hash sayısını yazdırır"""
+    settings = [("bcrypt", {"bcrypt_rounds": rounds}) for rounds in range(10, 15)]
+    if _argon2_available():
+        for time_cost, memory_cost in [(2, 19456), (3, 65536), (4, 131072)]:
+            settings.append(("argon2", {"argon2_time_cost": time_cost, "argon2_memory_cost": memory_cost}))
+    else:
+        print("argon2-cffi kurulu değil, argon2 ayarları atlandı")
+
+    print(f"{'ayar':<40}{'ms/hash':>10}{'hash/sn':>10}")
+    for scheme, options in settings:
+        context = build_password_context(
+            scheme, bcrypt_rounds=options.pop("bcrypt_rounds", BCRYPT_DEFAULT_ROUNDS), **options
+        )
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            context.hash(_CALIBRATION_PASSWORD)
+            count += 1
+        elapsed = time.perf_counter() - start
+        label = f"{scheme} " + (", ".join(f"{k}={v}" for k, v in options.items()) or
+                                f"rounds={context.handler().default_rounds}")
+        print(f"{label:<40}{elapsed / count * 1000:>10.1f}{count / elapsed:>10.1f}")
+
+    print(f"\nHedef {PASSWORD_HASH_TARGET_MS} ms için ölçülen bcrypt rounds: {calibrate_bcrypt_rounds()}")
+
+
+def calibrate():
+    """Hedef süreye uyan maliyeti ölçer ve .env için BCRYPT_ROUNDS satırını yazdırır"""
+    rounds = calibrate_bcrypt_rounds()
+    print(f"# {PASSWORD_HASH_TARGET_MS} ms hedefi için ölçüldü (en az {BCRYPT_MIN_ROUNDS})")
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Şifre hashleme ayarları")
+    parser.add_argument("--benchmark", action="store_true", help="Ayarların hash/sn değerlerini ölç")
+    parser.add_argument("--calibrate", action="store_true", help="BCRYPT_ROUNDS değerini bu makinede ölç")
+    parser.add_argument("--duration", type=float, default=2.0, help="Ayar başına ölçüm süresi (sn)")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.duration)
+    elif args.calibrate:
+        calibrate()
+    else:
+        parser.print_help()
@@ -3,12 +3,14 @@ Geçici kayıt sistemi - Redis ile Production-Ready implementasyon
 Kullanıcılar doğrulama kodunu girmeden önce Redis'te saklanır
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 import json
-import redis
+import redis.asyncio as aioredis
 from redis.exceptions import RedisError
 import logging
 
+from .redis_client import redis_client, redis_available, mark_redis_down, get_pool_stats
+
 logger = logging.getLogger(__name__)
 
 
@@ -75,7 +77,12 @@ class PendingRegistration:
 
 
 class RedisPendingRegistrationManager:
-    """Redis ile bekleyen kayıtları yönet - Production Ready"""
+    """
+    Redis ile bekleyen kayıtları yönet - Production Ready
+
+    Paylaşılan redis.asyncio havuzunu kullanır. Redis erişilemezken kayıtlar
+    süreç içi sözlükte tutulur ve okuma sırasında orada da aranır.
+    """
     
     # Redis key prefix
     KEY_PREFIX = "pending_registration:"
@@ -83,35 +90,21 @@ class RedisPendingRegistrationManager:
     # TTL (Time To Live) - 24 saat
     TTL_SECONDS = 24 * 60 * 60
     
-    def __init__(self, redis_url: str = "redis://localhost:6379/0"):
+    def __init__(self, client: aioredis.Redis = redis_client):
         """
-        Redis bağlantısını başlat
-        
         Args:
-            redis_url: Redis bağlantı URL'i (örn: redis://localhost:6379/0)
+            client: Redis istemcisi (varsayılan: paylaşılan havuz)
         """
-        try:
-            self.redis_client = redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
-            # Bağlantıyı test et
-            self.redis_client.ping()
-            logger.info("✅ Redis bağlantısı başarılı")
-        except RedisError as e:
-            logger.error(f"❌ Redis bağlantı hatası: {e}")
-            raise
+        self.redis_client = client
+        # Redis yokken yazılan kayıtlar: key -> JSON
+        self._local: Dict[str, str] = {}
     
     def _get_key(self, email: str, is_admin: bool = False) -> str:
         """Email ve is_admin için Redis key oluştur"""
         admin_suffix = "_admin" if is_admin else "_user"
         return f"{self.KEY_PREFIX}{email.lower()}{admin_suffix}"
     
-    def add_registration(self, registration: PendingRegistration) -> bool:
+    async def add_registration(self, registration: PendingRegistration) -> bool:
         """
         Yeni bekleyen kayıt ekle
         
@@ -121,26 +114,26 @@ class RedisPendingRegistrationManager:
         Returns:
             bool: Başarılı ise True
         """
-        try:
-            key = self._get_key(registration.email, registration.is_admin)
-            data = json.dumps(registration.to_dict())
-            
-            # Redis'e kaydet ve TTL ayarla
-            self.redis_client.setex(
-                key,
-                self.TTL_SECONDS,
-                data
-            )
-            
-            admin_type = "admin" if registration.is_admin else "user"
-            logger.info(f"✅ Pending registration eklendi: {registration.email} ({admin_type})")
-            return True
-            
-        except RedisError as e:
-            logger.error(f"❌ Redis kayıt hatası: {e}")
-            return False
+        key = self._get_key(registration.email, registration.is_admin)
+        data = json.dumps(registration.to_dict())
+        admin_type = "admin" if registration.is_admin else "user"
+        
+        if redis_available():
+            try:
+                # Redis'e kaydet ve TTL ayarla
+                await self.redis_client.setex(key, self.TTL_SECONDS, data)
+                self._local.pop(key, None)
+                logger.info(f"✅ Pending registration eklendi: {registration.email} ({admin_type})")
+                return True
+            except (RedisError, OSError) as e:
+                mark_redis_down(e, "pending_registrations")
+        
+        self._cleanup_local()
+        self._local[key] = data
+        logger.warning(f"⚠️ Pending registration bellekte tutuluyor (Redis yok): {registration.email} ({admin_type})")
+        return True
     
-    def get_registration(self, email: str, is_admin: bool = False) -> Optional[PendingRegistration]:
+    async def get_registration(self, email: str, is_admin: bool = False) -> Optional[PendingRegistration]:
         """
         Email ve is_admin'e göre bekleyen kaydı getir
         
@@ -151,27 +144,32 @@ class RedisPendingRegistrationManager:
         Returns:
             PendingRegistration veya None
         """
+        key = self._get_key(email, is_admin)
+        data = None
+        if redis_available():
+            try:
+                data = await self.redis_client.get(key)
+            except (RedisError, OSError) as e:
+                mark_redis_down(e, "pending_registrations")
+        if not data:
+            data = self._local.get(key)
+        if not data:
+            return None
+        
         try:
-            key = self._get_key(email, is_admin)
-            data = self.redis_client.get(key)
-            
-            if not data:
-                return None
-            
             registration = PendingRegistration.from_dict(json.loads(data))
-            
-            # Süresi dolmuş mu kontrol et
-            if registration.is_expired():
-                self.remove_registration(email, is_admin)
-                return None
-            
-            return registration
-            
-        except (RedisError, json.JSONDecodeError, KeyError) as e:
+        except (json.JSONDecodeError, KeyError) as e:
             logger.error(f"❌ Redis okuma hatası: {e}")
             return None
+        
+        # Süresi dolmuş mu kontrol et
+        if registration.is_expired():
+            await self.remove_registration(email, is_admin)
+            return None
+        
+        return registration
     
-    def remove_registration(self, email: str, is_admin: bool = False) -> bool:
+    async def remove_registration(self, email: str, is_admin: bool = False) -> bool:
         """
         Bekleyen kaydı sil
         
@@ -182,21 +180,21 @@ class RedisPendingRegistrationManager:
         Returns:
             bool: Başarılı ise True
         """
-        try:
-            key = self._get_key(email, is_admin)
-            result = self.redis_client.delete(key)
-            
-            if result:
-                admin_type = "admin" if is_admin else "user"
-                logger.info(f"✅ Pending registration silindi: {email} ({admin_type})")
-            
-            return bool(result)
-            
-        except RedisError as e:
-            logger.error(f"❌ Redis silme hatası: {e}")
-            return False
+        key = self._get_key(email, is_admin)
+        result = self._local.pop(key, None) is not None
+        if redis_available():
+            try:
+                result = bool(await self.redis_client.delete(key)) or result
+            except (RedisError, OSError) as e:
+                mark_redis_down(e, "pending_registrations")
+        
+        if result:
+            admin_type = "admin" if is_admin else "user"
+            logger.info(f"✅ Pending registration silindi: {email} ({admin_type})")
+        
+        return result
     
-    def verify_and_remove(self, email: str, code: str, is_admin: bool = False) -> Optional[PendingRegistration]:
+    async def verify_and_remove(self, email: str, code: str, is_admin: bool = False) -> Optional[PendingRegistration]:
         """
         Kodu doğrula ve kaydı sil
         
@@ -208,31 +206,24 @@ class RedisPendingRegistrationManager:
         Returns:
             PendingRegistration veya None
         """
-        try:
-            registration = self.get_registration(email, is_admin)
-            
-            if not registration:
-                admin_type = "admin" if is_admin else "user"
-                logger.warning(f"⚠️ Pending registration bulunamadı: {email} ({admin_type})")
-                return None
-            
-            if not registration.verify_code(code):
-                admin_type = "admin" if is_admin else "user"
-                logger.warning(f"⚠️ Geçersiz doğrulama kodu: {email} ({admin_type})")
-                return None
-            
-            # Doğrulama başarılı, kaydı sil
-            self.remove_registration(email, is_admin)
-            admin_type = "admin" if is_admin else "user"
-            logger.info(f"✅ Doğrulama başarılı: {email} ({admin_type})")
-            
-            return registration
-            
-        except Exception as e:
-            logger.error(f"❌ Doğrulama hatası: {e}")
+        admin_type = "admin" if is_admin else "user"
+        registration = await self.get_registration(email, is_admin)
+        
+        if not registration:
+            logger.warning(f"⚠️ Pending registration bulunamadı: {email} ({admin_type})")
+            return None
+        
+        if not registration.verify_code(code):
+            logger.warning(f"⚠️ Geçersiz doğrulama kodu: {email} ({admin_type})")
             return None
+        
+        # Doğrulama başarılı, kaydı sil
+        await self.remove_registration(email, is_admin)
+        logger.info(f"✅ Doğrulama başarılı: {email} ({admin_type})")
+        
+        return registration
     
-    def update_verification_code(self, email: str, new_code: str, is_admin: bool = False) -> bool:
+    async def update_verification_code(self, email: str, new_code: str, is_admin: bool = False) -> bool:
         """
         Doğrulama kodunu güncelle (resend için)
         
@@ -244,38 +235,40 @@ class RedisPendingRegistrationManager:
         Returns:
             bool: Başarılı ise True
         """
-        try:
-            registration = self.get_registration(email, is_admin)
-            
-            if not registration:
-                return False
-            
-            # Yeni kod ile güncelle
-            registration.verification_code = new_code
-            
-            # TTL'i sıfırla (24 saat daha)
-            registration.expires_at = datetime.now() + timedelta(hours=24)
-            
-            return self.add_registration(registration)
-            
-        except Exception as e:
-            logger.error(f"❌ Kod güncelleme hatası: {e}")
+        registration = await self.get_registration(email, is_admin)
+        
+        if not registration:
             return False
+        
+        # Yeni kod ile güncelle
+        registration.verification_code = new_code
+        
+        # TTL'i sıfırla (24 saat daha)
+        registration.expires_at = datetime.now() + timedelta(hours=24)
+        
+        return await self.add_registration(registration)
     
-    def get_stats(self) -> dict:
+    async def get_stats(self) -> dict:
         """
         İstatistikleri getir
         
         Returns:
             dict: Toplam pending registration sayısı ve email listesi
         """
+        self._cleanup_local()
+        emails = [key.replace(self.KEY_PREFIX, "") for key in self._local]
+        if not redis_available():
+            # Kesinti sırasında her çağrıda bağlantı zaman aşımı beklenmez
+            return {
+                "total_pending": len(emails),
+                "emails": emails,
+                "redis_connected": False
+            }
         try:
             # Tüm pending registration key'lerini getir
             pattern = f"{self.KEY_PREFIX}*"
-            keys = list(self.redis_client.scan_iter(match=pattern))
-            
-            # Email'leri çıkar
-            emails = [key.replace(self.KEY_PREFIX, "") for key in keys]
+            async for key in self.redis_client.scan_iter(match=pattern):
+                emails.append(key.replace(self.KEY_PREFIX, ""))
             
             return {
                 "total_pending": len(emails),
@@ -283,88 +276,83 @@ class RedisPendingRegistrationManager:
                 "redis_connected": True
             }
             
-        except RedisError as e:
-            logger.error(f"❌ Redis stats hatası: {e}")
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "pending_registrations")
             return {
-                "total_pending": 0,
-                "emails": [],
+                "total_pending": len(emails),
+                "emails": emails,
                 "redis_connected": False,
                 "error": str(e)
             }
     
-    def cleanup_expired(self) -> int:
+    def _cleanup_local(self):
+        """Bellekteki süresi dolmuş kayıtları temizle"""
+        now = datetime.now()
+        expired = [
+            key for key, data in self._local.items()
+            if datetime.fromisoformat(json.loads(data)["expires_at"]) < now
+        ]
+        for key in expired:
+            del self._local[key]
+    
+    async def cleanup_expired(self) -> int:
         """
         Süresi dolmuş kayıtları temizle
         
+        Redis'teki kayıtlar TTL ile kendiliğinden düşer; burada bellekte
+        tutulanlar temizlenir.
+        
         Returns:
             int: Temizlenen kayıt sayısı
         """
-        try:
-            pattern = f"{self.KEY_PREFIX}*"
-            keys = list(self.redis_client.scan_iter(match=pattern))
-            
-            cleaned = 0
-            for key in keys:
-                email = key.replace(self.KEY_PREFIX, "")
-                registration = self.get_registration(email)
-                
-                # get_registration zaten expired olanları siler
-                if not registration:
-                    cleaned += 1
-            
-            if cleaned > 0:
-                logger.info(f"✅ {cleaned} expired registration temizlendi")
-            
-            return cleaned
-            
-        except RedisError as e:
-            logger.error(f"❌ Cleanup hatası: {e}")
-            return 0
+        before = len(self._local)
+        self._cleanup_local()
+        cleaned = before - len(self._local)
+        
+        if cleaned > 0:
+            logger.info(f"✅ {cleaned} expired registration temizlendi")
+        
+        return cleaned
     
-    def health_check(self) -> dict:
+    async def health_check(self) -> dict:
         """
         Redis sağlık kontrolü
         
+        Redis kesintide işaretliyse bağlanmayı denemeden "down" döner;
+        sağlık yoklamaları kesinti boyunca yavaşlamaz ve log doldurmaz.
+        
         Returns:
             dict: Sağlık durumu bilgileri
         """
+        if not redis_available():
+            return {
+                "status": "down",
+                "pool": get_pool_stats()
+            }
         try:
-            # Ping testi
-            ping_result = self.redis_client.ping()
-            
-            # Info bilgisi
-            info = self.redis_client.info()
+            # Ping testi ve info bilgisi tek round trip
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.ping()
+                pipe.info()
+                ping_result, info = await pipe.execute()
             
             return {
                 "status": "healthy",
                 "ping": ping_result,
                 "connected_clients": info.get("connected_clients", 0),
                 "used_memory_human": info.get("used_memory_human", "N/A"),
-                "uptime_in_seconds": info.get("uptime_in_seconds", 0)
+                "uptime_in_seconds": info.get("uptime_in_seconds", 0),
+                "pool": get_pool_stats()
             }
             
-        except RedisError as e:
-            logger.error(f"❌ Health check hatası: {e}")
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "health_check")
             return {
                 "status": "unhealthy",
-                "error": str(e)
+                "error": str(e),
+                "pool": get_pool_stats()
             }
 
 
-# Global instance - Environment variable'dan Redis URL al
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Redis URL'i environment variable'dan al, yoksa localhost kullan
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-
-try:
-    pending_registration_manager = RedisPendingRegistrationManager(REDIS_URL)
-except RedisError as e:
-    logger.error(f"❌ Redis başlatılamadı: {e}")
-    logger.warning("⚠️ Fallback olarak in-memory manager kullanılacak")
-    # Fallback: In-memory manager kullan
-    from backend.pending_registrations import PendingRegistrationManager
-    pending_registration_manager = PendingRegistrationManager()
\ No newline at end of file
+# Global instance (paylaşılan Redis havuzunu kullanır)
+pending_registration_manager = RedisPendingRegistrationManager()
@@ -0,0 +1,141 @@
+# backend/redis_client.py
+"""
+Paylaşılan Redis bağlantı havuzu
+
+Backend'deki tüm Redis kullanıcıları (giriş denemesi takibi, bekleyen
+kayıtlar, güvenlik audit logu, katalog önbelleği, token iptal deposu) aynı
+redis.asyncio havuzunu kullanır; async endpoint'lerden yapılan Redis
+çağrıları event loop'u bloklamaz. Bağlantı sayısı ve zaman aşımları tek
+yerden ayarlanır.
+
+Redis erişilemez olduğunda ilk hatayı alan modül mark_redis_down ile
+durumu işaretler ve REDIS_RETRY_SECONDS boyunca diğer modüller de Redis'i
+denemeden kendi yedek yollarına (bellek, veritabanı) geçer; her istekte
+bağlantı zaman aşımı beklenmez.
+
+Rate limiter (slowapi) senkron çalıştığı için asyncio havuzunu kullanamaz;
+aynı URL ve ayarlarla kendi senkron havuzunu açar (limiter_storage_options).
+"""
+import logging
+import os
+import time
+
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from redis.asyncio.client import Pipeline
+
+from .metrics import observe_redis_command
+from .server_timing import record_timing
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 1.0))
+# Havuz doluyken boş bağlantı için beklenecek azami süre
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 1.0))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+# Redis hatasından sonra yeniden denemeden önce beklenecek süre
+REDIS_RETRY_SECONDS = int(os.getenv("REDIS_RETRY_SECONDS", 30))
+
+# Havuz doluysa hemen hata vermek yerine REDIS_POOL_TIMEOUT kadar bekler
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    decode_responses=True,
+)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline'ı tek bir PIPELINE komutu olarak ölçer"""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute(raise_on_error)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            observe_redis_command("PIPELINE", elapsed, failed)
+            record_timing("redis", elapsed, f"PIPELINE x{len(self.command_stack)}")
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """Komut sürelerini Prometheus metriklerine yazan Redis istemcisi"""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute_command(*args, **options)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            command = str(args[0]).upper()
+            observe_redis_command(command, elapsed, failed)
+            record_timing("redis", elapsed, command)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# Global Redis istemcisi
+redis_client = InstrumentedRedis(connection_pool=redis_pool)
+
+_redis_down_until = 0.0
+
+
+def redis_available() -> bool:
+    """Redis son hatadan sonra yeniden denenebilir mi"""
+    return time.monotonic() >= _redis_down_until
+
+
+def mark_redis_down(error: Exception, component: str = "redis"):
+    """Redis hatasını kaydeder; REDIS_RETRY_SECONDS boyunca Redis atlanır"""
+    global _redis_down_until
+    if redis_available():
+        logger.warning(f"Redis'e erişilemiyor ({component}), {REDIS_RETRY_SECONDS} sn yedek yol kullanılacak: {error}")
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def mark_redis_up():
+    """Başarılı bir Redis çağrısından sonra bekleme süresini kaldırır"""
+    global _redis_down_until
+    _redis_down_until = 0.0
+
+
+def limiter_storage_options() -> dict:
+    """slowapi/limits senkron Redis depolaması için havuz ayarları"""
+    return {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+def get_pool_stats() -> dict:
+    """Havuz kullanım bilgisi (health endpoint'i için)"""
+    return {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "in_use": len(redis_pool._in_use_connections),
+        "available": redis_available(),
+    }
+
+
+async def close_redis():
+    """Havuzdaki bağlantıları kapatır (uygulama kapanırken)"""
+    try:
+        await redis_pool.disconnect()
+    except (aioredis.RedisError, OSError):
+        pass
@@ -256,11 +256,11 @@ class ResendVerificationResponse(BaseModel):
 # Sipariş oluştururken her bir ürünün bilgisi
 class OrderItemCreate(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
 
 # Sipariş oluştururken API'ye gönderilecek ana veri
 class OrderCreate(BaseModel):
-    items: list[OrderItemCreate]
+    items: list[OrderItemCreate] = Field(..., min_length=1)
 
 # API'den sipariş detaylarını döndürürken
 class OrderItem(BaseModel):
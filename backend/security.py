@@ -1,5 +1,6 @@
 # backend/security.py
 
+import asyncio
 import hashlib
 import hmac
 import logging
@@ -8,28 +9,35 @@ import secrets
 import string
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping, Set, Tuple
 
-import redis
 from fastapi import HTTPException, status, Depends, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from jwt import ExpiredSignatureError
-from passlib.context import CryptContext
+from redis.exceptions import RedisError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from . import models
-from .database import SessionLocal
+from .database import AsyncSessionLocal, get_db
+from .token_revocation import revocation_store
+from .password_hashing import password_hash_pool, PasswordHashPoolBusy, build_password_context
+from .redis_client import REDIS_URL, redis_client, redis_available, mark_redis_down, limiter_storage_options
+from .audit_log import audit_log_writer
+from .server_timing import set_request_user, timed
 
 # Logging yapılandırması
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Şifre hashleme yapılandırması
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Şifre hashleme yapılandırması (maliyet açılışta bu makineye göre ölçülür)
+pwd_context = build_password_context()
 
 # JWT yapılandırması
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -55,24 +63,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-# Rate limiting için Redis bağlantısı
-try:
-    redis_client = redis.Redis(
-        host=os.getenv("REDIS_HOST", "localhost"),
-        port=int(os.getenv("REDIS_PORT", 6379)),
-        db=0
-    )
-    # Redis bağlantısını test et
-    redis_client.ping()
-    logger.info("Redis bağlantısı başarılı")
-except Exception as e:
-    logger.warning(f"Redis bağlantısı başarısız, memory storage kullanılacak: {e}")
-    redis_client = None
-
-# Rate limiter yapılandırması
+# Rate limiter yapılandırması (Redis erişilemezse bellek içi limite düşer)
 limiter = Limiter(
     key_func=get_remote_address,
-    storage_uri="redis://localhost:6379" if redis_client else "memory://",
+    storage_uri=REDIS_URL,
+    storage_options=limiter_storage_options(),
+    in_memory_fallback_enabled=True,
     default_limits=["1000/hour"]
 )
 
@@ -189,6 +185,43 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Şifreyi doğrular"""
     return pwd_context.verify(plain_password, hashed_password)
 
+def _password_pool_busy() -> HTTPException:
+    logger.warning("Şifre hashleme havuzu dolu, istek reddedildi")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Sunucu şu anda yoğun, lütfen birkaç saniye sonra tekrar deneyin",
+        headers={"Retry-After": "2"}
+    )
+
+async def hash_password_async(password: str) -> str:
+    """Şifreyi event loop'u bloklamadan hashleme havuzunda hashler"""
+    try:
+        return await password_hash_pool.run(hash_password, password)
+    except PasswordHashPoolBusy:
+        raise _password_pool_busy()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Şifreyi event loop'u bloklamadan hashleme havuzunda doğrular"""
+    try:
+        return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+    except PasswordHashPoolBusy:
+        raise _password_pool_busy()
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Şifreyi doğrular; hash eski şema/maliyetteyse yeni hash'i de döndürür
+
+    Returns:
+        (doğru mu, yeni hash veya None)
+    """
+    try:
+        return await password_hash_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+    except PasswordHashPoolBusy:
+        raise _password_pool_busy()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Access token oluşturur"""
     to_encode = data.copy()
@@ -246,19 +279,11 @@ def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, A
         return None
 
 def is_token_blacklisted(jti: str) -> bool:
-    """Token'ın blacklist'te olup olmadığını kontrol eder"""
-    db = SessionLocal()
-    try:
-        blacklisted = db.query(models.BlacklistedToken).filter(
-            models.BlacklistedToken.token_jti == jti,
-            models.BlacklistedToken.expires_at > datetime.now(timezone.utc)
-        ).first()
-        return blacklisted is not None
-    finally:
-        db.close()
+    """Token'ın blacklist'te olup olmadığını kontrol eder (bellekten, I/O yok)"""
+    return revocation_store.is_revoked(jti)
 
-def blacklist_token(token: str, user_id: Optional[int] = None, reason: str = "logout"):
-    """Token'ı blacklist'e ekler"""
+async def blacklist_token(token: str, user_id: Optional[int] = None, reason: str = "logout"):
+    """Token'ı blacklist'e ekler (veritabanı + bellek + Redis)"""
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -269,12 +294,11 @@ def blacklist_token(token: str, user_id: Optional[int] = None, reason: str = "lo
         if not jti:
             return False
         
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             # Zaten blacklist'te mi kontrol et
-            existing = db.query(models.BlacklistedToken).filter(
+            existing = await db.scalar(select(models.BlacklistedToken.id).where(
                 models.BlacklistedToken.token_jti == jti
-            ).first()
+            ))
             
             if not existing:
                 blacklisted_token = models.BlacklistedToken(
@@ -285,11 +309,11 @@ def blacklist_token(token: str, user_id: Optional[int] = None, reason: str = "lo
                     reason=reason
                 )
                 db.add(blacklisted_token)
-                db.commit()
-            
-            return True
-        finally:
-            db.close()
+                await db.commit()
+        
+        # Diğer worker'lar pub/sub ile öğrenir
+        await revocation_store.revoke(jti, expires_at)
+        return True
             
     except JWTError as e:
         logger.error(f"JWT decode hatası blacklist_token fonksiyonunda: {str(e)}")
@@ -297,29 +321,62 @@ def blacklist_token(token: str, user_id: Optional[int] = None, reason: str = "lo
         logger.error(f"User ID: {user_id}, Reason: {reason}")
         return False
 
-def cleanup_expired_blacklisted_tokens():
-    """Süresi dolmuş blacklist token'larını temizler"""
-
-    
-    db = SessionLocal()
-    try:
-        expired_tokens = db.query(models.BlacklistedToken).filter(
-            models.BlacklistedToken.expires_at <= datetime.now(timezone.utc)
-        ).all()
-        
-        count = len(expired_tokens)
-        for token in expired_tokens:
-            db.delete(token)
-        
-        db.commit()
-        logger.info(f"Temizlenen süresi dolmuş blacklist token sayısı: {count}")
-        return count
-    finally:
-        db.close()
+async def cleanup_expired_blacklisted_tokens() -> int:
+    """Süresi dolmuş blacklist token'larını tek DELETE ile temizler"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(models.BlacklistedToken)
+            .where(models.BlacklistedToken.expires_at <= datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    count = result.rowcount
+    logger.info(f"Temizlenen süresi dolmuş blacklist token sayısı: {count}")
+    return count
 
 class LoginAttemptTracker:
-    """Giriş denemesi takip sınıfı"""
-    
+    """
+    Giriş denemesi takip sınıfı
+
+    Kilit kontrolü ve deneme sayacı Redis'te Lua script'leri ile atomik
+    çalışır. Deneme, şifre doğrulanmadan önce check_and_increment ile
+    sayılır; böylece paralel brute-force istekleri kilit kontrolünü aynı anda
+    geçemez ve bir giriş denemesi için tek Redis round trip yeterli olur.
+    Başarılı girişte sayaç clear_attempts_in_background ile, yanıt bu
+    round trip'i beklemeden sıfırlanır.
+    """
+
+    # KEYS[1]: deneme sayacı, KEYS[2]: kilit anahtarı
+    # ARGV[1]: azami deneme, ARGV[2]: süre (saniye)
+    # Dönüş: {kilitli mi (0/1), deneme sayısı}
+    CHECK_AND_INCREMENT_SCRIPT = """
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        return {1, tonumber(redis.call('GET', KEYS[1]) or ARGV[1])}
+    end
+    local attempts = redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    if attempts >= tonumber(ARGV[1]) then
+        redis.call('SET', KEYS[2], 'locked', 'EX', ARGV[2])
+    end
+    return {0, attempts}
+    """
+
+    # Dönüş: {kilitli mi (0/1), deneme sayısı}
+    STATUS_SCRIPT = """
+    return {redis.call('EXISTS', KEYS[2]), tonumber(redis.call('GET', KEYS[1]) or 0)}
+    """
+
+    # Dönüş: silinen anahtar sayısı
+    CLEAR_SCRIPT = """
+    return redis.call('DEL', KEYS[1], KEYS[2])
+    """
+
+    _check_and_increment = redis_client.register_script(CHECK_AND_INCREMENT_SCRIPT)
+    _status = redis_client.register_script(STATUS_SCRIPT)
+    _clear = redis_client.register_script(CLEAR_SCRIPT)
+    # Beklenmeden başlatılan temizleme görevleri (GC'ye karşı referans)
+    _pending_clears: Set[asyncio.Task] = set()
+
     @staticmethod
     def get_attempt_key(identifier: str) -> str:
         """Giriş denemesi anahtarı oluşturur"""
@@ -329,76 +386,151 @@ class LoginAttemptTracker:
     def get_lockout_key(identifier: str) -> str:
         """Kilitleme anahtarı oluşturur"""
         return f"lockout:{identifier}"
-    
+
     @staticmethod
-    def record_failed_attempt(identifier: str) -> int:
-        """Başarısız giriş denemesini kaydeder"""
-        if not redis_client:
+    def _keys(identifier: str) -> list:
+        return [LoginAttemptTracker.get_attempt_key(identifier), LoginAttemptTracker.get_lockout_key(identifier)]
+
+    @staticmethod
+    async def check_and_increment(identifier: str) -> Tuple[bool, int]:
+        """
+        Hesap kilitli değilse denemeyi sayar (tek round trip)
+
+        Returns:
+            (kilitli mi, deneme sayısı). Kilitliyse deneme sayılmaz.
+        """
+        if not redis_available():
             # DÜZELTME: Redis yoksa, saldırgana kilitlenme mekanizmasının olmadığını belli etmemeliyiz.
-            # 0 döndürerek (ve hiçbir zaman kilitlemeyerek) sistemi çalışır tutuyoruz.
-            # Güvenlik logu burada yeterlidir.
+            # Hiçbir zaman kilitlemeyerek sistemi çalışır tutuyoruz.
             logger.warning(f"Redis bağlantısı yok, {identifier} için kilitleme devre dışı.")
-            return 0  # 0 döndür ki, endpoint'te MAX_LOGIN_ATTEMPTS kontrolünden geçsin.
-        
-        key = LoginAttemptTracker.get_attempt_key(identifier)
-        attempts = redis_client.incr(key)
-        redis_client.expire(key, SecurityConfig.LOCKOUT_DURATION_MINUTES * 60)
-        
-        if attempts >= SecurityConfig.MAX_LOGIN_ATTEMPTS:
-            lockout_key = LoginAttemptTracker.get_lockout_key(identifier)
-            redis_client.setex(
-                lockout_key, 
-                SecurityConfig.LOCKOUT_DURATION_MINUTES * 60, 
-                "locked"
+            return False, 0
+
+        try:
+            locked, attempts = await LoginAttemptTracker._check_and_increment(
+                keys=LoginAttemptTracker._keys(identifier),
+                args=[SecurityConfig.MAX_LOGIN_ATTEMPTS, SecurityConfig.LOCKOUT_DURATION_MINUTES * 60]
             )
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "login_attempts")
+            logger.warning(f"Giriş denemesi sayılamadı, {identifier} için kilitleme atlandı")
+            return False, 0
+
+        if not locked and attempts >= SecurityConfig.MAX_LOGIN_ATTEMPTS:
             logger.warning(f"Hesap kilitlendi: {identifier}")
-        
-        return attempts
+        return bool(locked), int(attempts)
+
+    @staticmethod
+    async def record_failed_attempt(identifier: str) -> int:
+        """Başarısız giriş denemesini kaydeder"""
+        return (await LoginAttemptTracker.check_and_increment(identifier))[1]
     
     @staticmethod
-    def clear_attempts(identifier: str):
+    async def clear_attempts(identifier: str):
         """Giriş denemelerini temizler"""
-        if not redis_client:
+        if not redis_available():
             return
-        
-        attempt_key = LoginAttemptTracker.get_attempt_key(identifier)
-        lockout_key = LoginAttemptTracker.get_lockout_key(identifier)
-        redis_client.delete(attempt_key, lockout_key)
+
+        try:
+            await LoginAttemptTracker._clear(keys=LoginAttemptTracker._keys(identifier))
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "login_attempts")
+
+    @staticmethod
+    def clear_attempts_in_background(identifier: str):
+        """
+        Giriş denemelerini yanıtı bekletmeden temizler (başarılı giriş)
+
+        Giriş isteği sadece check_and_increment round trip'ini bekler. Bedeli:
+        temizlik bitmeden aynı hesaba gelen başarısız deneme sayacı sıfırdan
+        değil bir fazlasından başlatabilir.
+        """
+        if not redis_available():
+            return
+        task = asyncio.create_task(LoginAttemptTracker.clear_attempts(identifier))
+        LoginAttemptTracker._pending_clears.add(task)
+        task.add_done_callback(LoginAttemptTracker._pending_clears.discard)
     
     @staticmethod
-    def is_locked(identifier: str) -> bool:
+    async def _get_status(identifier: str) -> Tuple[bool, int]:
+        if not redis_available():
+            return False, 0
+        try:
+            locked, attempts = await LoginAttemptTracker._status(keys=LoginAttemptTracker._keys(identifier))
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "login_attempts")
+            return False, 0
+        return bool(locked), int(attempts)
+
+    @staticmethod
+    async def is_locked(identifier: str) -> bool:
         """Hesabın kilitli olup olmadığını kontrol eder"""
-        if not redis_client:
-            return False
-        
-        lockout_key = LoginAttemptTracker.get_lockout_key(identifier)
-        return redis_client.exists(lockout_key)
+        return (await LoginAttemptTracker._get_status(identifier))[0]
     
     @staticmethod
-    def get_remaining_attempts(identifier: str) -> int:
+    async def get_remaining_attempts(identifier: str) -> int:
         """Kalan giriş denemesi sayısını döndürür"""
-        if not redis_client:
-            return SecurityConfig.MAX_LOGIN_ATTEMPTS
-        
-        key = LoginAttemptTracker.get_attempt_key(identifier)
-        attempts = redis_client.get(key)
-        if attempts:
-            return max(0, SecurityConfig.MAX_LOGIN_ATTEMPTS - int(attempts))
-        return SecurityConfig.MAX_LOGIN_ATTEMPTS
-
-def get_db():
-    """Veritabanı session'ı döndürür"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+        attempts = (await LoginAttemptTracker._get_status(identifier))[1]
+        return max(0, SecurityConfig.MAX_LOGIN_ATTEMPTS - attempts)
+
+class TokenUser:
+    """
+    Access token claim'lerinden oluşturulan kullanıcı
+
+    Kimlik doğrulama için users tablosuna gidilmez; token_version kontrolü
+    token'ın hâlâ geçerli olduğunu garanti eder. Tüm kullanıcı kaydı gereken
+    endpoint'ler get_current_user_record kullanır.
+    """
+    __slots__ = ("id", "is_admin", "is_active", "token_version")
+    
+    def __init__(self, id: int, is_admin: bool, is_active: bool, token_version: int):
+        self.id = id
+        self.is_admin = is_admin
+        self.is_active = is_active
+        self.token_version = token_version
+
+def user_token_claims(user: models.User) -> Dict[str, Any]:
+    """Access/refresh token'a konacak kullanıcı claim'leri"""
+    return {
+        "sub": str(user.id),
+        "is_admin": bool(user.is_admin),
+        "is_active": bool(user.is_active),
+        "ver": user.token_version or 0,
+    }
+
+async def bump_token_version(db: AsyncSession, user: models.User) -> int:
+    """
+    Kullanıcının mevcut tüm token'larını geçersiz kılar
+
+    Sürüm veritabanında atomik olarak artırılır; eşzamanlı iki artırma (ör.
+    şifre değişimi ve admin pasife alması) aynı sürümü yazamaz. Çağıran
+    commit'ten önce çağırır; sürüm commit sonrası publish_token_version ile
+    yayınlanır.
+    """
+    new_version = await db.scalar(
+        update(models.User)
+        .where(models.User.id == user.id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+        .execution_options(synchronize_session=False)
+    )
+    set_committed_value(user, "token_version", new_version)
+    return new_version
+
+async def publish_token_version(user: models.User):
+    """Commit edilmiş yeni token sürümünü önbelleğe ve diğer worker'lara bildirir"""
+    await revocation_store.set_token_version(user.id, user.token_version)
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> models.User:
-    """Mevcut kullanıcıyı token'dan alır"""
+    db: AsyncSession = Depends(get_db)
+) -> TokenUser:
+    """Mevcut kullanıcıyı token claim'lerinden alır (kullanıcı satırı okunmaz)"""
+    with timed("auth"):
+        user = await _authenticate(credentials, db)
+    set_request_user(user)
+    return user
+
+async def _authenticate(credentials: HTTPAuthorizationCredentials, db: AsyncSession) -> TokenUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Geçersiz kimlik bilgileri",
@@ -410,28 +542,63 @@ async def get_current_user(
         if payload is None:
             raise credentials_exception
         
-        user_id: int = payload.get("sub")
-        if user_id is None:
+        user_id = int(payload.get("sub"))
+        token_version = payload.get("ver")
+        if token_version is None:
+            # Claim'siz eski token'lar: yeniden giriş gerekir
             raise credentials_exception
             
-    except JWTError:
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
+    # Şifre değişimi, pasife alma veya admin iptali sürümü artırır
+    current_version = await revocation_store.get_token_version(user_id, db)
+    if current_version is None or current_version != token_version:
         raise credentials_exception
     
-    if user.is_active is False:
+    if payload.get("is_active") is not True:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Hesap aktif değil"
         )
     
+    return TokenUser(
+        id=user_id,
+        is_admin=payload.get("is_admin") is True,
+        is_active=True,
+        token_version=token_version
+    )
+
+async def authenticate_token(token: str) -> Tuple[TokenUser, Dict[str, Any]]:
+    """
+    Ham access token'ı doğrular (WebSocket abonelikleri için)
+
+    HTTP bağımlılıkları dışında çağrıldığı için kendi oturumunu açar;
+    geçersiz token'da get_current_user ile aynı HTTPException'ı fırlatır.
+    Kullanıcıyla birlikte token claim'lerini (jti, exp) döndürür.
+    """
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    async with AsyncSessionLocal() as db:
+        user = await _authenticate(credentials, db)
+    return user, verify_token(token, "access") or {}
+
+async def get_current_user_record(
+    current_user: TokenUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> models.User:
+    """Token'ı doğrular ve kullanıcının veritabanı kaydını döndürür"""
+    user = await db.scalar(select(models.User).where(models.User.id == current_user.id))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Geçersiz kimlik bilgileri",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 async def get_current_admin_user(
-    current_user: models.User = Depends(get_current_user)
-) -> models.User:
+    current_user: TokenUser = Depends(get_current_user)
+) -> TokenUser:
     """Admin yetkisi olan kullanıcıyı döndürür"""
     if not getattr(current_user, 'is_admin', False):
         raise HTTPException(
@@ -457,19 +624,22 @@ def hash_api_key(api_key: str) -> str:
 
 class SecurityHeaders:
     """Güvenlik başlıkları sınıfı"""
+
+    # Her yanıtta aynıdır; bir kez oluşturulur (salt okunur, değiştirilirse tüm yanıtları etkilerdi)
+    HEADERS: Mapping[str, str] = MappingProxyType({
+        "X-Content-Type-Options": "nosniff",
+        "X-Frame-Options": "DENY",
+        "X-XSS-Protection": "1; mode=block",
+        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+        "Content-Security-Policy": "default-src 'self'",
+        "Referrer-Policy": "strict-origin-when-cross-origin",
+        "Permissions-Policy": "geolocation=(), microphone=(), camera=()"
+    })
     
     @staticmethod
     def get_security_headers() -> Dict[str, str]:
-        """Güvenlik başlıklarını döndürür"""
-        return {
-            "X-Content-Type-Options": "nosniff",
-            "X-Frame-Options": "DENY",
-            "X-XSS-Protection": "1; mode=block",
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-            "Content-Security-Policy": "default-src 'self'",
-            "Referrer-Policy": "strict-origin-when-cross-origin",
-            "Permissions-Policy": "geolocation=(), microphone=(), camera=()"
-        }
+        """Güvenlik başlıklarının bir kopyasını döndürür"""
+        return dict(SecurityHeaders.HEADERS)
 
 def validate_file_upload(file_content: bytes, filename: str) -> bool:
     """Dosya yükleme güvenlik kontrolü"""
@@ -641,26 +811,21 @@ def validate_sql_input(input_string: str) -> bool:
 
 # Güvenlik olayları için audit log
 class SecurityAuditLogger:
-    """Güvenlik audit log sınıfı"""
+    """
+    Güvenlik audit log sınıfı
+
+    Olaylar audit_log_writer kuyruğuna eklenir; veritabanı, Redis ve log
+    yazımı arka planda toplu yapılır (bkz. backend/audit_log.py).
+    """
     
     @staticmethod
     def log_security_event(event_type: str, user_id: Optional[int], details: Dict[str, Any], request: Request):
         """Güvenlik olayını loglar"""
-        log_entry = {
+        audit_log_writer.submit({
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "event_type": event_type,
             "user_id": user_id,
             "ip_address": get_remote_address(request),
             "user_agent": request.headers.get("user-agent"),
             "details": details
-        }
-        
-        logger.info(f"SECURITY_EVENT: {log_entry}")
-        
-        # Redis'e de kaydet (opsiyonel)
-        if redis_client:
-            try:
-                redis_client.lpush("security_events", str(log_entry))
-                redis_client.ltrim("security_events", 0, 999)  # Son 1000 olayı tut
-            except Exception as e:
-                logger.error(f"Redis'e security event kaydedilemedi: {e}")
\ No newline at end of file
+        })
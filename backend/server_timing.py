@@ -0,0 +1,196 @@
+# backend/server_timing.py
+"""
+İstek başına süre dökümü (Server-Timing başlığı)
+
+Her istek için bir RequestTimings nesnesi ContextVar'da tutulur. Veritabanı
+(cursor_execute olayları), Redis (paylaşılan istemci), kimlik doğrulama
+dependency'si, şifre hashleme, endpoint fonksiyonu ve yanıt serileştirmesi
+süreleri buraya eklenir. SecurityMiddleware yanıt başlığında toplamları
+Server-Timing olarak döndürür:
+
+    Server-Timing: db;dur=4.1;desc="3", redis;dur=0.6;desc="1", auth;dur=1.2,
+                   endpoint;dur=6.3, serialize;dur=0.9, total;dur=8.4
+
+(desc: çağrı sayısı). Tarayıcı geliştirici araçları bu başlığı gösterir.
+Başlık sadece kimlik doğrulama dependency'sinin çözdüğü kullanıcı admin ise
+eklenir (set_request_user); token tekrar çözülmez ve iptal edilmiş / sürümü
+eskimiş token'lar zaten reddedilmiştir. Süreler (ör. şifre hashleme yapıldı
+mı) anonim istemcilere bilgi sızdırır.
+
+Ayrıntılı iz: İstek ayrıca X-Server-Timing-Trace: 1 başlığını taşıyorsa her
+SQL ifadesi / Redis komutu da (ilk TRACE_MAX_EVENTS kayıt) ayrı bir
+Server-Timing girdisi olarak eklenir. Kimlik doğrulaması olmayan route'larda
+(ör. /users/login) iz, admin token'ı yanıt anında doğrulanarak verilir.
+
+SLOW_REQUEST_LOG_SECONDS'tan uzun süren isteklerin dökümü (hash dahil)
+sunucu loguna yazılır; başlığı göremeyen istekler de böyle incelenebilir.
+"""
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+
+load_dotenv()
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+TRACE_HEADER = b"x-server-timing-trace"
+TRACE_MAX_EVENTS = 50
+# Bu süreyi aşan isteklerin dökümü loglanır (saniye)
+SLOW_REQUEST_LOG_SECONDS = float(os.getenv("SLOW_REQUEST_LOG_SECONDS", 1.0))
+
+# Başlıkta görünme sırası; diğer adlar sona eklenir
+_ORDER = ("db", "redis", "auth", "hash", "endpoint", "serialize")
+
+
+def _desc(text: str) -> str:
+    """Server-Timing desc değeri için tırnak ve satır sonlarını temizler"""
+    return " ".join(text.replace('"', "'").replace("\\", "/").split())[:100]
+
+
+class RequestTimings:
+    """Bir isteğin süre kayıtları"""
+
+    __slots__ = ("started_at", "totals", "events", "endpoint_done_at", "user")
+
+    def __init__(self, trace: bool = False):
+        self.started_at = time.perf_counter()
+        self.totals: Dict[str, List[float]] = {}  # ad -> [çağrı sayısı, saniye]
+        # Ayrıntılı iz istenmediyse olaylar hiç tutulmaz
+        self.events: Optional[List[Tuple[str, float, Optional[str]]]] = [] if trace else None
+        self.endpoint_done_at: Optional[float] = None
+        # Kimlik doğrulama dependency'sinin çözdüğü kullanıcı (TokenUser)
+        self.user = None
+
+    def add(self, name: str, seconds: float, detail: Optional[str] = None):
+        entry = self.totals.get(name)
+        if entry is None:
+            self.totals[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+        if self.events is not None and len(self.events) < TRACE_MAX_EVENTS:
+            self.events.append((name, seconds, detail))
+
+    def header_value(self, include_trace: bool = False) -> str:
+        """Server-Timing başlık değeri (süreler milisaniye)"""
+        names = [name for name in _ORDER if name in self.totals]
+        names += [name for name in self.totals if name not in _ORDER]
+
+        parts = []
+        for name in names:
+            count, seconds = self.totals[name]
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if name in ("db", "redis"):
+                part += f';desc="{int(count)}"'
+            parts.append(part)
+
+        if include_trace and self.events:
+            for index, (name, seconds, detail) in enumerate(self.events, 1):
+                part = f"{name}-{index};dur={seconds * 1000:.2f}"
+                if detail:
+                    part += f';desc="{_desc(detail)}"'
+                parts.append(part)
+
+        parts.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timing(trace: bool = False) -> Optional[RequestTimings]:
+    """Geçerli istek (context) için süre kaydını başlatır"""
+    if not SERVER_TIMING_ENABLED:
+        return None
+    timings = RequestTimings(trace)
+    _current_timings.set(timings)
+    return timings
+
+
+def get_request_timings() -> Optional[RequestTimings]:
+    """Geçerli isteğin süre kaydı (yoksa None)"""
+    return _current_timings.get()
+
+
+def record_timing(name: str, seconds: float, detail: Optional[str] = None):
+    """Etkin bir istek varsa süreyi ekler (yoksa hiçbir şey yapmaz)"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds, detail)
+
+
+def set_request_user(user):
+    """Doğrulanmış kullanıcıyı isteğin süre kaydına bağlar (başlık yetkisi için)"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.user = user
+
+
+@contextmanager
+def timed(name: str, detail: Optional[str] = None):
+    """Bloğun süresini isteğin Server-Timing kaydına ekler"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start, detail)
+
+
+def _timed_endpoint(endpoint):
+    """Endpoint süresini kaydeden ve bitiş anını işaretleyen sarmalayıcı"""
+
+    def finish(start: float):
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.endpoint_done_at = time.perf_counter()
+            timings.add("endpoint", timings.endpoint_done_at - start)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                finish(start)
+    else:
+        # Senkron endpoint'ler thread havuzunda çalışmaya devam etsin
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                finish(start)
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Endpoint ve yanıt serileştirme süresini ölçen route sınıfı
+
+    FastAPI endpoint döndükten sonra response_model doğrulaması ve JSON
+    dönüşümünü yapar; endpoint bitişinden yanıt nesnesinin hazır olmasına
+    kadar geçen süre "serialize" olarak kaydedilir.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current_timings.get()
+            if timings is not None and timings.endpoint_done_at is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_done_at)
+            return response
+
+        return timed_handler
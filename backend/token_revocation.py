@@ -0,0 +1,299 @@
+# backend/token_revocation.py
+"""
+İptal edilmiş token (JTI) deposu
+
+Her kimlik doğrulamalı istekte blacklisted_tokens tablosuna gitmek yerine
+iptal edilen JTI'ler bellekte tutulur:
+
+- Bloom filtresi: "iptal edilmemiş" sorusuna (en sık durum) hiç I/O olmadan,
+  kesin olarak hayır cevabı verir. Pozitif cevap sözlükten doğrulanır.
+- Bellek sözlüğü: jti -> son kullanma zamanı. Süresi dolan kayıtlar düzenli
+  olarak atılır ve bloom filtresi yeniden kurulur.
+- Redis: iptal edilen JTI token'ın kalan ömrü kadar TTL ile saklanır ve
+  TOKEN_REVOCATION_CHANNEL kanalına yayınlanır; diğer worker'lar pub/sub ile
+  anında öğrenir. Abonelik koparsa kaçırılan kayıtlar Redis'ten tamamlanır.
+- Veritabanı: kalıcı kayıt. Uygulama açılışında ve Redis yokken periyodik
+  olarak buradan yüklenir.
+
+Aynı depo kullanıcı başına token sürümünü (users.token_version) de önbellekler.
+Access token'lar bu sürümü taşır; şifre değişimi, hesabın pasife alınması
+veya admin iptali sürümü artırır ve eski token'lar hemen geçersiz olur.
+Sürüm değişikliği de aynı kanaldan yayınlanır; Redis yoksa diğer worker'lar
+en geç TOKEN_VERSION_CACHE_SECONDS içinde veritabanından öğrenir.
+
+add_listener ile kaydedilen fonksiyonlar (ör. WebSocket yöneticisi) bir JTI
+iptal edildiğinde veya kullanıcının sürümü değiştiğinde (bu veya diğer
+worker'lardan) çağrılır; böylece açık oturumlar da hemen kapatılabilir.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .database import AsyncSessionLocal
+from .redis_client import redis_client, redis_available, mark_redis_down, mark_redis_up
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Redis yokken veritabanından yeniden yükleme aralığı (saniye)
+TOKEN_REVOCATION_SYNC_SECONDS = int(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", 5))
+# Bloom filtresi boyutu (beklenen eşzamanlı iptal sayısı)
+TOKEN_REVOCATION_CAPACITY = int(os.getenv("TOKEN_REVOCATION_CAPACITY", 100_000))
+# Kullanıcı token sürümlerinin bellekte tutulma süresi (saniye)
+TOKEN_VERSION_CACHE_SECONDS = int(os.getenv("TOKEN_VERSION_CACHE_SECONDS", 30))
+
+TOKEN_REVOCATION_CHANNEL = "token_revocations"
+REVOKED_KEY_PREFIX = "revoked_token:"
+
+# listener(jti, user_id, version): JTI iptalinde sadece jti, sürüm değişiminde user_id ve version dolu
+RevocationListener = Callable[[Optional[str], Optional[int], Optional[int]], None]
+
+
+class BloomFilter:
+    """Sabit boyutlu bloom filtresi (yanlış negatif vermez)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        # m = -n ln(p) / (ln 2)^2,  k = (m / n) ln 2
+        self.size = max(1024, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TokenRevocationStore:
+    """Bellek + Redis + veritabanı destekli token iptal deposu"""
+
+    def __init__(self, client: aioredis.Redis = redis_client, capacity: int = TOKEN_REVOCATION_CAPACITY):
+        self.redis_client = client
+        self.capacity = capacity
+        self._revoked: Dict[str, float] = {}  # jti -> expires_at (unix zamanı)
+        self._bloom = BloomFilter(capacity)
+        self._versions: Dict[int, Tuple[int, float]] = {}  # user_id -> (sürüm, okunma zamanı)
+        self._sync_task: Optional[asyncio.Task] = None
+        self._listeners: List[RevocationListener] = []
+
+    # --- Dinleyiciler ---
+
+    def add_listener(self, listener: RevocationListener):
+        """İptal ve sürüm değişikliklerinde çağrılacak fonksiyonu kaydeder"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: RevocationListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, jti: Optional[str] = None, user_id: Optional[int] = None, version: Optional[int] = None):
+        for listener in self._listeners:
+            try:
+                listener(jti, user_id, version)
+            except Exception as e:
+                logger.error(f"Token iptal dinleyicisi hatası: {e}")
+
+    # --- Sorgu ---
+
+    def is_revoked(self, jti: str) -> bool:
+        """JTI iptal edilmiş mi (I/O yapmaz)"""
+        if jti not in self._bloom:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    # --- Ekleme ---
+
+    def _add_local(self, jti: str, expires_at: float):
+        if expires_at <= time.time():
+            return
+        self._revoked[jti] = expires_at
+        self._bloom.add(jti)
+
+    async def revoke(self, jti: str, expires_at: datetime):
+        """
+        JTI'yi iptal eder ve diğer worker'lara yayınlar
+
+        Veritabanı kaydı çağıran tarafından yapılır; burada bellek ve Redis güncellenir.
+        """
+        expires_ts = expires_at.timestamp()
+        self._add_local(jti, expires_ts)
+        self._notify(jti=jti)
+
+        ttl = int(expires_ts - time.time())
+        if ttl <= 0 or not redis_available():
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(f"{REVOKED_KEY_PREFIX}{jti}", int(expires_ts), ex=ttl)
+                pipe.publish(TOKEN_REVOCATION_CHANNEL, f"jti:{jti}:{int(expires_ts)}")
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            # Diğer worker'lar veritabanı senkronizasyonunda öğrenecek
+            mark_redis_down(e, "token_revocation")
+
+    # --- Kullanıcı token sürümleri ---
+
+    async def get_token_version(self, user_id: int, db: AsyncSession) -> Optional[int]:
+        """
+        Kullanıcının geçerli token sürümünü döndürür (kullanıcı yoksa None)
+
+        Önbellekte yoksa veya süresi geçmişse sadece token_version kolonu okunur.
+        Okuma sürerken gelen daha yeni sürüm (set_token_version, pub/sub) eski
+        veritabanı değeriyle ezilmez; sürümler sadece artar.
+        """
+        cached = self._versions.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < TOKEN_VERSION_CACHE_SECONDS:
+            return cached[0]
+
+        version = await db.scalar(select(models.User.token_version).where(models.User.id == user_id))
+        if version is None:
+            self._versions.pop(user_id, None)
+            return None
+        return self._store_version(user_id, version)
+
+    def _store_version(self, user_id: int, version: int) -> int:
+        """Sürümü önbelleğe yazar; önbellekteki daha yeni sürümü geri almaz"""
+        cached = self._versions.get(user_id)
+        if cached is not None and cached[0] > version:
+            version = cached[0]
+        self._versions[user_id] = (version, time.monotonic())
+        return version
+
+    async def set_token_version(self, user_id: int, version: int):
+        """Artırılmış token sürümünü kaydeder ve diğer worker'lara yayınlar"""
+        version = self._store_version(user_id, version)
+        self._notify(user_id=user_id, version=version)
+        if not redis_available():
+            return
+        try:
+            await self.redis_client.publish(TOKEN_REVOCATION_CHANNEL, f"ver:{user_id}:{version}")
+        except (RedisError, OSError) as e:
+            mark_redis_down(e, "token_revocation")
+
+    def _handle_message(self, data: str):
+        kind, _, rest = data.partition(":")
+        key, _, value = rest.rpartition(":")
+        if kind == "jti":
+            self._add_local(key, float(value))
+            self._notify(jti=key)
+        elif kind == "ver":
+            user_id = int(key)
+            self._notify(user_id=user_id, version=self._store_version(user_id, int(value)))
+
+    # --- Senkronizasyon ---
+
+    def _prune(self):
+        """Süresi dolan kayıtları atar ve bloom filtresini yeniden kurar"""
+        stale = time.monotonic() - TOKEN_VERSION_CACHE_SECONDS
+        for user_id in [uid for uid, (_, read_at) in self._versions.items() if read_at < stale]:
+            del self._versions[user_id]
+
+        now = time.time()
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        if not expired:
+            return
+        for jti in expired:
+            del self._revoked[jti]
+
+        # Bloom filtresinden silme yapılamaz, yeniden kur
+        bloom = BloomFilter(self.capacity)
+        for jti in self._revoked:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    async def load_from_database(self):
+        """Süresi dolmamış iptal kayıtlarını veritabanından yükler"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.BlacklistedToken.token_jti, models.BlacklistedToken.expires_at).where(
+                    models.BlacklistedToken.expires_at > datetime.now(timezone.utc)
+                )
+            )
+            for jti, expires_at in result.all():
+                # SQLite naive datetime döndürür, UTC olarak yorumla
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                self._add_local(jti, expires_at.timestamp())
+        self._prune()
+
+    async def _load_from_redis(self):
+        """Pub/sub kopukken kaçırılan iptalleri Redis anahtarlarından tamamlar"""
+        async for key in self.redis_client.scan_iter(match=f"{REVOKED_KEY_PREFIX}*", count=1000):
+            expires_at = await self.redis_client.get(key)
+            if expires_at is not None:
+                self._add_local(key[len(REVOKED_KEY_PREFIX):], float(expires_at))
+
+    async def _listen(self):
+        """Diğer worker'ların iptallerini dinler; Redis yoksa DB'den yoklar"""
+        while True:
+            try:
+                async with self.redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(TOKEN_REVOCATION_CHANNEL)
+                    await self._load_from_redis()
+                    mark_redis_up()
+                    logger.info("Token iptal kanalına abone olundu")
+
+                    pruned_at = time.monotonic()
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=TOKEN_REVOCATION_SYNC_SECONDS
+                        )
+                        if message is not None:
+                            self._handle_message(message["data"])
+                        if time.monotonic() - pruned_at >= TOKEN_REVOCATION_SYNC_SECONDS:
+                            self._prune()
+                            pruned_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                logger.debug(f"Token iptal kanalı kullanılamıyor, veritabanından yoklanacak: {e}")
+            except Exception as e:
+                logger.error(f"Token iptal senkronizasyon hatası: {e}")
+
+            try:
+                await self.load_from_database()
+            except Exception as e:
+                logger.error(f"Token iptalleri veritabanından yüklenemedi: {e}")
+            await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+
+    async def start(self):
+        """Açılışta kayıtları yükler ve senkronizasyon görevini başlatır"""
+        await self.load_from_database()
+        self._sync_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+
+# Global token iptal deposu
+revocation_store = TokenRevocationStore()
@@ -0,0 +1,479 @@
+# backend/websocket_manager.py
+"""
+WebSocket bağlantı yöneticisi
+
+Her bağlantının sınırlı bir gönderim kuyruğu (WS_SEND_QUEUE_SIZE) ve bu
+kuyruğu boşaltan kendi yazıcı görevi vardır. publish mesajı sadece
+kuyruklara ekler; ağ işlemi yapmaz, bu yüzden yayını tetikleyen istek
+(ör. create_product) bağlı istemci sayısından ve istemcilerin hızından
+bağımsız olarak hemen döner. Gönderimler yazıcı görevlerinde eşzamanlı
+yürür; yavaş bir istemci diğerlerini bekletmez.
+
+Konular: Her olay bir veya daha fazla konuya yayınlanır ve sadece o konulara
+abone bağlantılara gider (konu -> bağlantılar yönlendirme tablosu). Aynı olay
+kümesini alan bağlantılar için mesaj bir kez serileştirilir. İstemci soket
+üzerinden abone olur:
+
+    {"action": "subscribe", "topics": ["category:3", "product:5"]}
+    {"action": "subscribe", "topics": ["orders"], "token": "<access token>"}
+    {"action": "unsubscribe", "topics": ["products"]}
+
+- products: tüm katalog olayları (her bağlantı bununla başlar)
+- category:<id>, product:<id>: tek kategori / ürün
+- orders: kendi siparişlerinin durum değişiklikleri (admin için tüm
+  siparişler); access token gerekir
+- admin: tedarikçi ve satın alma olayları; admin token'ı gerekir
+
+Özel konular (orders:*, admin) her teslimattan önce bağlantıda saklanan
+token'a göre yeniden denetlenir: JTI iptal edilmişse, kullanıcının token
+sürümü değişmişse veya token'ın süresi dolmuşsa özel konulardan çıkarılır ve
+istemciye yeniden kimlik doğrulaması isteyen bir hata gönderilir:
+
+    {"type": "error", "detail": "...", "topics": ["orders:user:5"], "reauthenticate": true}
+
+Bağlantı ve herkese açık konular sürer. Token iptali (logout) veya sürüm
+artışı (şifre değişimi, hesabın pasife alınması) token_revocation deposundan
+bildirildiğinde kullanıcının özel abonelikleri beklemeden sonlandırılır.
+
+- Kuyruğu dolan (mesajlara yetişemeyen) istemci bağlantısı 1013 koduyla
+  kapatılır; istemci yeniden bağlanıp güncel veriyi çeker.
+- Gönderimi hata veren veya WS_SEND_TIMEOUT içinde bitmeyen soketler
+  listeden çıkarılır.
+
+Çoklu worker: Her worker WS_BROADCAST_CHANNEL Redis kanalına abone olur ve
+gelen olayları konularına göre kendi soketlerine dağıtır; publish olayları
+(konularıyla birlikte) yerel olarak dağıtmak yerine kanala yayınlar (kendi
+worker'ı da kanaldan alır). Abonelik
+yoksa (Redis erişilemez, bağlantı yeniden kuruluyor) veya
+WS_BROADCAST_BUS=local ise mesaj sadece bu worker'ın soketlerine gider.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from dotenv import load_dotenv
+from fastapi import WebSocket
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from .metrics import (
+    WEBSOCKET_BROADCAST_DURATION, WEBSOCKET_BROADCAST_RECIPIENTS, WEBSOCKET_CONNECTIONS,
+    record_websocket_eviction
+)
+from .database import AsyncSessionLocal
+from .redis_client import redis_client, redis_available, mark_redis_down, mark_redis_up
+from .token_revocation import revocation_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 100))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 5.0))  # saniye
+WS_BROADCAST_BUS = os.getenv("WS_BROADCAST_BUS", "redis").lower()  # redis, local
+WS_BROADCAST_CHANNEL = "ws_broadcast"
+# Abonelik koptuğunda yeniden deneme aralığı (saniye)
+WS_BUS_RETRY_SECONDS = 5
+
+# "Try Again Later": istemci yeniden bağlanabilir
+CLOSE_CODE_SLOW_CONSUMER = 1013
+
+# Konular
+PRODUCTS_TOPIC = "products"
+ORDERS_TOPIC = "orders"
+ADMIN_TOPIC = "admin"
+ALL_ORDERS_TOPIC = "orders:all"
+DEFAULT_TOPICS = (PRODUCTS_TOPIC,)
+MAX_TOPICS_PER_CONNECTION = 100
+
+_PUBLIC_TOPIC = re.compile(r"^(products|product:\d+|category:\d+)$")
+
+# (konular, olay) çiftleri
+TopicEvents = Sequence[Tuple[Sequence[str], Dict[str, Any]]]
+
+
+def product_topic(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+def category_topic(category_id: int) -> str:
+    return f"category:{category_id}"
+
+
+def user_orders_topic(user_id: int) -> str:
+    return f"orders:user:{user_id}"
+
+
+def is_public_topic(topic: str) -> bool:
+    return _PUBLIC_TOPIC.match(topic) is not None
+
+
+def resolve_topics(requested: Iterable[Any], user=None) -> Tuple[List[str], List[Any]]:
+    """
+    İstemcinin istediği konuları yönlendirme tablosundaki adlara çevirir
+
+    user: doğrulanmış TokenUser (yoksa sadece herkese açık konular).
+    İzin verilmeyen veya tanınmayan konular ikinci listede döner.
+    """
+    allowed, denied = [], []
+    for topic in requested:
+        if isinstance(topic, str) and is_public_topic(topic):
+            allowed.append(topic)
+        elif topic == ORDERS_TOPIC and user is not None:
+            allowed.append(ALL_ORDERS_TOPIC if user.is_admin else user_orders_topic(user.id))
+        elif topic == ADMIN_TOPIC and user is not None and user.is_admin:
+            allowed.append(ADMIN_TOPIC)
+        else:
+            denied.append(topic)
+    return allowed, denied
+
+
+class _Client:
+    """Tek bir WebSocket bağlantısı ve gönderim kuyruğu"""
+
+    __slots__ = ("websocket", "queue", "writer", "topics", "user", "jti", "token_version", "expires_at")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
+        # orders/admin konuları için doğrulanmış kullanıcı ve token'ı
+        self.user = None
+        self.jti: Optional[str] = None
+        self.token_version: Optional[int] = None
+        self.expires_at = 0.0
+
+
+class ConnectionManager:
+    """Kuyruklu, eşzamanlı yayın yapan WebSocket yöneticisi"""
+
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        bus: str = WS_BROADCAST_BUS,
+        client=redis_client
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.bus = bus
+        self.redis_client = client
+        self._clients: Dict[WebSocket, _Client] = {}
+        # Konu -> abone bağlantılar
+        self._routes: Dict[str, Set[_Client]] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self._bus_task: Optional[asyncio.Task] = None
+        # Kanal aboneliği etkin mi (yayınlanan mesaj bu worker'a da döner)
+        self._subscribed = False
+        self.published = 0
+        self.received = 0
+        self.sent = 0
+        self.evicted = 0
+        self.pruned = 0
+
+    @property
+    def active_connections(self) -> list:
+        return list(self._clients)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = _Client(websocket, self.queue_size)
+        client.writer = asyncio.create_task(self._writer(client))
+        self._clients[websocket] = client
+        self._add_topics(client, DEFAULT_TOPICS)
+        WEBSOCKET_CONNECTIONS.inc()
+
+    def disconnect(self, websocket: WebSocket):
+        """Bağlantıyı listeden çıkarır (birden fazla çağrılabilir)"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        self._remove_topics(client, list(client.topics))
+        WEBSOCKET_CONNECTIONS.dec()
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    # --- Abonelikler ---
+
+    def _add_topics(self, client: _Client, topics: Iterable[str]):
+        for topic in topics:
+            if topic in client.topics or len(client.topics) >= MAX_TOPICS_PER_CONNECTION:
+                continue
+            client.topics.add(topic)
+            self._routes.setdefault(topic, set()).add(client)
+
+    def _remove_topics(self, client: _Client, topics: Iterable[str]):
+        for topic in topics:
+            if topic not in client.topics:
+                continue
+            client.topics.discard(topic)
+            subscribers = self._routes.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._routes[topic]
+
+    def get_user(self, websocket: WebSocket):
+        client = self._clients.get(websocket)
+        return client.user if client is not None else None
+
+    def set_user(self, websocket: WebSocket, user, jti: Optional[str], expires_at: float):
+        """Doğrulanmış kullanıcıyı ve token'ının JTI / sürüm / bitiş zamanını saklar"""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.user = user
+            client.jti = jti
+            client.token_version = user.token_version
+            client.expires_at = expires_at
+
+    def _clear_user(self, client: _Client):
+        client.user = None
+        client.jti = None
+        client.token_version = None
+        client.expires_at = 0.0
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """Bağlantıyı konulara abone eder (konular resolve_topics ile doğrulanmış olmalı)"""
+        client = self._clients.get(websocket)
+        if client is None:
+            return []
+        self._add_topics(client, topics)
+        return sorted(client.topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        client = self._clients.get(websocket)
+        if client is None:
+            return []
+        self._remove_topics(client, topics)
+        if all(is_public_topic(topic) for topic in client.topics):
+            # Özel konu kalmadı, token artık saklanmaz
+            self._clear_user(client)
+        return sorted(client.topics)
+
+    def send(self, websocket: WebSocket, message: Dict[str, Any]):
+        """Tek bağlantıya mesaj gönderir (abonelik yanıtları)"""
+        client = self._clients.get(websocket)
+        if client is None:
+            return
+        try:
+            client.queue.put_nowait(json.dumps(message, ensure_ascii=False, default=str))
+        except asyncio.QueueFull:
+            self._evict(client)
+
+    # --- Yayın ---
+
+    async def publish(self, event: Dict[str, Any], topics: Sequence[str]):
+        """Olayı konulara abone tüm worker bağlantılarına iletir (gönderimi beklemez)"""
+        await self.publish_many([(topics, event)])
+
+    async def publish_many(self, items: TopicEvents):
+        """
+        Birden fazla olayı tek seferde iletir
+
+        Her bağlantı sadece abone olduğu konulardaki olayları alır; birden
+        fazla olay düşerse tek bir catalog_batch mesajında gelir.
+        """
+        if not items:
+            return
+        if self._subscribed and redis_available():
+            payload = json.dumps([[list(topics), event] for topics, event in items], ensure_ascii=False, default=str)
+            try:
+                await self.redis_client.publish(WS_BROADCAST_CHANNEL, payload)
+                self.published += 1
+                return
+            except (RedisError, OSError) as e:
+                mark_redis_down(e, "ws_broadcast")
+        await self.deliver_local(items)
+
+    async def deliver_local(self, items: TopicEvents):
+        """Olayları bu worker'daki abone bağlantıların kuyruğuna ekler"""
+        private_topics = {topic for topics, _ in items for topic in topics if not is_public_topic(topic)}
+        if private_topics:
+            await self._check_sessions({
+                client for topic in private_topics for client in self._routes.get(topic, ())
+            })
+
+        start = time.perf_counter()
+
+        # Bağlantı -> alacağı olayların sırası
+        per_client: Dict[_Client, List[int]] = {}
+        for index, (topics, _) in enumerate(items):
+            for topic in topics:
+                for client in self._routes.get(topic, ()):
+                    indexes = per_client.setdefault(client, [])
+                    # Birden fazla konusu eşleşse de olay bir kez gönderilir
+                    if not indexes or indexes[-1] != index:
+                        indexes.append(index)
+
+        # Aynı olay kümesi için serileştirme bir kez yapılır
+        serialized: Dict[Tuple[int, ...], str] = {}
+        for client, indexes in per_client.items():
+            key = tuple(indexes)
+            message = serialized.get(key)
+            if message is None:
+                events = [items[index][1] for index in indexes]
+                body = events[0] if len(events) == 1 else {"type": "catalog_batch", "events": events}
+                message = serialized[key] = json.dumps(body, ensure_ascii=False, default=str)
+            try:
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(client)
+
+        WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start)
+        WEBSOCKET_BROADCAST_RECIPIENTS.observe(len(per_client))
+
+    # --- Özel konu oturumları ---
+
+    async def _check_sessions(self, clients: Set[_Client]):
+        """Özel konu alıcılarının token'ını denetler; geçersiz oturumları sonlandırır"""
+        if not clients:
+            return
+        async with AsyncSessionLocal() as db:
+            for client in clients:
+                if client.websocket in self._clients and not await self._session_valid(client, db):
+                    self._end_session(client)
+
+    async def _session_valid(self, client: _Client, db) -> bool:
+        if client.user is None or client.expires_at <= time.time():
+            return False
+        if client.jti is None or revocation_store.is_revoked(client.jti):
+            return False
+        try:
+            version = await revocation_store.get_token_version(client.user.id, db)
+        except SQLAlchemyError as e:
+            logger.error(f"WebSocket oturumu doğrulanamadı: {e}")
+            return False
+        return version is not None and version == client.token_version
+
+    def _on_revocation(self, jti: Optional[str], user_id: Optional[int], version: Optional[int]):
+        """token_revocation dinleyicisi: iptal edilen token'ın özel aboneliklerini sonlandırır"""
+        for client in list(self._clients.values()):
+            if client.user is None:
+                continue
+            if (jti is not None and client.jti == jti) or (
+                user_id is not None and client.user.id == user_id and client.token_version != version
+            ):
+                self._end_session(client)
+
+    def _end_session(self, client: _Client):
+        """Özel konuları bırakır ve istemciden yeniden kimlik doğrulaması ister (bağlantı sürer)"""
+        dropped = sorted(topic for topic in client.topics if not is_public_topic(topic))
+        logger.info(f"Token'ı geçersiz WebSocket oturumu sonlandırıldı (kullanıcı {client.user.id if client.user else '-'})")
+        self._remove_topics(client, dropped)
+        self._clear_user(client)
+        self.send(client.websocket, {
+            "type": "error",
+            "detail": "Oturum sona erdi, yeniden giriş yapın",
+            "topics": dropped,
+            "reauthenticate": True,
+        })
+
+    def _evict(self, client: _Client):
+        """Kuyruğu dolan yavaş istemcinin bağlantısını kapatır"""
+        self.evicted += 1
+        record_websocket_eviction("slow_consumer")
+        logger.warning(f"Yavaş WebSocket istemcisi çıkarıldı ({self.queue_size} mesaj bekliyordu)")
+        self.disconnect(client.websocket)
+        task = asyncio.create_task(self._close(client.websocket, CLOSE_CODE_SLOW_CONSUMER))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:
+            pass  # Soket zaten kapanmış olabilir
+
+    async def _writer(self, client: _Client):
+        websocket = client.websocket
+        while True:
+            message = await client.queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(message), timeout=self.send_timeout)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Kopmuş veya takılmış soket
+                reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "send_error"
+                self.pruned += 1
+                record_websocket_eviction(reason)
+                self.disconnect(websocket)
+                await self._close(websocket, 1011)
+                return
+
+    # --- Worker'lar arası kanal ---
+
+    async def _listen(self):
+        """Kanaldaki yayınları yerel bağlantılara dağıtır"""
+        while True:
+            if redis_available():
+                try:
+                    async with self.redis_client.pubsub() as pubsub:
+                        await pubsub.subscribe(WS_BROADCAST_CHANNEL)
+                        self._subscribed = True
+                        mark_redis_up()
+                        logger.info("WebSocket yayın kanalına abone olundu")
+                        while True:
+                            # Sessiz kanalda socket_timeout'a takılmamak için süreli okuma
+                            message = await pubsub.get_message(
+                                ignore_subscribe_messages=True, timeout=WS_BUS_RETRY_SECONDS
+                            )
+                            if message is not None:
+                                self.received += 1
+                                await self.deliver_local(json.loads(message["data"]))
+                except asyncio.CancelledError:
+                    raise
+                except (RedisError, OSError) as e:
+                    mark_redis_down(e, "ws_broadcast")
+                except Exception as e:
+                    logger.error(f"WebSocket yayın kanalı hatası: {e}")
+                finally:
+                    self._subscribed = False
+            await asyncio.sleep(WS_BUS_RETRY_SECONDS)
+
+    async def start(self):
+        """Yayın kanalı aboneliğini başlatır (lifespan açılışında)"""
+        revocation_store.add_listener(self._on_revocation)
+        if self.bus == "redis":
+            self._bus_task = asyncio.create_task(self._listen())
+
+    async def close(self):
+        """Aboneliği durdurur ve tüm bağlantıları kapatır (uygulama kapanırken)"""
+        revocation_store.remove_listener(self._on_revocation)
+        if self._bus_task:
+            self._bus_task.cancel()
+            try:
+                await self._bus_task
+            except asyncio.CancelledError:
+                pass
+            self._bus_task = None
+        clients = list(self._clients.values())
+        for client in clients:
+            self.disconnect(client.websocket)
+        await asyncio.gather(*(self._close(client.websocket, 1001) for client in clients))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Yönetici metrikleri (health endpoint'i için)"""
+        return {
+            "connections": len(self._clients),
+            "topics": len(self._routes),
+            "queued": sum(client.queue.qsize() for client in self._clients.values()),
+            "queue_size": self.queue_size,
+            "bus": self.bus,
+            "bus_subscribed": self._subscribed,
+            "published": self.published,
+            "received": self.received,
+            "sent": self.sent,
+            "evicted_slow": self.evicted,
+            "pruned_dead": self.pruned,
+        }
+
+
+# Global WebSocket yöneticisi
+manager = ConnectionManager()
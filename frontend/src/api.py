@@ -1,4 +1,5 @@
 # frontend/src/api.py
+import json
 import requests
 from threading import Thread
 import time
@@ -8,12 +9,27 @@ API_URL = "http://127.0.0.1:8000"
 WS_URL = "ws://127.0.0.1:8000/ws/products_updates"
 
 
+# Son alınan ürün listesi ve ETag'i (değişmediyse 304 ile tekrar kullanılır)
+_products_cache = {"etag": None, "data": None}
+
+
 def fetch_products_from_api():
     """Backend'den tüm ürünleri çeker."""
     try:
-        response = requests.get(f"{API_URL}/products/")
+        headers = {}
+        if _products_cache["etag"]:
+            headers["If-None-Match"] = _products_cache["etag"]
+
+        response = requests.get(f"{API_URL}/products/", headers=headers)
+        if response.status_code == 304:
+            # Katalog değişmedi, elimizdeki listeyi kullan
+            return _products_cache["data"]
+
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        _products_cache["etag"] = response.headers.get("ETag")
+        _products_cache["data"] = data
+        return data
     except requests.exceptions.RequestException as e:
         print(f"API Hatası (fetch_products): {e}")
         return None  # Hata durumunda None döndür
@@ -39,20 +55,75 @@ def logout_user_api(access_token, refresh_token=None):
         return {"success": False, "message": "Çıkış işlemi sırasında bir hata oluştu"}
 
 
+# Yerinde uygulanan katalog olayları (backend/catalog_events.py)
+PRODUCT_EVENT_TYPES = {"product_created", "product_updated", "product_deleted", "stock_changed", "catalog_batch"}
+# Sipariş durumu bildirimleri ("orders" konusu, giriş gerekir)
+ORDER_EVENT_TYPES = {"order_status_changed"}
+
+# Açık WebSocket ve sipariş aboneliği (yeniden bağlanınca tekrar gönderilir)
+_ws_state = {"websocket": None, "orders_token": None}
+
+
+def _send_ws(message):
+    websocket = _ws_state["websocket"]
+    if websocket is None:
+        # Bağlantı kurulunca listener aboneliği gönderir
+        return
+    try:
+        websocket.send(json.dumps(message))
+    except Exception as e:
+        print(f"WebSocket mesajı gönderilemedi: {e}")
+
+
+def subscribe_to_orders(access_token):
+    """Kullanıcının sipariş durumu değişikliklerine abone olur"""
+    _ws_state["orders_token"] = access_token
+    _send_ws({"action": "subscribe", "topics": ["orders"], "token": access_token})
+
+
+def unsubscribe_from_orders():
+    """Sipariş aboneliğini bırakır (çıkış yapılınca)"""
+    if _ws_state["orders_token"] is None:
+        return
+    _ws_state["orders_token"] = None
+    _send_ws({"action": "unsubscribe", "topics": ["orders"]})
+
+
 def listen_for_updates_in_thread(page):
     """WebSocket dinleyicisini ayrı bir thread'de başlatır."""
 
     def ws_listener():
+        connected_before = False
         while True:
             try:
                 with connect(WS_URL) as websocket:
                     print("WebSocket bağlantısı kuruldu.")
+                    _ws_state["websocket"] = websocket
+                    if _ws_state["orders_token"]:
+                        subscribe_to_orders(_ws_state["orders_token"])
+                    if connected_before:
+                        # Bağlantı yokken kaçırılan değişiklikler için listeyi yenile
+                        page.pubsub.send_all("products_update")
+                    connected_before = True
                     for message in websocket:
-                        if message == "products_updated":
-                            page.pubsub.send_all("products_update")
+                        try:
+                            event = json.loads(message)
+                        except ValueError:
+                            continue
+                        if not isinstance(event, dict):
+                            continue
+                        if event.get("type") in PRODUCT_EVENT_TYPES or event.get("type") in ORDER_EVENT_TYPES:
+                            page.pubsub.send_all(event)
+                        elif event.get("type") == "error":
+                            print(f"WebSocket abonelik hatası: {event.get('detail')}")
+                            if event.get("reauthenticate"):
+                                # Token geçersiz: yeniden bağlanınca aynı token tekrar gönderilmez
+                                _ws_state["orders_token"] = None
             except Exception as e:
                 print(f"WebSocket hatası: {e}. 5sn sonra tekrar denenecek.")
                 time.sleep(5)
+            finally:
+                _ws_state["websocket"] = None
 
     thread = Thread(target=ws_listener, daemon=True)
     thread.start()
\ No newline at end of file
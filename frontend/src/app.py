@@ -2,7 +2,7 @@
 import flet as ft
 
 
-from .api import listen_for_updates_in_thread, fetch_products_from_api
+from .api import listen_for_updates_in_thread, fetch_products_from_api, ORDER_EVENT_TYPES
 from .components.product_card import ProductCard
 from .views.main_view import MainView
 from .views.auth_view import AuthView
@@ -23,6 +23,8 @@ class ECommerceApp:
         # Paylaşılan kontroller
         self.cart_item_count_text = ft.Text("0", weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE)
         self.products_container = ft.Stack(expand=True)
+        self.products_grid = None
+        self.product_cards = {}  # ürün id -> ProductCard
 
         # YENİ KRİTİK EKLEME: Sayfa düzeyinde SnackBar bileşenini tanımlama
         page.snack_bar = ft.SnackBar(
@@ -44,11 +46,71 @@ class ECommerceApp:
     def on_message(self, message):
         if message == "products_update":
             self.fetch_products()
+        elif isinstance(message, dict) and message.get("type") in ORDER_EVENT_TYPES:
+            # Sadece siparişler sayfası açıksa kartı güncelle
+            view = self.page.views[-1] if self.page.views else None
+            if hasattr(view, "apply_order_event"):
+                view.apply_order_event(message)
+        elif isinstance(message, dict):
+            self.apply_product_event(message)
+
+    def apply_product_event(self, event):
+        """Katalog olayını (veya olay grubunu) tüm listeyi yeniden çekmeden uygular"""
+        events = event["events"] if event.get("type") == "catalog_batch" else [event]
+        if self.products_grid is None and any(item.get("type") == "product_created" for item in events):
+            # Boş mağaza veya hata mesajı gösteriliyordu
+            self.fetch_products()
+            return
+
+        changed = False
+        for item in events:
+            changed = self._apply_product_event(item) or changed
+        if changed and self.products_grid.page:
+            self.products_grid.update()
+
+    def _apply_product_event(self, event):
+        """Tek olayı uygular; ürün ızgarası değiştiyse True döner"""
+        event_type = event.get("type")
+        if event_type == "product_created":
+            product = event["product"]
+            self.all_products[product["id"]] = product
+            card = ProductCard(product, self.add_to_cart)
+            self.product_cards[product["id"]] = card
+            self.products_grid.controls.append(card)
+            return True
+
+        product = self.all_products.get(event.get("product_id"))
+        if product is None:
+            return False
+        if event_type == "stock_changed":
+            # Kartlar stok göstermiyor; sepete ekleme sayfası bu veriyi kullanır
+            product["stock_quantity"] = event["stock_quantity"]
+            return False
+
+        old_card = self.product_cards.get(product["id"])
+        if event_type == "product_updated":
+            product.update(event["changes"])
+            if old_card is None:
+                return False
+            card = ProductCard(product, self.add_to_cart)
+            self.product_cards[product["id"]] = card
+            self.products_grid.controls[self.products_grid.controls.index(old_card)] = card
+            return True
+        if event_type == "product_deleted":
+            del self.all_products[product["id"]]
+            if old_card is None:
+                return False
+            del self.product_cards[product["id"]]
+            self.products_grid.controls.remove(old_card)
+            return True
+        return False
 
     def fetch_products(self):
         products_data = fetch_products_from_api()
 
         self.products_container.controls.clear()
+        self.products_grid = None
+        self.product_cards = {}
         if products_data is None:
             self.products_container.controls.append(ft.Row([ft.Icon(ft.Icons.ERROR_OUTLINE, color=ft.Colors.RED),
                                                             ft.Text("API'ye ulaşılamıyor.", color=ft.Colors.RED)],
@@ -62,8 +124,11 @@ class ECommerceApp:
             products_grid = ft.GridView(expand=True, runs_count=5, max_extent=200, child_aspect_ratio=0.7, spacing=10,
                                         run_spacing=10)
             for product in products_data:
-                products_grid.controls.append(ProductCard(product, self.add_to_cart))
+                card = ProductCard(product, self.add_to_cart)
+                self.product_cards[product['id']] = card
+                products_grid.controls.append(card)
             self.products_container.controls.append(products_grid)
+            self.products_grid = products_grid
         self.page.update()
 
     def add_to_cart(self, product_card: ProductCard):
@@ -84,7 +84,9 @@ def MainView(app):
 
 def logout_user(app):
     """Kullanıcı çıkışı yap"""
-    from ..api import logout_user_api
+    from ..api import logout_user_api, unsubscribe_from_orders
+    
+    unsubscribe_from_orders()
     
     # Backend'e logout isteği gönder
     if app.current_user and app.current_user.get('access_token'):
@@ -2,11 +2,19 @@ import flet as ft
 import requests
 from datetime import datetime
 
+from ..api import subscribe_to_orders
+
 API_URL = "http://127.0.0.1:8000"
+ORDERS_PAGE_SIZE = 20
 
 class OrdersView(ft.View):
     def __init__(self, app):
         self.app = app
+        # Sipariş ID -> (sipariş, kart); durum bildirimleri tek kartı günceller
+        self.order_cards = {}
+        # Sonraki sipariş sayfasının imleci (X-Next-Cursor); None ise son sayfa
+        self.next_cursor = None
+        self.load_more_button = None
         
         super().__init__(
             route="/orders",
@@ -72,25 +80,79 @@ class OrdersView(ft.View):
     def did_mount(self):
         """Sayfa yüklendiğinde çalışır"""
         self.load_orders()
+        if self.app.current_user:
+            # Durum değişiklikleri WebSocket ile gelir (bkz. apply_order_event)
+            subscribe_to_orders(self.app.current_user.get('access_token'))
+    
+    def apply_order_event(self, event):
+        """Sipariş durumu bildirimini listeyi yeniden çekmeden uygular"""
+        entry = self.order_cards.get(event.get("order_id"))
+        if entry is None:
+            return
+        order, card = entry
+        order = {**order, "status": event["status"], "notes": event.get("notes"), "updated_at": event.get("updated_at")}
+        new_card = self.create_order_card(order)
+        controls = self.orders_container.controls
+        if card in controls:
+            controls[controls.index(card)] = new_card
+        self.order_cards[order["id"]] = (order, new_card)
+        if self.page:
+            self.update()
+    
+    def fetch_orders_page(self, cursor=None):
+        """Kullanıcının siparişlerinden bir sayfa alır (sunucu en yeni önce sıralar)"""
+        headers = {"Authorization": f"Bearer {self.app.current_user.get('access_token')}"}
+        params = {"limit": ORDERS_PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{API_URL}/users/me/orders", params=params, headers=headers, timeout=10)
+        response.raise_for_status()
+        # Sonraki sayfa varsa imleç X-Next-Cursor başlığında gelir
+        return response.json(), response.headers.get("X-Next-Cursor")
+    
+    def append_order_cards(self, orders):
+        for order in orders:
+            card = self.create_order_card(order)
+            self.order_cards[order['id']] = (order, card)
+            self.orders_container.controls.append(card)
+        if self.next_cursor:
+            self.load_more_button = ft.Container(
+                content=ft.OutlinedButton(
+                    text="Daha Fazla Yükle",
+                    icon=ft.Icons.EXPAND_MORE,
+                    on_click=lambda e: self.load_more_orders()
+                ),
+                alignment=ft.alignment.center
+            )
+            self.orders_container.controls.append(self.load_more_button)
+    
+    def load_more_orders(self):
+        """Sonraki sipariş sayfasını listenin sonuna ekler"""
+        if not self.app.current_user or not self.next_cursor:
+            return
+        try:
+            orders, self.next_cursor = self.fetch_orders_page(self.next_cursor)
+        except Exception as e:
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"Siparişler yüklenemedi: {e}"), open=True)
+            self.page.update()
+            return
+        if self.load_more_button in self.orders_container.controls:
+            self.orders_container.controls.remove(self.load_more_button)
+        self.load_more_button = None
+        self.append_order_cards(orders)
+        self.update()
     
     def load_orders(self):
-        """Kullanıcının siparişlerini yükle"""
+        """Kullanıcının siparişlerinin ilk sayfasını yükle (devamı istek üzerine)"""
         if not self.app.current_user:
             return
         
         try:
-            # Tüm siparişleri al ve kullanıcıya ait olanları filtrele
-            response = requests.get(f"{API_URL}/orders/", timeout=10)
-            response.raise_for_status()
-            all_orders = response.json()
-            
-            # Kullanıcının siparişlerini filtrele
-            user_orders = [order for order in all_orders if order.get('owner_id') == self.app.current_user['id']]
-            
-            # Siparişleri tarihe göre sırala (en yeni önce)
-            user_orders.sort(key=lambda x: x.get('created_date', ''), reverse=True)
+            user_orders, self.next_cursor = self.fetch_orders_page()
             
             self.orders_container.controls.clear()
+            self.order_cards = {}
+            self.load_more_button = None
             
             if not user_orders:
                 self.orders_container.controls.append(
@@ -115,8 +177,7 @@ class OrdersView(ft.View):
                     )
                 )
             else:
-                for order in user_orders:
-                    self.orders_container.controls.append(self.create_order_card(order))
+                self.append_order_cards(user_orders)
             
             self.update()
             
@@ -0,0 +1,98 @@
+# tests/conftest.py
+"""
+Testler geçici bir SQLite veritabanıyla ve sıkı sorgu bütçesiyle çalışır
+
+Ortam değişkenleri backend import edilmeden önce ayarlanmalıdır (ayarlar
+modül yüklenirken okunur). Redis gerekmez; erişilemezse backend yedek
+yollarını kullanır.
+"""
+import os
+import secrets
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="ecommerce-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ["DB_QUERY_BUDGET_STRICT"] = "true"
+os.environ["WS_BROADCAST_BUS"] = "local"
+os.environ["LOOP_MONITOR_ENABLED"] = "false"
+os.environ.setdefault("SECRET_KEY", secrets.token_urlsafe(48))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import models
+from backend.database import SessionLocal
+from backend.main import app
+from backend.security import create_access_token, user_token_claims
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def admin_headers(db):
+    admin = models.User(
+        email=f"admin-{secrets.token_hex(4)}@example.com", hashed_password="x",
+        first_name="Test", last_name="Admin", is_active=True, is_verified=True, is_admin=True
+    )
+    db.add(admin)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token(user_token_claims(admin))}"}
+
+
+@pytest.fixture
+def customer(db):
+    user = models.User(
+        email=f"customer-{secrets.token_hex(4)}@example.com", hashed_password="x",
+        first_name="Test", last_name="Customer", is_active=True, is_verified=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def customer_headers(customer):
+    return {"Authorization": f"Bearer {create_access_token(user_token_claims(customer))}"}
+
+
+@pytest.fixture
+def make_product(db):
+    """Yeni bir kategoride ürün oluşturan fabrika"""
+    category = models.Category(name=f"Kategori {secrets.token_hex(4)}")
+    db.add(category)
+    db.commit()
+
+    def make(stock_quantity: int = 10, **values) -> models.Product:
+        product = models.Product(
+            name=f"Ürün {secrets.token_hex(4)}", price=10, stock_quantity=stock_quantity,
+            category_id=category.id, **values
+        )
+        db.add(product)
+        db.commit()
+        return product
+
+    return make
+
+
+@pytest.fixture
+def stock_of(db):
+    """Ürünün veritabanındaki güncel stoğunu okur (oturumun eski okumasını bırakır)"""
+
+    def read(product: models.Product) -> int:
+        db.rollback()
+        return db.get(models.Product, product.id).stock_quantity
+
+    return read
@@ -0,0 +1,44 @@
+# tests/test_catalog_etag.py
+"""
+Katalog ETag / 304 Not Modified
+
+Katalog değişmedikçe If-None-Match eşleşen istek gövdesiz 304 almalı;
+ürün eklenince ETag değişmeli ve eski ETag artık eşleşmemeli.
+"""
+import secrets
+
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/products/", "/categories/"])
+def test_not_modified_until_catalog_changes(client, admin_headers, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    category = client.post("/categories/", json={"name": f"Kategori {secrets.token_hex(4)}"}, headers=admin_headers)
+    assert category.status_code == 200, category.text
+
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_single_product_etag(client, admin_headers, make_product):
+    product = make_product()
+    path = f"/products/{product.id}"
+    etag = client.get(path).headers["ETag"]
+
+    assert client.get(path, headers={"If-None-Match": f'W/{etag}, "baska"'}).status_code == 304
+
+    response = client.put(path, json={"name": "Yeni ad", "price": 12}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "Yeni ad"
@@ -0,0 +1,65 @@
+# tests/test_catalog_events.py
+"""
+Katalog olaylarının ürün bazında birleştirilmesi
+
+Pencere içindeki olaylar tek olaya iner; birleşen olay ürünün en güncel
+kategorisini taşımalı ve eski kategorinin aboneleri de bilgilendirilmelidir.
+"""
+import asyncio
+
+from backend.catalog_events import PRODUCT_UPDATED, STOCK_CHANGED, CatalogEventCoalescer, stock_changed
+
+
+def _update(product_id, category_id, **changes):
+    return {"type": PRODUCT_UPDATED, "product_id": product_id, "category_id": category_id, "changes": changes}
+
+
+def _coalesce(*submissions):
+    """Olayları tek pencerede gönderir, yayınlanan (konular, olay) çiftlerini döndürür"""
+    published = []
+
+    async def publish(items):
+        published.extend(items)
+
+    async def scenario():
+        coalescer = CatalogEventCoalescer(window=60, publish=publish)
+        for event, previous_category_id in submissions:
+            coalescer.submit(event, previous_category_id)
+        await coalescer.stop()
+
+    asyncio.run(scenario())
+    return published
+
+
+def test_updates_keep_newest_category():
+    published = _coalesce(
+        (_update(1, 10, price=5.0), None),
+        (_update(1, 20, name="Yeni"), 10),
+    )
+
+    assert len(published) == 1
+    topics, event = published[0]
+    assert event == _update(1, 20, price=5.0, name="Yeni")
+    assert {"category:10", "category:20", "product:1", "products"} <= set(topics)
+
+
+def test_stock_change_after_category_move_keeps_new_category():
+    published = _coalesce(
+        (_update(2, 20, name="Taşındı"), 10),
+        (stock_changed(2, 7, 20), None),
+    )
+
+    [(_, event)] = published
+    assert event["category_id"] == 20
+    assert event["changes"] == {"name": "Taşındı", "stock_quantity": 7}
+
+
+def test_stock_only_updates_stay_stock_changed():
+    published = _coalesce(
+        (stock_changed(3, 5, 10), None),
+        (stock_changed(3, 4, 10), None),
+    )
+
+    [(_, event)] = published
+    assert event["type"] == STOCK_CHANGED
+    assert event["stock_quantity"] == 4
@@ -0,0 +1,39 @@
+# tests/test_health.py
+"""
+/health, /admin/health ve /metrics erişimi
+
+İç ayrıntılar (route süreleri, havuzlar, WebSocket) herkese açık değildir.
+"""
+from backend import metrics
+
+
+def test_public_health_is_status_only(client):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"status", "timestamp"}
+
+
+def test_admin_health_requires_admin(client, admin_headers, customer_headers):
+    assert client.get("/admin/health").status_code in (401, 403)
+    assert client.get("/admin/health", headers=customer_headers).status_code == 403
+
+    response = client.get("/admin/health", headers=admin_headers)
+    assert response.status_code == 200
+    assert {"redis", "event_loop", "websocket"} <= set(response.json())
+
+
+def test_metrics_requires_token_or_loopback(client, monkeypatch):
+    # TestClient istemcisi loopback değildir
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "gizli")
+    assert client.get("/metrics", headers={"Authorization": "Bearer yanlis"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer gizli"})
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
+
+
+def test_metrics_loopback_without_token():
+    assert metrics.metrics_access_allowed("127.0.0.1", None)
+    assert not metrics.metrics_access_allowed("10.0.0.5", None)
@@ -0,0 +1,72 @@
+# tests/test_pagination.py
+"""
+Keyset (imleç) sayfalama
+
+Sayfalar X-Next-Cursor ile yürünürken her satır bir kez ve doğru sırada
+gelmeli; sıralama anahtarı eşit satırlar (aynı created_date) id ile ayrılır.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from backend import models
+from backend.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def _walk(client, path, headers=None, limit=2):
+    """Tüm sayfaları imleçle okur, (satırlar, sayfa sayısı) döndürür"""
+    rows, pages, cursor = [], 0, None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= limit
+        rows.extend(page)
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return rows, pages
+
+
+def test_cursor_round_trip():
+    created = datetime(2025, 1, 2, 3, 4, 5, 678)
+    assert decode_cursor(encode_cursor(created, 42), 2) == (created, 42)
+
+
+@pytest.mark.parametrize("cursor", ["bozuk!", encode_cursor(1, 2)])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 1)
+    assert error.value.status_code == 400
+
+
+def test_my_orders_walk_with_ties(client, db, customer, customer_headers):
+    same_time = datetime(2025, 1, 1, 12, 0, 0)
+    created_dates = [same_time] * 5 + [same_time + timedelta(minutes=1), same_time - timedelta(minutes=1)]
+    orders = [models.Order(owner_id=customer.id, total_price=1, created_date=when) for when in created_dates]
+    db.add_all(orders)
+    db.commit()
+
+    rows, pages = _walk(client, "/users/me/orders", customer_headers)
+
+    expected = sorted(orders, key=lambda order: (order.created_date, order.id), reverse=True)
+    assert [row["id"] for row in rows] == [order.id for order in expected]
+    assert pages == 4
+
+
+def test_products_walk(client, make_product):
+    created = {make_product().id for _ in range(5)}
+
+    rows, _ = _walk(client, "/products/", limit=3)
+
+    ids = [row["id"] for row in rows]
+    assert ids == sorted(set(ids))
+    assert created <= set(ids)
+
+
+def test_products_invalid_cursor(client):
+    assert client.get("/products/", params={"cursor": "bozuk!"}).status_code == 400
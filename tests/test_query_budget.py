@@ -0,0 +1,98 @@
+# tests/test_query_budget.py
+"""
+Listeleme endpoint'lerinin sorgu bütçeleri
+
+Her listeleme kayıt sayısından bağımsız, sabit sayıda sorgu yapmalıdır.
+DB_QUERY_BUDGET_STRICT=true (conftest) iken bütçeyi aşan istek
+QueryBudgetExceeded ile biter; ayrıca gerçek sorgu sayısı da ölçülür ki
+N+1'e dönen bir değişiklik burada yakalansın.
+"""
+import secrets
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from backend import models
+from backend.database import async_engine
+from backend.main import ORDER_LIST_QUERY_BUDGET, PURCHASE_LIST_QUERY_BUDGET, STOCK_MOVEMENT_LIST_QUERY_BUDGET
+from backend.security import create_access_token, user_token_claims
+
+ROWS = 25
+
+
+@contextmanager
+def count_queries():
+    """Blok içinde async engine'e giden SQL ifadelerini sayar"""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", _record)
+
+
+@pytest.fixture
+def seeded(db):
+    """ROWS adet sipariş, stok hareketi ve satın alma (her biri birden fazla ilişkili satırla)"""
+    tag = secrets.token_hex(4)
+    customer = models.User(
+        email=f"customer-{tag}@example.com", hashed_password="x",
+        first_name="Test", last_name="Customer", is_active=True, is_verified=True
+    )
+    category = models.Category(name=f"Kategori {tag}")
+    supplier = models.Supplier(name=f"Tedarikçi {tag}")
+    db.add_all([customer, category, supplier])
+    db.flush()
+    products = [
+        models.Product(name=f"Ürün {tag} {i}", price=10 + i, stock_quantity=100, category_id=category.id)
+        for i in range(3)
+    ]
+    db.add_all(products)
+    db.flush()
+
+    for i in range(ROWS):
+        order = models.Order(owner_id=customer.id, total_price=30)
+        order.items = [
+            models.OrderItem(product_id=product.id, quantity=1, price_per_item=product.price)
+            for product in products
+        ]
+        purchase = models.Purchase(supplier_id=supplier.id, invoice_number=f"{tag}-{i}", total_amount=6)
+        purchase.items = [
+            models.PurchaseItem(product_id=product.id, quantity=1, unit_price=2, total_price=2)
+            for product in products
+        ]
+        movement = models.StockMovement(product_id=products[i % 3].id, movement_type="entry", quantity=1)
+        db.add_all([order, purchase, movement])
+    db.commit()
+
+    return {"customer_headers": {"Authorization": f"Bearer {create_access_token(user_token_claims(customer))}"}}
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/orders/", ORDER_LIST_QUERY_BUDGET),
+    ("/stock/movements/", STOCK_MOVEMENT_LIST_QUERY_BUDGET),
+    ("/purchases/", PURCHASE_LIST_QUERY_BUDGET),
+])
+def test_admin_listing_within_budget(client, admin_headers, seeded, path, budget):
+    with count_queries() as statements:
+        response = client.get(path, params={"limit": ROWS}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == ROWS
+    assert len(statements) <= budget, statements
+
+
+def test_my_orders_within_budget(client, seeded):
+    with count_queries() as statements:
+        response = client.get("/users/me/orders", params={"limit": ROWS}, headers=seeded["customer_headers"])
+
+    assert response.status_code == 200, response.text
+    orders = response.json()
+    assert len(orders) == ROWS
+    assert all(len(order["items"]) == 3 for order in orders)
+    assert len(statements) <= ORDER_LIST_QUERY_BUDGET, statements
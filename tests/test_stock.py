@@ -0,0 +1,64 @@
+# tests/test_stock.py
+"""
+Stok ayırma ve stok hareketleri
+
+Sipariş ve çıkış hareketleri stoğu koşullu UPDATE ile düşürür; stok yetmezse
+hiçbir satır değişmemeli ve istek 400 ile reddedilmelidir.
+"""
+
+
+def _order(client, headers, *items):
+    return client.post(
+        "/orders/",
+        json={"items": [{"product_id": product.id, "quantity": quantity} for product, quantity in items]},
+        headers=headers,
+    )
+
+
+def test_order_rejects_oversell(client, customer_headers, make_product, stock_of):
+    product = make_product(stock_quantity=3)
+
+    assert _order(client, customer_headers, (product, 2)).status_code == 200
+    response = _order(client, customer_headers, (product, 2))
+
+    assert response.status_code == 400, response.text
+    assert stock_of(product) == 1
+
+
+def test_order_releases_earlier_reservations_on_oversell(client, customer_headers, make_product, stock_of):
+    plenty, scarce = make_product(stock_quantity=5), make_product(stock_quantity=1)
+
+    response = _order(client, customer_headers, (plenty, 2), (scarce, 2))
+
+    assert response.status_code == 400, response.text
+    assert stock_of(plenty) == 5
+    assert stock_of(scarce) == 1
+
+
+def test_order_sums_repeated_lines(client, customer_headers, make_product, stock_of):
+    product = make_product(stock_quantity=3)
+
+    response = _order(client, customer_headers, (product, 2), (product, 2))
+
+    assert response.status_code == 400, response.text
+    assert stock_of(product) == 3
+
+
+def test_stock_exit_rejects_oversell(client, admin_headers, make_product, stock_of):
+    product = make_product(stock_quantity=3)
+
+    def move(movement_type, quantity, product_id=product.id):
+        return client.post(
+            "/stock/movements/",
+            json={"product_id": product_id, "movement_type": movement_type, "quantity": quantity},
+            headers=admin_headers,
+        )
+
+    assert move("exit", 4).status_code == 400
+    assert stock_of(product) == 3
+
+    assert move("entry", 2).status_code == 200
+    assert move("exit", 5).status_code == 200
+    assert stock_of(product) == 0
+
+    assert move("exit", 1, product_id=10**9).status_code == 404
@@ -0,0 +1,76 @@
+# tests/test_token_version.py
+"""
+Kullanıcı token sürümleri
+
+Sürüm artışı (admin iptali, şifre değişimi, hesabın pasife alınması) o ana
+kadar verilen access token'ları geçersiz kılmalıdır; sürüm önbelleği
+eşzamanlı bir artışı eski veritabanı değeriyle geri almamalıdır.
+"""
+import asyncio
+import secrets
+
+import pytest
+
+from backend import models, token_revocation
+from backend.security import create_access_token, user_token_claims
+from backend.token_revocation import TokenRevocationStore
+
+
+def _customer(db) -> models.User:
+    user = models.User(
+        email=f"customer-{secrets.token_hex(4)}@example.com", hashed_password="x",
+        first_name="Test", last_name="Customer", is_active=True, is_verified=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_revoke_user_tokens_invalidates_issued_tokens(client, db, admin_headers):
+    user = _customer(db)
+    old_headers = {"Authorization": f"Bearer {create_access_token(user_token_claims(user))}"}
+    assert client.get("/auth/me", headers=old_headers).status_code == 200
+
+    response = client.post(f"/admin/revoke-user-tokens/{user.id}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    assert client.get("/auth/me", headers=old_headers).status_code == 401
+    db.refresh(user)
+    new_headers = {"Authorization": f"Bearer {create_access_token(user_token_claims(user))}"}
+    assert client.get("/auth/me", headers=new_headers).status_code == 200
+
+
+@pytest.mark.parametrize("bump", ["set_token_version", "pubsub"])
+def test_cache_miss_read_keeps_concurrent_bump(monkeypatch, bump):
+    monkeypatch.setattr(token_revocation, "redis_available", lambda: False)
+    store = TokenRevocationStore()
+
+    class SlowSession:
+        """Okuma sürerken sürüm artışının gelmesini bekleyen, eski değeri dönen oturum"""
+
+        def __init__(self):
+            self.reading = asyncio.Event()
+            self.bumped = asyncio.Event()
+
+        async def scalar(self, statement):
+            self.reading.set()
+            await self.bumped.wait()
+            return 3
+
+    async def scenario():
+        db = SlowSession()
+        read = asyncio.create_task(store.get_token_version(7, db))
+        await db.reading.wait()
+        if bump == "set_token_version":
+            await store.set_token_version(7, 4)
+        else:
+            store._handle_message("ver:7:4")
+        db.bumped.set()
+        return await read
+
+    assert asyncio.run(scenario()) == 4
+    assert store._versions[7][0] == 4
+
+    # Geç gelen eski yayın da sürümü geri almaz
+    store._handle_message("ver:7:3")
+    assert store._versions[7][0] == 4